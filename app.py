@@ -1,6 +1,58 @@
+import logging
+import os
+import time
+
+# Startzeit dieses Durchlaufs – vor allen anderen Imports
+_RUN_START = time.perf_counter()
+
 import streamlit as st
 from users import validate_login, ensure_superadmin_exists
-from utils import load_language, translator
+from utils import load_language, translator, startup_stats
+
+_IMPORTS_DONE = time.perf_counter()
+
+logger = logging.getLogger(__name__)
+# Eigener Handler: der Root-Logger steht standardmäßig auf WARNING
+if not logger.handlers:
+    _handler = logging.StreamHandler()
+    _handler.setFormatter(logging.Formatter("%(asctime)s %(name)s %(levelname)s %(message)s"))
+    logger.addHandler(_handler)
+    logger.setLevel(logging.INFO)
+    logger.propagate = False
+
+
+# ---------------------------------------------------------
+# Kaltstart messen (einmal pro Prozess, z.B. nach Container-Neustart)
+# ---------------------------------------------------------
+def _process_age():
+    """Sekunden seit Prozessstart (nur Linux, sonst None)."""
+    try:
+        with open("/proc/self/stat") as f:
+            # Feld 22 (starttime) in Ticks seit Systemstart; Name in Klammern überspringen
+            start_ticks = int(f.read().rsplit(")", 1)[1].split()[19])
+        with open("/proc/uptime") as f:
+            uptime = float(f.read().split()[0])
+        return uptime - start_ticks / os.sysconf("SC_CLK_TCK")
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+def _record_startup():
+    stats = startup_stats()
+    if stats:
+        return
+
+    stats["imports_ms"] = (_IMPORTS_DONE - _RUN_START) * 1000
+    stats["first_run_ms"] = (time.perf_counter() - _RUN_START) * 1000
+    age = _process_age()
+    if age is not None:
+        stats["process_age_ms"] = age * 1000
+
+    # Ins Log (stderr) und im Superadmin-Bereich sichtbar
+    logger.info(
+        "Kaltstart: %s",
+        ", ".join(f"{key}={value:.0f}" for key, value in stats.items()),
+    )
 
 
 def reset_state_preserve_language():
@@ -86,4 +138,7 @@ def main():
 
 
 if __name__ == "__main__":
-    main()
+    try:
+        main()
+    finally:
+        _record_startup()
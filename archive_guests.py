@@ -0,0 +1,77 @@
+"""
+Archivlauf: verschiebt abgereiste, vollständig bezahlte Gäste in das
+Monatsarchiv ihres Check-ins (logic.archive_departed_guests).
+
+- Frist: archive_grace_days nach dem Checkout (Standard 30, negativ = nie)
+- pro Hotel ein Commit für alle archivierten Gäste
+- läuft getrennt vom Checkout, damit dieser nicht jedes Mal alle
+  ausgecheckten Gäste lesen und ein zweites Mal schreiben muss
+
+Aufruf (z.B. per cron einmal pro Nacht, nach night_audit.py):
+    python archive_guests.py                              # alle Hotels, heute
+    python archive_guests.py hotel_a hotel_b              # nur diese Hotels
+    python archive_guests.py --date 2025-03-01 hotel_a    # Frist ab diesem Datum
+"""
+import argparse
+import sys
+import time
+from datetime import date
+from typing import List, Optional
+
+from database import get_backend
+from logic import archive_departed_guests
+
+
+def run_archive(hotel_id: str, today: Optional[date] = None) -> dict:
+    """
+    Archivlauf für ein Hotel.
+    Ergebnis: {"hotel_id", "archived": Anzahl archivierter Gäste, "ms"}
+    """
+    start = time.perf_counter()
+    archived = archive_departed_guests(hotel_id, today)
+    return {
+        "hotel_id": hotel_id,
+        "archived": archived,
+        "ms": (time.perf_counter() - start) * 1000,
+    }
+
+
+def run_all(hotel_ids: Optional[List[str]] = None, today: Optional[date] = None) -> List[dict]:
+    """
+    Archivlauf für mehrere Hotels (Standard: alle).
+    Ein Fehler bei einem Hotel hält die übrigen nicht auf; er steht
+    unter "error" im Ergebnis dieses Hotels.
+    """
+    results = []
+    for hotel_id in hotel_ids or get_backend().list_hotel_ids():
+        try:
+            results.append(run_archive(hotel_id, today))
+        except Exception as e:
+            results.append({"hotel_id": hotel_id, "error": str(e)})
+    return results
+
+
+def main(argv) -> int:
+    parser = argparse.ArgumentParser(description="Archivlauf: abgereiste Gäste ins Monatsarchiv verschieben")
+    parser.add_argument("hotel_ids", nargs="*", help="Standard: alle Hotels")
+    parser.add_argument("--date", type=date.fromisoformat, default=None,
+                        help="Stichtag YYYY-MM-DD für die Frist (Standard: heute)")
+    args = parser.parse_args(argv)
+
+    results = run_all(args.hotel_ids, args.date)
+
+    failed = 0
+    for r in results:
+        if "error" in r:
+            failed += 1
+            print(f"{r['hotel_id']}: FEHLER {r['error']}")
+        else:
+            print(f"{r['hotel_id']}: {r['archived']} Gäste archiviert ({r['ms']:.1f} ms)")
+
+    total_ms = sum(r.get("ms", 0.0) for r in results)
+    print(f"{len(results)} Hotels, {failed} Fehler, {total_ms:.1f} ms")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,104 @@
+"""
+Misst Dekodier-Zeit und Speicherbedarf (RSS) für einen Mandanten mit
+vielen Gästen – so, wie database.load_guests sie bei jedem Rerun baut.
+
+Aufruf (aus dem Projektordner):
+    python -m benchmarks.decode
+    python -m benchmarks.decode --guests 5000 --nights 30
+"""
+import argparse
+import gc
+import os
+import random
+import time
+from datetime import date
+
+from models import Night, Guest, guest_from_dict, guest_to_dict
+
+
+def _rss_mb() -> float:
+    """Aktueller Arbeitsspeicher des Prozesses (Linux: /proc, sonst Spitzenwert)."""
+    try:
+        with open("/proc/self/statm") as f:
+            pages = int(f.read().split()[1])
+        return pages * os.sysconf("SC_PAGE_SIZE") / 1024 / 1024
+    except (OSError, ValueError):
+        import resource
+        # ru_maxrss: Linux in KB, macOS in Bytes
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak / 1024 / (1024 if os.uname().sysname == "Darwin" else 1)
+
+
+def _make_rows(guests: int, nights: int) -> list:
+    rng = random.Random(42)
+    rows = []
+    for i in range(1, guests + 1):
+        price = rng.choice([50.0, 65.0, 80.0])
+        g = Guest(
+            id=i,
+            name=f"Gast {i}",
+            room_number=100 + i % 300,
+            room_category="Einzel",
+            price_per_night=price,
+            nights=[Night(n, rng.random() < 0.7, price) for n in range(1, nights + 1)],
+            checkin_date=date(2025, 3, 1),
+            checkout_date=None if i % 4 else date(2025, 3, 20),
+            status="checked_in" if i % 4 else "checked_out",
+        )
+        rows.append(guest_to_dict(g))
+    return rows
+
+
+def _legacy(row: dict) -> dict:
+    # Altes Speicherformat: eine Map pro Nacht
+    legacy = {k: v for k, v in row.items() if k != "nights_packed"}
+    legacy["nights"] = [
+        {"number": n.number, "paid": n.paid, "price": n.price}
+        for n in guest_from_dict(row).nights
+    ]
+    return legacy
+
+
+def _measure(label: str, fn):
+    gc.collect()
+    rss_before = _rss_mb()
+    start = time.perf_counter()
+    result = fn()
+    elapsed = (time.perf_counter() - start) * 1000
+    gc.collect()
+    print(f"{label:<40}{elapsed:>10.1f}{_rss_mb() - rss_before:>10.1f}")
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--guests", type=int, default=5000)
+    parser.add_argument("--nights", type=int, default=30)
+    args = parser.parse_args()
+
+    rows = _make_rows(args.guests, args.nights)
+    legacy_rows = [_legacy(r) for r in rows]
+
+    print(f"guests={args.guests} nights/guest={args.nights}")
+    print(f"{'Schritt':<40}{'ms':>10}{'RSS MB':>10}")
+
+    # Jede Messung hält ihr Ergebnis, damit der Speicher sichtbar bleibt
+    kept = []
+    kept.append(_measure(
+        "altes Format: dekodieren", lambda: [guest_from_dict(r) for r in legacy_rows]
+    ))
+    kept.append(_measure(
+        "altes Format: + Nächte anfassen", lambda: [len(g.nights) for g in kept[0]]
+    ))
+    guests = _measure(
+        "kompakt: dekodieren (Nächte verzögert)", lambda: [guest_from_dict(r) for r in rows]
+    )
+    kept.append(guests)
+    _measure("kompakt: nur Name/Status lesen", lambda: [(g.name, g.status) for g in guests])
+    _measure("kompakt: Summen (ohne Night-Objekte)", lambda: [g.nights.summary() for g in guests])
+    _measure("kompakt: alle Night-Objekte bauen", lambda: [list(g.nights) for g in guests])
+    _measure("kodieren (guest_to_dict)", lambda: [guest_to_dict(g) for g in guests])
+
+
+if __name__ == "__main__":
+    main()
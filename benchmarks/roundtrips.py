@@ -0,0 +1,69 @@
+"""
+Zählt Firestore-Roundtrips und Laufzeit typischer Aktionen gegen den
+In-Memory-Ersatz (fake_firestore.py) mit simulierter Latenz.
+
+Aufruf (aus dem Projektordner):
+    python -m benchmarks.roundtrips
+    python -m benchmarks.roundtrips --latency-ms 40 --layout documents --guests 500
+"""
+import argparse
+import os
+import time
+
+# Muss vor dem ersten Import von firebase_db gesetzt sein
+os.environ.setdefault("HOTEL_FIRESTORE_BACKEND", "fake")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--latency-ms", type=float, default=0.0)
+    parser.add_argument("--layout", choices=["array", "documents"], default="documents")
+    parser.add_argument("--guests", type=int, default=200)
+    args = parser.parse_args()
+
+    import database
+    import logic
+    from firebase_db import get_db
+
+    db = get_db()
+    database.set_backend(database.FirestoreBackend(layout=args.layout))
+    hotel_id = "bench"
+
+    # Vorbefüllen ohne Latenz
+    db.latency_ms = 0.0
+    for i in range(args.guests):
+        g = logic.add_guest(hotel_id, f"Gast {i}", 1000 + i, "Einzel", 50.0)
+        logic.add_night_to_guest(hotel_id, g.id, True)
+        if i % 2:
+            logic.checkout_guest(hotel_id, g.id)
+
+    db.latency_ms = args.latency_ms
+    target = logic.list_all_guests(hotel_id)[0]
+
+    actions = [
+        ("list_all_guests", lambda: logic.list_all_guests(hotel_id, include_checked_out=True)),
+        ("add_guest", lambda: logic.add_guest(hotel_id, "Neu", 1, "Einzel", 60.0)),
+        ("add_night_to_guest", lambda: logic.add_night_to_guest(hotel_id, target.id, False)),
+        ("set_night_paid_status", lambda: logic.set_night_paid_status(hotel_id, target.id, 1, False)),
+        ("update_guest_details", lambda: logic.update_guest_details(
+            hotel_id, target.id, "Umbenannt", 2, "Doppel", 70.0)),
+        ("checkout_guest", lambda: logic.checkout_guest(hotel_id, target.id)),
+        ("add_guests_bulk (30)", lambda: logic.add_guests_bulk(hotel_id, [
+            {"name": f"Gruppe {i}", "room_number": 5000 + i,
+             "room_category": "Doppel", "price_per_night": 45.0}
+            for i in range(30)
+        ])),
+    ]
+
+    print(f"layout={args.layout} guests={args.guests} latency={args.latency_ms} ms")
+    print(f"{'Aktion':<24}{'RPCs':>6}{'ms':>10}")
+    for name, action in actions:
+        db.reset_stats()
+        start = time.perf_counter()
+        action()
+        elapsed = (time.perf_counter() - start) * 1000
+        print(f"{name:<24}{db.stats()['total']:>6}{elapsed:>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
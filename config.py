@@ -0,0 +1,23 @@
+import os
+import streamlit as st
+
+
+# ---------------------------------------------------------
+# Einstellungen lesen (Umgebungsvariable vor st.secrets)
+# ---------------------------------------------------------
+def get_setting(name: str, default=None):
+    """
+    Liest eine Einstellung.
+    - Zuerst Umgebungsvariable HOTEL_<NAME> (z.B. HOTEL_STORAGE_LAYOUT)
+    - Danach st.secrets["<name>"]
+    - Sonst default
+    """
+    env_value = os.environ.get(f"HOTEL_{name.upper()}")
+    if env_value is not None:
+        return env_value
+
+    try:
+        return st.secrets.get(name, default)
+    except Exception:
+        # Keine secrets.toml vorhanden (z.B. lokale Skripte)
+        return default
@@ -1,57 +1,1225 @@
-from typing import List
+import threading
+from dataclasses import dataclass, field
+from datetime import date
+from typing import Callable, Dict, List, Optional, Tuple
+import models
 from models import (
     Guest,
+    Reservation,
     Room,
+    format_date,
     guest_from_dict,
     guest_to_dict,
+    parse_date,
+    reservation_from_dict,
+    reservation_to_dict,
     room_from_dict,
     room_to_dict,
 )
-from firebase_db import load_json, save_json
+from config import get_setting
+from search_index import GuestSearchIndex
+from tenant_state import TenantState
+
+
+# ---------------------------------------------------------
+# Fehler: gleichzeitige Änderung
+# ---------------------------------------------------------
+class ConcurrentModificationError(Exception):
+    """
+    Ein gelesener Eintrag wurde vor dem Commit von einer anderen Sitzung
+    geändert. Die Aktion muss mit frisch gelesenen Daten wiederholt werden
+    (siehe unit_of_work.run_session).
+    """
+
+
+# ---------------------------------------------------------
+# Änderungen einer Aktion (für einen atomaren Commit)
+# ---------------------------------------------------------
+@dataclass
+class ChangeSet:
+    guests: List[Guest] = field(default_factory=list)
+    deleted_guests: List[int] = field(default_factory=list)
+    rooms: List[Room] = field(default_factory=list)
+    deleted_rooms: List[int] = field(default_factory=list)
+    # Nur für Backends ohne supports_point_reads (Array-Layout):
+    # komplette Listen, die als Ganzes geschrieben werden
+    all_guests: Optional[List[Guest]] = None
+    all_rooms: Optional[List[Room]] = None
+    # Ins Monatsarchiv verschobene Gäste (stehen zusätzlich in deleted_guests)
+    archived: List[Guest] = field(default_factory=list)
+    # Verwaltungsdaten des Hotels (z.B. "night_audit"): doc_id → kompletter Inhalt
+    meta: Dict[str, dict] = field(default_factory=dict)
+    # Änderung der Kennzahlen (meta/aggregates): aufzuaddierende Beträge
+    # und offene Posten pro Gast-ID (None = keiner mehr)
+    aggregates: dict = field(default_factory=dict)
+    open_balances: Dict[str, Optional[dict]] = field(default_factory=dict)
+    # Belegungspläne: Zimmernummer → komplette Reservierungsliste (leer = löschen)
+    calendars: Dict[int, List[Reservation]] = field(default_factory=dict)
+
+
+# ---------------------------------------------------------
+# Gefilterte Abfragen (query_guests)
+# ---------------------------------------------------------
+@dataclass(frozen=True)
+class GuestQuery:
+    """
+    Filter für query_guests; alle optional, mit UND verknüpft.
+    - checkin_from / checkin_to: Datum, von einschließlich, bis ausschließlich
+    Ergebnisse sind nach (checkin_date, id) sortiert; danach blättert der Cursor
+    (gespeicherte Werte des letzten Gastes, Datum als ISO-Text).
+    Die nötigen Firestore-Indizes stehen in firestore.indexes.json
+    (einspielen mit "firebase deploy --only firestore:indexes").
+    """
+    status: Optional[str] = None
+    room_number: Optional[int] = None
+    checkin_from: Optional[date] = None
+    checkin_to: Optional[date] = None
+
+    def filters(self) -> List[Tuple[str, str, object]]:
+        """Als (feld, operator, wert) für Firestore-where bzw. SQL (gespeicherte Form)."""
+        result = []
+        if self.status is not None:
+            result.append(("status", "==", self.status))
+        if self.room_number is not None:
+            result.append(("room_number", "==", self.room_number))
+        if self.checkin_from is not None:
+            result.append(("checkin_date", ">=", self.checkin_from.isoformat()))
+        if self.checkin_to is not None:
+            result.append(("checkin_date", "<", self.checkin_to.isoformat()))
+        return result
+
+    def matches(self, guest: Guest) -> bool:
+        # Ohne Check-in-Datum wie gespeichert ("") vor jedem Datum
+        checkin = guest.checkin_date or date.min
+        return (
+            (self.status is None or guest.status == self.status)
+            and (self.room_number is None or guest.room_number == self.room_number)
+            and (self.checkin_from is None or checkin >= self.checkin_from)
+            and (self.checkin_to is None or checkin < self.checkin_to)
+        )
+
+
+# Sortierung der Abfragen; der Cursor sind diese Werte des letzten Gastes
+QUERY_ORDER = ("checkin_date", "id")
+
+
+def query_sort_key(guest: Guest) -> tuple:
+    return guest.checkin_date or date.min, guest.id
+
+
+def next_cursor(guests: List[Guest], limit: Optional[int]) -> Optional[tuple]:
+    """Cursor für die nächste Seite; None, wenn dies die letzte war."""
+    if limit is None or len(guests) < limit:
+        return None
+    last = guests[-1]
+    return format_date(last.checkin_date) or "", last.id
+
+
+def filter_guests(
+    guests: List[Guest],
+    query: GuestQuery,
+    limit: Optional[int] = None,
+    cursor: Optional[tuple] = None,
+) -> Tuple[List[Guest], Optional[tuple]]:
+    """query_guests im Speicher (Array-Layout, gecachte Listen)."""
+    result = sorted((g for g in guests if query.matches(g)), key=query_sort_key)
+    if cursor is not None:
+        after = (parse_date(cursor[0]) or date.min, cursor[1])
+        result = [g for g in result if query_sort_key(g) > after]
+    if limit is not None:
+        result = result[:limit]
+    return result, next_cursor(result, limit)
+
+
+# ---------------------------------------------------------
+# Archiv: abgereiste Gäste nach Monat
+# ---------------------------------------------------------
+# Ausgecheckte Gäste wandern nach einer Frist aus der aktiven Gästeliste
+# in eine Partition pro Check-in-Monat ("YYYY-MM"). Die aktive Liste bleibt
+# damit so groß wie die aktuelle Belegung; Berichte lesen nur die Monate,
+# die sie anzeigen. Eine Zusammenfassung (Kennzahlen pro Monat, Nächte pro
+# Zimmer) wird beim Archivieren mitgeführt, damit das Dashboard das Archiv
+# nicht lesen muss:
+#     {"months": {"2025-03": {"guests": 4, "count_paid": 12, ...}},
+#      "room_nights": {"101": 30, ...}}
+def archive_month(guest: Guest) -> Optional[str]:
+    """Archiv-Partition eines Gastes (Monat des Check-ins) oder None."""
+    checkin = guest.checkin_date
+    if checkin is None:
+        return None
+    return f"{checkin.year:04d}-{checkin.month:02d}"
+
+
+def empty_archive_summary() -> dict:
+    return {"months": {}, "room_nights": {}}
+
+
+def archive_summary_delta(guests: List[Guest]) -> dict:
+    """Beitrag der Gäste zur Archiv-Zusammenfassung (zum Aufaddieren)."""
+    summary = empty_archive_summary()
+    for g in guests:
+        count_paid, count_unpaid, sum_paid, sum_unpaid = g.nights.summary()
+
+        month = summary["months"].setdefault(archive_month(g), {
+            "guests": 0, "count_paid": 0, "count_unpaid": 0,
+            "sum_paid": 0.0, "sum_unpaid": 0.0,
+        })
+        month["guests"] += 1
+        month["count_paid"] += count_paid
+        month["count_unpaid"] += count_unpaid
+        month["sum_paid"] += sum_paid
+        month["sum_unpaid"] += sum_unpaid
+
+        room = str(g.room_number)
+        summary["room_nights"][room] = (
+            summary["room_nights"].get(room, 0) + count_paid + count_unpaid
+        )
+    return summary
+
+
+# ---------------------------------------------------------
+# Kennzahlen pro Hotel (Dashboard)
+# ---------------------------------------------------------
+# meta/aggregates enthält alles, was das Dashboard braucht – aktive und
+# archivierte Gäste zusammen:
+#     {"months": {"2025-03": {"count_paid": 12, "count_unpaid": 2,
+#                             "sum_paid": 600.0, "sum_unpaid": 100.0}},
+#      "room_nights": {"101": 30},
+#      "guests": {"checked_in": 5, "checked_out": 2, "archived": 40},
+#      "open_balances": {"7": {"name": ..., "room_number": 101,
+#                              "count_unpaid": 2, "sum_unpaid": 100.0}},
+#      "built": "2025-03-01"}
+# TenantSession.commit schreibt nur die Differenz der geänderten Gäste
+# (Zähler serverseitig hochgezählt); logic.rebuild_aggregates baut das
+# Dokument komplett neu auf ("built" = Datum des letzten Neuaufbaus).
+AGGREGATES_DOC_ID = "aggregates"
+
+
+def empty_aggregates() -> dict:
+    return {"months": {}, "room_nights": {}, "guests": {}, "open_balances": {}}
+
+
+def guest_aggregates(guest: Guest, status: Optional[str] = None) -> dict:
+    """Beitrag eines Gastes zu den aufaddierten Kennzahlen."""
+    count_paid, count_unpaid, sum_paid, sum_unpaid = guest.nights.summary()
+    result = {
+        "guests": {status or guest.status: 1},
+        "room_nights": {str(guest.room_number): count_paid + count_unpaid},
+    }
+    month = archive_month(guest)
+    if month is not None:
+        result["months"] = {month: {
+            "count_paid": count_paid, "count_unpaid": count_unpaid,
+            "sum_paid": sum_paid, "sum_unpaid": sum_unpaid,
+        }}
+    return result
+
+
+def open_balance(guest: Guest) -> Optional[dict]:
+    """Offener Posten eines Gastes für das Dashboard (oder None)."""
+    _, count_unpaid, _, sum_unpaid = guest.nights.summary()
+    if count_unpaid > 0 and sum_unpaid > 0:
+        return {
+            "name": guest.name, "room_number": guest.room_number,
+            "count_unpaid": count_unpaid, "sum_unpaid": sum_unpaid,
+        }
+    return None
+
+
+def add_counts(target: dict, delta: dict, sign: int = 1) -> dict:
+    """Addiert verschachtelte Zahlen aus delta (mal sign) in target; Nullen entfallen."""
+    for key, value in delta.items():
+        if isinstance(value, dict):
+            sub = add_counts(target.get(key) or {}, value, sign)
+            if sub:
+                target[key] = sub
+            else:
+                target.pop(key, None)
+        else:
+            total = target.get(key, 0) + sign * value
+            if total:
+                target[key] = total
+            else:
+                target.pop(key, None)
+    return target
+
+
+# ---------------------------------------------------------
+# Schnittstelle: Speicher-Backend
+# ---------------------------------------------------------
+class StorageBackend:
+    """
+    Gemeinsame Schnittstelle aller Speicher-Backends.
+    - FirestoreBackend: Cloud (Standard)
+    - SqliteBackend:    lokale Datei (sqlite_db.py), z.B. für Einzelstandorte,
+                        Offline-Tests und Benchmarks
+    """
+
+    name = "abstract"
+
+    # True, wenn einzelne Gäste/Zimmer ohne die ganze Sammlung gelesen und
+    # geschrieben werden können (Dokument-Layout, SQLite). Sonst arbeitet
+    # TenantSession immer mit der kompletten Liste.
+    supports_point_reads = False
+
+    # Lesende Methoden akzeptieren versions (dict): das Backend trägt dort
+    # die gelesenen Versionen ein; commit() schreibt diese Einträge nur,
+    # wenn sie seitdem unverändert sind (optimistische Nebenläufigkeit).
+
+    # Gäste
+    def load_guests(self, hotel_id: str, versions: Optional[dict] = None) -> List[Guest]:
+        raise NotImplementedError
+
+    def save_guests(self, hotel_id: str, guests: List[Guest]) -> None:
+        raise NotImplementedError
+
+    def query_guests(
+        self,
+        hotel_id: str,
+        query: GuestQuery,
+        limit: Optional[int] = None,
+        cursor: Optional[tuple] = None,
+    ) -> Tuple[List[Guest], Optional[tuple]]:
+        """
+        Gäste, die query erfüllen: höchstens limit, nach cursor (von der Vorseite).
+        Ergebnis: (gäste, cursor für die nächste Seite oder None).
+        Standard: alle laden und im Speicher filtern – Backends mit Einzel-
+        dokumenten/Zeilen filtern beim Server.
+        """
+        return filter_guests(self.load_guests(hotel_id), query, limit, cursor)
+
+    def get_guest(self, hotel_id: str, guest_id: int, versions: Optional[dict] = None) -> Optional[Guest]:
+        raise NotImplementedError
+
+    def save_guest(self, hotel_id: str, guest: Guest) -> None:
+        raise NotImplementedError
+
+    def delete_guest(self, hotel_id: str, guest_id: int) -> None:
+        raise NotImplementedError
+
+    # Zimmer
+    def load_rooms(self, hotel_id: str, versions: Optional[dict] = None) -> List[Room]:
+        raise NotImplementedError
+
+    def save_rooms(self, hotel_id: str, rooms: List[Room]) -> None:
+        raise NotImplementedError
+
+    def get_room(self, hotel_id: str, room_number: int, versions: Optional[dict] = None) -> Optional[Room]:
+        raise NotImplementedError
+
+    def save_room(self, hotel_id: str, room: Room) -> None:
+        raise NotImplementedError
+
+    def delete_room(self, hotel_id: str, room_number: int) -> None:
+        raise NotImplementedError
+
+    # Archiv
+    def load_archive(self, hotel_id: str, month: str) -> List[Guest]:
+        """Archivierte Gäste eines Check-in-Monats ("YYYY-MM")."""
+        raise NotImplementedError
+
+    def archive_summary(self, hotel_id: str) -> dict:
+        """Zusammenfassung des Archivs (siehe archive_summary_delta)."""
+        raise NotImplementedError
+
+    def archive_index(self, hotel_id: str) -> Dict[int, dict]:
+        """
+        Alle archivierten Gäste als {id: {"month": "YYYY-MM", "name": ...}}
+        – für Suche und Nachschlagen, ohne die Gäste selbst zu laden.
+        """
+        raise NotImplementedError
+
+    def get_archived_guests(self, hotel_id: str, guest_ids: List[int]) -> List[Guest]:
+        """Archivierte Gäste nach ID (Reihenfolge wie guest_ids, fehlende entfallen)."""
+        raise NotImplementedError
+
+    # Belegungspläne (reservations.py)
+    def get_calendar(
+        self, hotel_id: str, room_number: int, versions: Optional[dict] = None
+    ) -> List[Reservation]:
+        """
+        Reservierungen eines Zimmers. Geschrieben wird der Plan über
+        ChangeSet.calendars; versions-Schlüssel ist ("calendars", zimmer).
+        """
+        raise NotImplementedError
+
+    def load_calendars(self, hotel_id: str) -> Dict[int, List[Reservation]]:
+        """Belegungspläne aller Zimmer mit Reservierungen."""
+        raise NotImplementedError
+
+    def get_room_calendars(
+        self,
+        hotel_id: str,
+        room_numbers: List[int],
+        versions: Optional[dict] = None,
+        rooms: bool = True,
+    ) -> Tuple[Dict[int, Room], Dict[int, List[Reservation]]]:
+        """
+        Zimmer und Belegungspläne mehrerer Zimmer auf einmal (rooms=False: nur
+        die Pläne). Fehlende Zimmer fehlen im ersten dict, Zimmer ohne Plan
+        haben []. Standard: einzeln gelesen – Backends mit Netzwerk-Roundtrip
+        lesen alles in einem.
+        """
+        found = {}
+        if rooms:
+            for number in room_numbers:
+                room = self.get_room(hotel_id, number, versions=versions)
+                if room is not None:
+                    found[number] = room
+        calendars = {
+            number: self.get_calendar(hotel_id, number, versions=versions)
+            for number in room_numbers
+        }
+        return found, calendars
+
+    # Mandanten
+    def list_hotel_ids(self) -> List[str]:
+        """IDs aller Hotels mit gespeicherten Daten (für Jobs über alle Mandanten)."""
+        raise NotImplementedError
+
+    # Verwaltungsdaten
+    def get_meta(self, hotel_id: str, doc_id: str, versions: Optional[dict] = None) -> Optional[dict]:
+        """
+        Verwaltungsdokument eines Hotels (z.B. "night_audit") oder None.
+        Geschrieben wird es über ChangeSet.meta im selben commit() wie die
+        Gäste; versions-Schlüssel ist ("meta", doc_id).
+        """
+        raise NotImplementedError
+
+    # Gast-IDs
+    def allocate_guest_ids(self, hotel_id: str, count: int = 1) -> int:
+        """
+        Reserviert count neue Gast-IDs über einen Zähler pro Hotel und gibt
+        die erste zurück (Block: erste .. erste + count - 1).
+        - atomar: gleichzeitige Aufrufe erhalten nie dieselbe ID
+        - IDs werden nie wieder vergeben, auch nach Löschen oder Archivieren
+        - beim ersten Aufruf startet der Zähler bei der höchsten bestehenden ID
+          (aktive und archivierte Gäste)
+        Innerhalb von run_transaction zählt der Zähler nur mit, wenn die
+        Transaktion abgeschlossen wird.
+        """
+        raise NotImplementedError
+
+    # Atomares Schreiben
+    def commit(self, hotel_id: str, changes: ChangeSet, versions: Optional[dict] = None) -> None:
+        """
+        Schreibt alle Änderungen gemeinsam in einem Roundtrip (alles oder nichts).
+        Wirft ConcurrentModificationError, wenn ein in versions vermerkter
+        Eintrag inzwischen geändert wurde.
+        """
+        raise NotImplementedError
+
+    def run_transaction(self, hotel_id: str, fn: Callable, max_attempts: int = 5):
+        """
+        Führt fn(backend) transaktional aus und gibt dessen Ergebnis zurück.
+        - Lese- und Schreibzugriffe über das übergebene backend sind isoliert.
+        - Bei Konflikten mit gleichzeitigen Sitzungen wird fn wiederholt.
+        """
+        raise NotImplementedError
+
+    # Änderungen erkennen
+    def data_versions(self, hotel_id: str) -> Optional[dict]:
+        """
+        Änderungszähler {"guests": n, "rooms": m, ...} eines Hotels
+        ("archive" zählt Archivläufe).
+        Jede Änderung erhöht den Zähler ihrer Art; ist er gleich geblieben,
+        kann eine bereits geladene Liste weiterverwendet werden.
+        None, wenn das Backend keine Zähler führt.
+        """
+        return None
+
+    def watch(self, hotel_id: str, kind: str, callback: Callable) -> Optional[Callable]:
+        """
+        Ruft callback(liste) mit dem neuen Stand auf, sobald sich Gäste
+        (kind "guests") bzw. Zimmer ("rooms") eines Hotels ändern.
+        Gibt eine Funktion zum Beenden zurück – oder None, wenn das Backend
+        keine Benachrichtigungen kennt (dann prüft der Cache data_versions).
+        """
+        return None
+
+
+# ---------------------------------------------------------
+# Firestore-Backend
+# ---------------------------------------------------------
+class FirestoreBackend(StorageBackend):
+    """
+    Firestore unter hotel_app/<hotel_id>/...
+    - layout "array":     alle Einträge in einem Dokument <subpath>/data (alt)
+    - layout "documents": ein Dokument pro Gast bzw. Zimmer
+                          (siehe migrate_storage.py)
+    """
+
+    name = "firestore"
+
+    def __init__(self, layout: str = "array", transaction=None):
+        # Erst hier importieren: andere Backends brauchen keine Firestore-Verbindung
+        import firebase_db
+
+        self.fs = firebase_db
+        self.layout = layout
+        self.supports_point_reads = layout == "documents"
+        # Gesetzt innerhalb von run_transaction: alle Zugriffe laufen darüber
+        self.transaction = transaction
+
+    def _use_documents(self) -> bool:
+        return self.layout == "documents"
+
+    # --- Versionen ---------------------------------------
+    # Sitzungen nutzen Schlüssel (kind, id), z.B. ("guests", 3);
+    # firebase_db arbeitet mit (path, doc_id), z.B. ("h1/gaeste", "3").
+    # Im Array-Layout trägt das ganze "data"-Dokument die Version.
+    KINDS = {"gaeste": "guests", "raeume": "rooms", "belegung": "calendars"}
+
+    def _import_versions(self, versions, raw) -> None:
+        if versions is None:
+            return
+        for (path, doc_id), version in raw.items():
+            subpath = path.split("/", 1)[1]
+            key = int(doc_id) if doc_id.lstrip("-").isdigit() else doc_id
+            versions.setdefault((self.KINDS.get(subpath, subpath), key), version)
+
+    def _export_versions(self, hotel_id: str, versions) -> Optional[dict]:
+        if versions is None:
+            return None
+        paths = {kind: subpath for subpath, kind in self.KINDS.items()}
+        return {
+            (f"{hotel_id}/{paths.get(kind, kind)}", str(key)): version
+            for (kind, key), version in versions.items()
+        }
+
+    # --- generisch ----------------------------------------
+    def _load_all(self, path: str, versions=None) -> list:
+        raw = {} if versions is not None else None
+        if self._use_documents():
+            items = self.fs.load_documents(path, transaction=self.transaction, versions=raw)
+        else:
+            items = self.fs.load_json(path, transaction=self.transaction, versions=raw)
+        self._import_versions(versions, raw)
+        return items
+
+    # --- Datenversion ------------------------------------
+    # hotel_app/<hotel_id>/meta/version zählt pro Art ("guests", "rooms")
+    # jede Änderung mit – im selben Batch wie die Änderung selbst.
+    # Leser vergleichen nur diese Zahlen (siehe data_versions).
+    META_SUBPATH = "meta"
+    VERSION_DOC_ID = "version"
+
+    def _version_increments(self, paths) -> list:
+        bumps = {}
+        for path in paths:
+            hotel_id, subpath = path.split("/", 1)
+            kind = self.KINDS.get(subpath)
+            if kind is not None:
+                bumps.setdefault(hotel_id, {})[kind] = 1
+        return [
+            (f"{hotel_id}/{self.META_SUBPATH}", self.VERSION_DOC_ID, fields)
+            for hotel_id, fields in bumps.items()
+        ]
+
+    def data_versions(self, hotel_id: str) -> Optional[dict]:
+        data = self.fs.load_document(
+            f"{hotel_id}/{self.META_SUBPATH}", self.VERSION_DOC_ID,
+            transaction=self.transaction,
+        ) or {}
+        return {kind: int(data.get(kind, 0)) for kind in (*self.KINDS.values(), "archive")}
+
+    def _write(self, writes, versions=None, increments=(), appends=(), merges=()) -> None:
+        try:
+            self.fs.write_documents(
+                writes,
+                transaction=self.transaction,
+                versions=versions,
+                increments=self._version_increments(path for path, _, _ in writes)
+                + list(increments),
+                appends=list(appends),
+                merges=list(merges),
+            )
+        except self.fs.conflict_errors() as e:
+            raise ConcurrentModificationError(str(e)) from e
+
+    def _array_write(self, path: str, items: list):
+        return (path, self.fs.LEGACY_DOC_ID, {"data": items})
+
+    def _save_all(self, path: str, items: dict) -> None:
+        if self._use_documents():
+            self.fs.save_documents(path, items)
+            self.fs.write_documents([], increments=self._version_increments([path]))
+        else:
+            self._write([self._array_write(path, list(items.values()))])
+
+    def _get_one(self, path: str, key: str, value, versions=None) -> Optional[dict]:
+        if self._use_documents():
+            raw = {} if versions is not None else None
+            item = self.fs.load_document(path, value, transaction=self.transaction, versions=raw)
+            self._import_versions(versions, raw)
+            return item
+        for item in self._load_all(path, versions=versions):
+            if item.get(key) == value:
+                return item
+        return None
+
+    def _save_one(self, path: str, key: str, data: dict) -> None:
+        if self._use_documents():
+            self._write([(path, data[key], data)])
+            return
+
+        items = self._load_all(path)
+        for i, item in enumerate(items):
+            if item.get(key) == data[key]:
+                items[i] = data
+                break
+        else:
+            items.append(data)
+        self._write([self._array_write(path, items)])
+
+    def _delete_one(self, path: str, key: str, value) -> None:
+        if self._use_documents():
+            self._write([(path, value, None)])
+            return
+
+        items = [item for item in self._load_all(path) if item.get(key) != value]
+        self._write([self._array_write(path, items)])
+
+    # --- Gäste --------------------------------------------
+    def load_guests(self, hotel_id: str, versions: Optional[dict] = None) -> List[Guest]:
+        guests = [
+            guest_from_dict(item)
+            for item in self._load_all(f"{hotel_id}/gaeste", versions=versions)
+        ]
+        if self._use_documents():
+            guests.sort(key=lambda g: g.id)
+        return guests
+
+    def save_guests(self, hotel_id: str, guests: List[Guest]) -> None:
+        self._save_all(f"{hotel_id}/gaeste", {g.id: guest_to_dict(g) for g in guests})
+
+    def get_guest(self, hotel_id: str, guest_id: int, versions: Optional[dict] = None) -> Optional[Guest]:
+        data = self._get_one(f"{hotel_id}/gaeste", "id", guest_id, versions=versions)
+        return guest_from_dict(data) if data is not None else None
+
+    def save_guest(self, hotel_id: str, guest: Guest) -> None:
+        self._save_one(f"{hotel_id}/gaeste", "id", guest_to_dict(guest))
+
+    def delete_guest(self, hotel_id: str, guest_id: int) -> None:
+        self._delete_one(f"{hotel_id}/gaeste", "id", guest_id)
+
+    def query_guests(
+        self,
+        hotel_id: str,
+        query: GuestQuery,
+        limit: Optional[int] = None,
+        cursor: Optional[tuple] = None,
+    ) -> Tuple[List[Guest], Optional[tuple]]:
+        if not self._use_documents():
+            # Ein Dokument für alle Gäste: filtern lässt sich nur lokal
+            return super().query_guests(hotel_id, query, limit, cursor)
+
+        items = self.fs.query_documents(
+            f"{hotel_id}/gaeste",
+            filters=query.filters(),
+            order_by=QUERY_ORDER,
+            limit=limit,
+            start_after=cursor,
+            transaction=self.transaction,
+        )
+        guests = [guest_from_dict(item) for item in items]
+        return guests, next_cursor(guests, limit)
+
+    # --- Zimmer -------------------------------------------
+    def load_rooms(self, hotel_id: str, versions: Optional[dict] = None) -> List[Room]:
+        rooms = [
+            room_from_dict(item)
+            for item in self._load_all(f"{hotel_id}/raeume", versions=versions)
+        ]
+        if self._use_documents():
+            rooms.sort(key=lambda r: r.number)
+        return rooms
+
+    def save_rooms(self, hotel_id: str, rooms: List[Room]) -> None:
+        self._save_all(f"{hotel_id}/raeume", {r.number: room_to_dict(r) for r in rooms})
+
+    def get_room(self, hotel_id: str, room_number: int, versions: Optional[dict] = None) -> Optional[Room]:
+        data = self._get_one(f"{hotel_id}/raeume", "number", room_number, versions=versions)
+        return room_from_dict(data) if data is not None else None
+
+    def save_room(self, hotel_id: str, room: Room) -> None:
+        self._save_one(f"{hotel_id}/raeume", "number", room_to_dict(room))
+
+    def delete_room(self, hotel_id: str, room_number: int) -> None:
+        self._delete_one(f"{hotel_id}/raeume", "number", room_number)
+
+    # --- Archiv ------------------------------------------
+    # hotel_app/<hotel_id>/archiv/<YYYY-MM>/gaeste/<id>  ein Dokument pro Gast
+    # hotel_app/<hotel_id>/archiv_index/<id // 1000>     {"<id>": {"month", "name"}}
+    # hotel_app/<hotel_id>/meta/archiv                   Zusammenfassung
+    # In beiden Layouts Einzeldokumente: ein Monat wächst unbegrenzt und
+    # würde als ein Dokument an die Größengrenze (1 MiB) stoßen. Der Index
+    # führt zu jeder ID den Monat (Nachschlagen) und den Namen (Suche),
+    # aufgeteilt auf Dokumente mit je höchstens 1000 IDs.
+    ARCHIVE_SUBPATH = "archiv"
+    ARCHIVE_SUMMARY_DOC_ID = "archiv"
+    ARCHIVE_INDEX_SUBPATH = "archiv_index"
+    ARCHIVE_INDEX_SHARD = 1000
+
+    def _archive_path(self, hotel_id: str, month: str) -> str:
+        return f"{hotel_id}/{self.ARCHIVE_SUBPATH}/{month}/gaeste"
+
+    def load_archive(self, hotel_id: str, month: str) -> List[Guest]:
+        guests = [
+            guest_from_dict(item)
+            for item in self.fs.load_documents(
+                self._archive_path(hotel_id, month), transaction=self.transaction
+            )
+        ]
+        guests.sort(key=lambda g: g.id)
+        return guests
+
+    def archive_index(self, hotel_id: str) -> Dict[int, dict]:
+        index = {}
+        for shard in self.fs.load_documents(
+            f"{hotel_id}/{self.ARCHIVE_INDEX_SUBPATH}", transaction=self.transaction
+        ):
+            index.update({int(guest_id): entry for guest_id, entry in shard.items()})
+        return index
+
+    def get_archived_guests(self, hotel_id: str, guest_ids: List[int]) -> List[Guest]:
+        # Zwei get_all: Index-Dokumente der IDs, dann die Gäste in ihren Monaten
+        index_path = f"{hotel_id}/{self.ARCHIVE_INDEX_SUBPATH}"
+        shards = self.fs.load_documents_by_id(
+            [(index_path, gid // self.ARCHIVE_INDEX_SHARD) for gid in guest_ids],
+            transaction=self.transaction,
+        )
+        keys = []
+        for gid in guest_ids:
+            shard = shards.get((index_path, str(gid // self.ARCHIVE_INDEX_SHARD))) or {}
+            entry = shard.get(str(gid))
+            if entry is not None:
+                keys.append((self._archive_path(hotel_id, entry["month"]), gid))
+
+        docs = self.fs.load_documents_by_id(keys, transaction=self.transaction)
+        return [
+            guest_from_dict(docs[(path, str(gid))])
+            for path, gid in keys
+            if docs.get((path, str(gid))) is not None
+        ]
+
+    def archive_summary(self, hotel_id: str) -> dict:
+        data = self.fs.load_document(
+            f"{hotel_id}/{self.META_SUBPATH}", self.ARCHIVE_SUMMARY_DOC_ID,
+            transaction=self.transaction,
+        ) or {}
+        summary = empty_archive_summary()
+        summary.update({key: data[key] for key in summary if key in data})
+        return summary
+
+    # --- Belegungspläne ----------------------------------
+    # hotel_app/<hotel_id>/belegung/<zimmer>  {"room_number", "reservations": [...]}
+    # In beiden Layouts ein Dokument pro Zimmer
+    CALENDAR_SUBPATH = "belegung"
+
+    @staticmethod
+    def _decode_calendar(data: Optional[dict]) -> List[Reservation]:
+        return [reservation_from_dict(item) for item in (data or {}).get("reservations", [])]
+
+    def get_calendar(
+        self, hotel_id: str, room_number: int, versions: Optional[dict] = None
+    ) -> List[Reservation]:
+        raw = {} if versions is not None else None
+        data = self.fs.load_document(
+            f"{hotel_id}/{self.CALENDAR_SUBPATH}", room_number,
+            transaction=self.transaction, versions=raw,
+        )
+        self._import_versions(versions, raw)
+        return self._decode_calendar(data)
+
+    def get_room_calendars(
+        self,
+        hotel_id: str,
+        room_numbers: List[int],
+        versions: Optional[dict] = None,
+        rooms: bool = True,
+    ) -> Tuple[Dict[int, Room], Dict[int, List[Reservation]]]:
+        # Ein get_all für Zimmer- und Plan-Dokumente; im Array-Layout
+        # kommen die Zimmer aus dem einen "data"-Dokument
+        rooms_path = f"{hotel_id}/raeume"
+        calendar_path = f"{hotel_id}/{self.CALENDAR_SUBPATH}"
+        keys = [(calendar_path, n) for n in room_numbers]
+        if rooms and self._use_documents():
+            keys += [(rooms_path, n) for n in room_numbers]
+
+        raw = {} if versions is not None else None
+        docs = self.fs.load_documents_by_id(keys, transaction=self.transaction, versions=raw)
+        self._import_versions(versions, raw)
+
+        found = {}
+        if rooms and self._use_documents():
+            for number in room_numbers:
+                data = docs.get((rooms_path, str(number)))
+                if data is not None:
+                    found[number] = room_from_dict(data)
+        elif rooms:
+            wanted = set(room_numbers)
+            found = {
+                r.number: r for r in self.load_rooms(hotel_id, versions=versions)
+                if r.number in wanted
+            }
+
+        calendars = {
+            number: self._decode_calendar(docs.get((calendar_path, str(number))))
+            for number in room_numbers
+        }
+        return found, calendars
+
+    def load_calendars(self, hotel_id: str) -> Dict[int, List[Reservation]]:
+        return {
+            data["room_number"]: self._decode_calendar(data)
+            for data in self.fs.load_documents(
+                f"{hotel_id}/{self.CALENDAR_SUBPATH}", transaction=self.transaction
+            )
+        }
+
+    # --- Mandanten ---------------------------------------
+    def list_hotel_ids(self) -> List[str]:
+        return self.fs.list_hotel_ids()
+
+    # --- Verwaltungsdaten --------------------------------
+    def get_meta(self, hotel_id: str, doc_id: str, versions: Optional[dict] = None) -> Optional[dict]:
+        raw = {} if versions is not None else None
+        data = self.fs.load_document(
+            f"{hotel_id}/{self.META_SUBPATH}", doc_id, transaction=self.transaction, versions=raw
+        )
+        self._import_versions(versions, raw)
+        return data
+
+    # --- Gast-IDs ----------------------------------------
+    # hotel_app/<hotel_id>/meta/counters  {"guest_id": zuletzt vergebene ID}
+    COUNTERS_DOC_ID = "counters"
+
+    def allocate_guest_ids(self, hotel_id: str, count: int = 1) -> int:
+        path = f"{hotel_id}/{self.META_SUBPATH}"
+
+        def _allocate(tx) -> int:
+            data = self.fs.load_document(path, self.COUNTERS_DOC_ID, transaction=tx) or {}
+            last = data.get("guest_id")
+            step = count
+            if last is None:
+                # Noch kein Zähler: bei der höchsten bestehenden ID beginnen,
+                # archivierte Gäste eingeschlossen (Archiv-Index)
+                backend = FirestoreBackend(self.layout, transaction=tx)
+                ids = [g.id for g in backend.load_guests(hotel_id)]
+                ids += backend.archive_index(hotel_id)
+                last = max(ids, default=0)
+                step += last
+            # Increment statt fester Wert: das Lesen oben macht die Transaktion
+            # bei gleichzeitigen Aufrufen ungültig, Firestore wiederholt sie
+            self.fs.write_documents(
+                [], transaction=tx,
+                increments=[(path, self.COUNTERS_DOC_ID, {"guest_id": step})],
+            )
+            return int(last) + 1
+
+        if self.transaction is not None:
+            # Zusammen mit den übrigen Änderungen der laufenden Transaktion
+            return _allocate(self.transaction)
+        return self.fs.run_transaction(_allocate)
+
+    def _archive_writes(self, hotel_id: str, guests: List[Guest]):
+        if not guests:
+            return [], [], []
+
+        writes = [
+            (self._archive_path(hotel_id, archive_month(g)), g.id, guest_to_dict(g))
+            for g in guests
+        ]
+        shards: Dict[int, dict] = {}
+        for g in guests:
+            shards.setdefault(g.id // self.ARCHIVE_INDEX_SHARD, {})[str(g.id)] = {
+                "month": archive_month(g), "name": g.name,
+            }
+        merges = [
+            (f"{hotel_id}/{self.ARCHIVE_INDEX_SUBPATH}", shard, entries)
+            for shard, entries in shards.items()
+        ]
+
+        meta_path = f"{hotel_id}/{self.META_SUBPATH}"
+        increments = [
+            (meta_path, self.ARCHIVE_SUMMARY_DOC_ID, archive_summary_delta(guests)),
+            (meta_path, self.VERSION_DOC_ID, {"archive": 1}),
+        ]
+        return writes, increments, merges
+
+    # --- Atomares Schreiben -------------------------------
+    def commit(self, hotel_id: str, changes: ChangeSet, versions: Optional[dict] = None) -> None:
+        """
+        Ein WriteBatch (bzw. die laufende Transaktion) für Gäste und Zimmer.
+        Gelesene Dokumente werden nur mit update_time-Vorbedingung geschrieben.
+        Archivierte Gäste werden im selben Batch in ihren Monat geschrieben.
+        """
+        guests_path = f"{hotel_id}/gaeste"
+        rooms_path = f"{hotel_id}/raeume"
+        writes = []
+
+        if self._use_documents():
+            writes += [(guests_path, g.id, guest_to_dict(g)) for g in changes.guests]
+            writes += [(guests_path, gid, None) for gid in changes.deleted_guests]
+            writes += [(rooms_path, r.number, room_to_dict(r)) for r in changes.rooms]
+            writes += [(rooms_path, number, None) for number in changes.deleted_rooms]
+        else:
+            if changes.all_guests is not None:
+                writes.append(self._array_write(
+                    guests_path, [guest_to_dict(g) for g in changes.all_guests]
+                ))
+            if changes.all_rooms is not None:
+                writes.append(self._array_write(
+                    rooms_path, [room_to_dict(r) for r in changes.all_rooms]
+                ))
+
+        writes += [
+            (f"{hotel_id}/{self.META_SUBPATH}", doc_id, data)
+            for doc_id, data in changes.meta.items()
+        ]
+        writes += [
+            (
+                f"{hotel_id}/{self.CALENDAR_SUBPATH}", room_number,
+                {
+                    "room_number": room_number,
+                    "reservations": [reservation_to_dict(r) for r in reservations],
+                } if reservations else None,
+            )
+            for room_number, reservations in changes.calendars.items()
+        ]
+
+        archive_writes, increments, merges = self._archive_writes(hotel_id, changes.archived)
+        writes += archive_writes
+
+        meta_path = f"{hotel_id}/{self.META_SUBPATH}"
+        if changes.aggregates:
+            increments.append((meta_path, AGGREGATES_DOC_ID, changes.aggregates))
+        if changes.open_balances:
+            merges.append((meta_path, AGGREGATES_DOC_ID, {"open_balances": changes.open_balances}))
+
+        # In einer Transaktion prüft Firestore selbst auf Konflikte
+        if self.transaction is not None:
+            versions = None
+        self._write(
+            writes,
+            versions=self._export_versions(hotel_id, versions),
+            increments=increments,
+            merges=merges,
+        )
+
+    def run_transaction(self, hotel_id: str, fn: Callable, max_attempts: int = 5):
+        return self.fs.run_transaction(
+            lambda tx: fn(FirestoreBackend(self.layout, transaction=tx)),
+            max_attempts=max_attempts,
+        )
+
+    # --- Änderungen beobachten ----------------------------
+    def watch(self, hotel_id: str, kind: str, callback: Callable) -> Optional[Callable]:
+        if kind == "guests":
+            path, decode, sort_key = f"{hotel_id}/gaeste", guest_from_dict, lambda g: g.id
+        else:
+            path, decode, sort_key = f"{hotel_id}/raeume", room_from_dict, lambda r: r.number
+
+        def _on_change(items):
+            # Läuft im Listener-Thread von Firestore
+            try:
+                result = [decode(item) for item in items]
+            except Exception:
+                # Unlesbarer Stand → Cache leeren, nächstes Lesen lädt direkt
+                callback(None)
+                return
+            if self._use_documents():
+                result.sort(key=sort_key)
+            callback(result)
+
+        if self._use_documents():
+            return self.fs.watch_documents(path, _on_change)
+        return self.fs.watch_json(path, _on_change)
+
+
+# ---------------------------------------------------------
+# Backend-Auswahl
+# ---------------------------------------------------------
+_backend: Optional[StorageBackend] = None
+
+
+def create_backend() -> StorageBackend:
+    """
+    Erzeugt das konfigurierte Backend.
+    - storage_backend: "firestore" (Standard) oder "sqlite"
+    - storage_layout:  "array" (Standard) oder "documents" (nur Firestore)
+    - sqlite_path:     Datei für SQLite (Standard: hotel.db)
+    - legacy_nights:   "on" (Standard) schreibt die alte Nächte-Liste mit,
+                       "off" nur noch nights_packed
+    """
+    models.WRITE_LEGACY_NIGHTS = get_setting("legacy_nights", "on") != "off"
+
+    kind = get_setting("storage_backend", "firestore")
+
+    if kind == "sqlite":
+        from sqlite_db import SqliteBackend
+        return SqliteBackend(get_setting("sqlite_path", "hotel.db"))
+
+    if kind == "firestore":
+        return FirestoreBackend(layout=get_setting("storage_layout", "array"))
+
+    raise ValueError(f"Unbekanntes Speicher-Backend: {kind}")
+
+
+def get_backend() -> StorageBackend:
+    global _backend
+    if _backend is None:
+        _backend = create_backend()
+    return _backend
+
+
+def set_backend(backend: Optional[StorageBackend]) -> None:
+    """Backend explizit setzen (Tests, Benchmarks). None → neu aus Konfiguration."""
+    global _backend
+    _backend = backend
+    _reset_cache()
+    _id_blocks.clear()
+
+
+# ---------------------------------------------------------
+# Gemeinsamer Lese-Cache (tenant_cache.py)
+# ---------------------------------------------------------
+# load_guests / load_rooms lesen über einen prozessweiten Cache, den sich
+# alle Streamlit-Sitzungen teilen. Schreibende Aktionen (TenantSession)
+# lesen immer direkt vom Backend.
+# - tenant_cache:        "on" (Standard) oder "off"
+# - cache_refresh:       "listener" (Standard): Listener hält den Cache aktuell
+#                        "version": vor jedem Lesen nur den Änderungszähler
+#                        prüfen (data_versions), kein Dauer-Listener
+# - cache_max_tenants:   höchstens so viele Hotels im Speicher (Standard 50)
+# - cache_idle_seconds:  Hotels ohne Zugriff werden danach verworfen (600)
+_cache = None
+
+
+def get_cache():
+    global _cache
+    if _cache is None and get_setting("tenant_cache", "on") != "off":
+        from tenant_cache import TenantCache
+        _cache = TenantCache(
+            get_backend(),
+            max_tenants=int(get_setting("cache_max_tenants", 50)),
+            idle_seconds=float(get_setting("cache_idle_seconds", 600)),
+            use_listener=get_setting("cache_refresh", "listener") == "listener",
+        )
+    return _cache
+
+
+def _reset_cache() -> None:
+    global _cache
+    if _cache is not None:
+        _cache.close()
+    _cache = None
+
+
+def invalidate_cache(hotel_id: str) -> None:
+    """Nach eigenen Schreibzugriffen: gecachte Listen des Hotels verwerfen."""
+    if _cache is not None:
+        _cache.invalidate(hotel_id)
+
+
+# ---------------------------------------------------------
+# Gast-IDs vergeben
+# ---------------------------------------------------------
+# guest_id_block (Standard 1): so viele IDs holt sich ein Prozess auf einmal
+# vom Zähler des Hotels und vergibt sie danach ohne Roundtrip. Nicht
+# verwendete IDs eines Blocks verfallen beim Neustart; IDs sind dann zwar
+# eindeutig, aber über Prozesse hinweg nicht mehr streng aufsteigend.
+_id_blocks: Dict[str, List[int]] = {}
+_id_blocks_lock = threading.Lock()
+
+
+def allocate_guest_id(
+    hotel_id: str,
+    backend: Optional[StorageBackend] = None,
+    use_block: bool = True,
+) -> int:
+    """
+    Neue, nie zuvor vergebene Gast-ID.
+    use_block=False innerhalb von Transaktionen: eine dort reservierte ID
+    gilt erst mit deren Abschluss und darf nicht im Block zurückbleiben.
+    """
+    backend = backend or get_backend()
+    block_size = int(get_setting("guest_id_block", 1))
+    if not use_block or block_size <= 1:
+        return backend.allocate_guest_ids(hotel_id)
+
+    with _id_blocks_lock:
+        block = _id_blocks.get(hotel_id)
+        if block is None or block[0] >= block[1]:
+            first = backend.allocate_guest_ids(hotel_id, block_size)
+            block = _id_blocks[hotel_id] = [first, first + block_size]
+        guest_id = block[0]
+        block[0] += 1
+    return guest_id
 
 
 # ---------------------------------------------------------
 # Gäste laden & speichern
 # ---------------------------------------------------------
 def load_guests(hotel_id: str) -> List[Guest]:
-    data = load_json(f"{hotel_id}/gaeste")
-    return [guest_from_dict(item) for item in data]
+    """
+    Alle Gäste eines Hotels, über den gemeinsamen Cache.
+    Die Gast-Objekte sind geteilt und dürfen nicht verändert werden.
+    """
+    cache = get_cache()
+    if cache is None:
+        return get_backend().load_guests(hotel_id)
+    return cache.get(hotel_id, "guests")
+
+
+def load_state(hotel_id: str) -> TenantState:
+    """
+    Gäste und Zimmer als TenantState (Zugriff nach ID, Zimmer, Status).
+    Aus dem Cache geteilt – weder den Zustand noch die Objekte verändern.
+    """
+    cache = get_cache()
+    if cache is None:
+        backend = get_backend()
+        return TenantState(backend.load_guests(hotel_id), backend.load_rooms(hotel_id))
+    return cache.get_state(hotel_id)
+
+
+def query_guests(
+    hotel_id: str,
+    query: GuestQuery,
+    limit: Optional[int] = None,
+    cursor: Optional[tuple] = None,
+) -> Tuple[List[Guest], Optional[tuple]]:
+    """
+    Gefilterte Gäste (siehe GuestQuery), seitenweise über cursor.
+    Mit Cache wird die ohnehin geteilte Liste im Speicher gefiltert; ohne
+    Cache filtert das Backend (Firestore-Abfrage, SQL) und überträgt nur
+    die Treffer.
+    """
+    cache = get_cache()
+    if cache is None:
+        return get_backend().query_guests(hotel_id, query, limit, cursor)
+    return filter_guests(cache.get(hotel_id, "guests"), query, limit, cursor)
+
+
+def load_guests_with_status(hotel_id: str, status: str) -> List[Guest]:
+    """Gäste mit diesem Status nach ID: Status-Index im Cache oder Abfrage beim Backend."""
+    if get_cache() is None:
+        guests, _ = get_backend().query_guests(hotel_id, GuestQuery(status=status))
+        return sorted(guests, key=lambda g: g.id)
+    return load_state(hotel_id).guests(status)
+
+
+def load_search_index(hotel_id: str) -> GuestSearchIndex:
+    """Namens-Suchindex des Hotels (geteilt, nur über den Cache nachgeführt)."""
+    cache = get_cache()
+    if cache is None:
+        return GuestSearchIndex(get_backend().load_guests(hotel_id))
+    return cache.get_search_index(hotel_id)
 
 
 def save_guests(hotel_id: str, guests: List[Guest]) -> None:
-    data = [guest_to_dict(g) for g in guests]
-    save_json(f"{hotel_id}/gaeste", data)
+    get_backend().save_guests(hotel_id, guests)
+    invalidate_cache(hotel_id)
+
+
+def get_guest(hotel_id: str, guest_id: int) -> Optional[Guest]:
+    return get_backend().get_guest(hotel_id, guest_id)
+
+
+def save_guest(hotel_id: str, guest: Guest) -> None:
+    """
+    Speichert genau einen Gast.
+    Im Dokument-Layout bzw. in SQLite wird nur dieser Gast geschrieben.
+    """
+    get_backend().save_guest(hotel_id, guest)
+    invalidate_cache(hotel_id)
+
+
+def remove_guest(hotel_id: str, guest_id: int) -> None:
+    get_backend().delete_guest(hotel_id, guest_id)
+    invalidate_cache(hotel_id)
 
 
 # ---------------------------------------------------------
 # Zimmer laden & speichern
 # ---------------------------------------------------------
 def load_rooms(hotel_id: str) -> List[Room]:
-    data = load_json(f"{hotel_id}/raeume")
-    return [room_from_dict(item) for item in data]
+    """Alle Zimmer eines Hotels, über den gemeinsamen Cache (nicht verändern)."""
+    cache = get_cache()
+    if cache is None:
+        return get_backend().load_rooms(hotel_id)
+    return cache.get(hotel_id, "rooms")
 
 
 def save_rooms(hotel_id: str, rooms: List[Room]) -> None:
-    data = [room_to_dict(r) for r in rooms]
-    save_json(f"{hotel_id}/raeume", data)
+    get_backend().save_rooms(hotel_id, rooms)
+    invalidate_cache(hotel_id)
+
+
+def get_room(hotel_id: str, room_number: int) -> Optional[Room]:
+    return get_backend().get_room(hotel_id, room_number)
+
+
+def save_room(hotel_id: str, room: Room) -> None:
+    """
+    Speichert genau ein Zimmer.
+    Im Dokument-Layout bzw. in SQLite wird nur dieses Zimmer geschrieben.
+    """
+    get_backend().save_room(hotel_id, room)
+    invalidate_cache(hotel_id)
 
 
 # ---------------------------------------------------------
 # NEU: Raum löschen
 # ---------------------------------------------------------
 def delete_room(hotel_id: str, room_number: int) -> None:
-    rooms = load_rooms(hotel_id)
-    rooms = [r for r in rooms if r.number != room_number]
-    save_rooms(hotel_id, rooms)
+    get_backend().delete_room(hotel_id, room_number)
+    invalidate_cache(hotel_id)
+
+
+# ---------------------------------------------------------
+# Archiv lesen
+# ---------------------------------------------------------
+def load_archive(hotel_id: str, month: str) -> List[Guest]:
+    return get_backend().load_archive(hotel_id, month)
+
+
+def load_calendar(hotel_id: str, room_number: int) -> List[Reservation]:
+    return get_backend().get_calendar(hotel_id, room_number)
+
+
+def load_calendars(hotel_id: str) -> Dict[int, List[Reservation]]:
+    return get_backend().load_calendars(hotel_id)
+
+
+def load_aggregates(hotel_id: str) -> Optional[dict]:
+    return get_backend().get_meta(hotel_id, AGGREGATES_DOC_ID)
+
+
+def load_archive_summary(hotel_id: str) -> dict:
+    return get_backend().archive_summary(hotel_id)
+
+
+def load_archived_guests(hotel_id: str, guest_ids: List[int]) -> List[Guest]:
+    return get_backend().get_archived_guests(hotel_id, guest_ids)
+
+
+def load_archive_search_index(hotel_id: str) -> GuestSearchIndex:
+    """Namens-Suchindex über das Archiv (im Cache bis zum nächsten Archivlauf)."""
+    cache = get_cache()
+    if cache is None:
+        index = get_backend().archive_index(hotel_id)
+        return GuestSearchIndex.from_names({gid: e["name"] for gid, e in index.items()})
+    return cache.get_archive_search_index(hotel_id)
 
 
 # ---------------------------------------------------------
 # NEU: Raum freigeben
 # ---------------------------------------------------------
 def set_room_free(hotel_id: str, room_number: int) -> None:
-    rooms = load_rooms(hotel_id)
-    for r in rooms:
-        if r.number == room_number:
-            r.occupied = False
-            break
-    save_rooms(hotel_id, rooms)
+    room = get_room(hotel_id, room_number)
+    if room is not None and room.occupied:
+        room.occupied = False
+        save_room(hotel_id, room)
@@ -0,0 +1,653 @@
+"""
+In-Process-Ersatz für den Firestore-Client (Tests & Benchmarks).
+
+Implementiert die Teilmenge der google-cloud-firestore API, die dieses
+Projekt nutzt: collection/document/get/set/update/delete/create/stream/
+where/order_by/limit/start_after/add/list_documents/get_all, Batches,
+Transaktionen, Increment/ArrayUnion/DELETE_FIELD und on_snapshot.
+
+Jeder simulierte Netzwerk-Aufruf (RPC) wird gezählt und kann mit einer
+künstlichen Latenz versehen werden:
+
+    client = FakeClient(latency_ms=40)
+    ...
+    client.stats()        # {"get": 3, "commit": 1, ...}
+"""
+import copy
+import itertools
+import random
+import threading
+import time
+from datetime import datetime, timezone
+
+
+# ---------------------------------------------------------
+# Fehler (entsprechen google.api_core.exceptions)
+# ---------------------------------------------------------
+class FakeFirestoreError(Exception):
+    pass
+
+
+class NotFound(FakeFirestoreError):
+    pass
+
+
+class AlreadyExists(FakeFirestoreError):
+    pass
+
+
+class FailedPrecondition(FakeFirestoreError):
+    pass
+
+
+class Aborted(FakeFirestoreError):
+    pass
+
+
+# ---------------------------------------------------------
+# Sentinels (entsprechen firestore.Increment / ArrayUnion / DELETE_FIELD)
+# ---------------------------------------------------------
+class Increment:
+    def __init__(self, value):
+        self.value = value
+
+
+class ArrayUnion:
+    def __init__(self, values):
+        self.values = list(values)
+
+
+class _DeleteField:
+    def __repr__(self):
+        return "DELETE_FIELD"
+
+
+DELETE_FIELD = _DeleteField()
+
+
+class FieldFilter:
+    def __init__(self, field_path, op_string, value):
+        self.field_path = field_path
+        self.op_string = op_string
+        self.value = value
+
+
+def _now():
+    return datetime.now(timezone.utc)
+
+
+def _apply_value(current, value):
+    if isinstance(value, Increment):
+        base = current if isinstance(current, (int, float)) else 0
+        return base + value.value
+    if isinstance(value, ArrayUnion):
+        result = list(current) if isinstance(current, list) else []
+        for item in value.values:
+            if item not in result:
+                result.append(copy.deepcopy(item))
+        return result
+    return copy.deepcopy(value)
+
+
+def _merge(target: dict, data: dict):
+    for key, value in data.items():
+        if value is DELETE_FIELD:
+            target.pop(key, None)
+        elif isinstance(value, dict) and not isinstance(value, Increment):
+            sub = target.get(key)
+            if not isinstance(sub, dict):
+                sub = {}
+                target[key] = sub
+            _merge(sub, value)
+        else:
+            target[key] = _apply_value(target.get(key), value)
+
+
+def _resolve_sentinels(data: dict) -> dict:
+    result = {}
+    _merge(result, data)
+    return result
+
+
+def _get_path(data: dict, field_path: str):
+    current = data
+    for part in field_path.split("."):
+        if not isinstance(current, dict) or part not in current:
+            return None
+        current = current[part]
+    return current
+
+
+def _set_path(data: dict, field_path: str, value):
+    parts = field_path.split(".")
+    current = data
+    for part in parts[:-1]:
+        sub = current.get(part)
+        if not isinstance(sub, dict):
+            sub = {}
+            current[part] = sub
+        current = sub
+    if value is DELETE_FIELD:
+        current.pop(parts[-1], None)
+    else:
+        current[parts[-1]] = _apply_value(current.get(parts[-1]), value)
+
+
+# ---------------------------------------------------------
+# Snapshot
+# ---------------------------------------------------------
+class DocumentSnapshot:
+    def __init__(self, reference, data, update_time):
+        self.reference = reference
+        self._data = data
+        self.update_time = update_time
+
+    @property
+    def id(self):
+        return self.reference.id
+
+    @property
+    def exists(self):
+        return self._data is not None
+
+    def to_dict(self):
+        if self._data is None:
+            return None
+        return copy.deepcopy(self._data)
+
+    def get(self, field_path):
+        return _get_path(self._data or {}, field_path)
+
+
+# ---------------------------------------------------------
+# Schreib-Optionen (Vorbedingungen)
+# ---------------------------------------------------------
+class _LastUpdateOption:
+    def __init__(self, last_update_time):
+        self.last_update_time = last_update_time
+
+
+class _ExistsOption:
+    def __init__(self, exists):
+        self.exists = exists
+
+
+# ---------------------------------------------------------
+# Referenzen
+# ---------------------------------------------------------
+class DocumentReference:
+    def __init__(self, client, path):
+        self._client = client
+        self.path = path
+
+    @property
+    def id(self):
+        return self.path.rsplit("/", 1)[-1]
+
+    @property
+    def parent(self):
+        return CollectionReference(self._client, self.path.rsplit("/", 1)[0])
+
+    def collection(self, name):
+        return CollectionReference(self._client, f"{self.path}/{name}")
+
+    def get(self, transaction=None):
+        if transaction is not None:
+            return transaction._read(self)
+        self._client._rpc("get")
+        return self._client._snapshot(self)
+
+    def set(self, document_data, merge=False):
+        self._client._rpc("set")
+        self._client._apply([("set", self, document_data, merge, None)])
+
+    def create(self, document_data):
+        self._client._rpc("create")
+        self._client._apply([("create", self, document_data, False, None)])
+
+    def update(self, field_updates, option=None):
+        self._client._rpc("update")
+        self._client._apply([("update", self, field_updates, False, option)])
+
+    def delete(self, option=None):
+        self._client._rpc("delete")
+        self._client._apply([("delete", self, None, False, option)])
+
+    def on_snapshot(self, callback):
+        return self._client._watch(self.path, callback, document=True)
+
+    def __eq__(self, other):
+        return isinstance(other, DocumentReference) and other.path == self.path
+
+    def __hash__(self):
+        return hash(self.path)
+
+
+class Query:
+    def __init__(self, collection, filters=(), orders=(), limit=None, cursor=None):
+        self._collection = collection
+        self._filters = list(filters)
+        self._orders = list(orders)
+        self._limit = limit
+        self._cursor = cursor
+
+    def _copy(self, **changes):
+        args = {
+            "filters": self._filters,
+            "orders": self._orders,
+            "limit": self._limit,
+            "cursor": self._cursor,
+        }
+        args.update(changes)
+        return Query(self._collection, **args)
+
+    def where(self, field_path=None, op_string=None, value=None, filter=None):
+        if filter is not None:
+            field_path, op_string, value = filter.field_path, filter.op_string, filter.value
+        return self._copy(filters=self._filters + [(field_path, op_string, value)])
+
+    def order_by(self, field_path, direction="ASCENDING"):
+        return self._copy(orders=self._orders + [(field_path, direction)])
+
+    def limit(self, count):
+        return self._copy(limit=count)
+
+    def start_after(self, document_fields_or_snapshot):
+        return self._copy(cursor=document_fields_or_snapshot)
+
+    def _matches(self, data):
+        for field_path, op, value in self._filters:
+            current = _get_path(data, field_path)
+            if op == "==" and not current == value:
+                return False
+            if op == "!=" and not current != value:
+                return False
+            if op in ("<", "<=", ">", ">=") and current is None:
+                return False
+            if op == "<" and not current < value:
+                return False
+            if op == "<=" and not current <= value:
+                return False
+            if op == ">" and not current > value:
+                return False
+            if op == ">=" and not current >= value:
+                return False
+            if op == "in" and current not in value:
+                return False
+            if op == "array_contains" and value not in (current or []):
+                return False
+        return True
+
+    def _descending(self):
+        return bool(self._orders) and self._orders[0][1] in ("DESCENDING", "desc")
+
+    def _sort_key(self, data, doc_id):
+        # None sortiert vor allen Werten (wie Firestore "null")
+        key = []
+        for field_path, _direction in self._orders:
+            value = _get_path(data or {}, field_path)
+            key.append((0, 0) if value is None else (1, value))
+        key.append((1, doc_id))
+        return key
+
+    def _cursor_key(self):
+        cursor = self._cursor
+        if isinstance(cursor, DocumentSnapshot):
+            return self._sort_key(cursor._data, cursor.id)
+        # dict mit den Feldern aus order_by → ohne Dokument-ID vergleichen
+        return self._sort_key(cursor, "")[:-1]
+
+    def _run(self, transaction=None):
+        if transaction is not None:
+            transaction._check_active()
+        snapshots = [
+            s for s in self._collection._client._list(self._collection.path)
+            if self._matches(s._data)
+        ]
+
+        descending = self._descending()
+        snapshots.sort(key=lambda s: self._sort_key(s._data, s.id), reverse=descending)
+
+        if self._cursor is not None:
+            cursor_key = self._cursor_key()
+            n = len(cursor_key)
+
+            def after(s):
+                key = self._sort_key(s._data, s.id)[:n]
+                return key < cursor_key if descending else key > cursor_key
+
+            snapshots = [s for s in snapshots if after(s)]
+
+        if self._limit is not None:
+            snapshots = snapshots[: self._limit]
+
+        if transaction is not None:
+            for s in snapshots:
+                transaction._reads[s.reference.path] = s.update_time
+        return snapshots
+
+    def stream(self, transaction=None):
+        self._collection._client._rpc("stream")
+        return iter(self._run(transaction))
+
+    def get(self, transaction=None):
+        self._collection._client._rpc("stream")
+        return self._run(transaction)
+
+    def on_snapshot(self, callback):
+        return self._collection._client._watch(self._collection.path, callback)
+
+
+class CollectionReference(Query):
+    _auto_ids = itertools.count(1)
+
+    def __init__(self, client, path):
+        self._client = client
+        self.path = path
+        super().__init__(self)
+
+    @property
+    def id(self):
+        return self.path.rsplit("/", 1)[-1]
+
+    def document(self, document_id=None):
+        if document_id is None:
+            document_id = f"auto{next(self._auto_ids):012d}"
+        return DocumentReference(self._client, f"{self.path}/{document_id}")
+
+    def add(self, document_data, document_id=None):
+        ref = self.document(document_id)
+        self._client._rpc("add")
+        self._client._apply([("create", ref, document_data, False, None)])
+        return self._client._docs[ref.path][1], ref
+
+    def list_documents(self, page_size=None):
+        self._client._rpc("list_documents")
+        prefix = self.path + "/"
+        ids = set()
+        for path in list(self._client._docs):
+            if path.startswith(prefix):
+                rest = path[len(prefix):]
+                ids.add(rest.split("/", 1)[0])
+        # Wie Firestore: auch "fehlende" Eltern-Dokumente mit Unter-Sammlungen
+        return [self.document(i) for i in sorted(ids)]
+
+
+# ---------------------------------------------------------
+# Batch & Transaktion
+# ---------------------------------------------------------
+class WriteBatch:
+    def __init__(self, client):
+        self._client = client
+        self._writes = []
+
+    def set(self, reference, document_data, merge=False):
+        self._writes.append(("set", reference, document_data, merge, None))
+        return self
+
+    def create(self, reference, document_data):
+        self._writes.append(("create", reference, document_data, False, None))
+        return self
+
+    def update(self, reference, field_updates, option=None):
+        self._writes.append(("update", reference, field_updates, False, option))
+        return self
+
+    def delete(self, reference, option=None):
+        self._writes.append(("delete", reference, None, False, option))
+        return self
+
+    def __len__(self):
+        return len(self._writes)
+
+    def commit(self):
+        self._client._rpc("commit")
+        writes, self._writes = self._writes, []
+        return self._client._apply(writes)
+
+
+class Transaction(WriteBatch):
+    def __init__(self, client, max_attempts=5, read_only=False):
+        super().__init__(client)
+        self._max_attempts = max_attempts
+        self._reads = {}
+        self._active = False
+
+    def _check_active(self):
+        if not self._active:
+            raise ValueError("Transaktion ist nicht aktiv.")
+
+    def _begin(self):
+        self._client._rpc("begin_transaction")
+        self._reads = {}
+        self._writes = []
+        self._active = True
+
+    def _read(self, reference):
+        self._check_active()
+        self._client._rpc("get")
+        snap = self._client._snapshot(reference)
+        self._reads[reference.path] = snap.update_time
+        return snap
+
+    def _rollback(self):
+        self._client._rpc("rollback")
+        self._writes = []
+        self._active = False
+
+    def _commit(self):
+        self._client._rpc("commit")
+        with self._client._lock:
+            for path, read_time in self._reads.items():
+                current = self._client._docs.get(path)
+                current_time = current[1] if current else None
+                if current_time != read_time:
+                    self._writes = []
+                    self._active = False
+                    raise Aborted(f"Transaktion kollidiert bei {path}")
+            writes, self._writes = self._writes, []
+            self._active = False
+            return self._client._apply(writes)
+
+
+class _Transactional:
+    def __init__(self, to_wrap):
+        self.to_wrap = to_wrap
+
+    def __call__(self, transaction, *args, **kwargs):
+        last_error = None
+        for _attempt in range(transaction._max_attempts):
+            transaction._begin()
+            try:
+                result = self.to_wrap(transaction, *args, **kwargs)
+            except BaseException:
+                transaction._rollback()
+                raise
+            try:
+                transaction._commit()
+                return result
+            except Aborted as e:
+                last_error = e
+                # Zufälliger Backoff wie im echten Client
+                backoff_ms = max(transaction._client.latency_ms, 1.0) * (2 ** _attempt)
+                time.sleep(random.uniform(0, backoff_ms) / 1000.0)
+                continue
+        raise ValueError(
+            f"Transaktion nach {transaction._max_attempts} Versuchen fehlgeschlagen: {last_error}"
+        )
+
+
+def transactional(to_wrap):
+    return _Transactional(to_wrap)
+
+
+# ---------------------------------------------------------
+# Watch (on_snapshot)
+# ---------------------------------------------------------
+class Watch:
+    def __init__(self, client, path, callback, document):
+        self._client = client
+        self.path = path
+        self.callback = callback
+        self.document = document
+
+    def _fire(self, changed_path):
+        if self.document:
+            if changed_path != self.path:
+                return
+            ref = DocumentReference(self._client, self.path)
+            self.callback([self._client._snapshot(ref)], [], _now())
+        else:
+            if changed_path.rsplit("/", 1)[0] != self.path:
+                return
+            snaps = self._client._list(self.path)
+            self.callback(snaps, [], _now())
+
+    def unsubscribe(self):
+        if self in self._client._watches:
+            self._client._watches.remove(self)
+
+
+# ---------------------------------------------------------
+# Client
+# ---------------------------------------------------------
+class FakeClient:
+    """
+    In-Memory-Firestore.
+    - latency_ms: künstliche Verzögerung pro RPC
+    - stats(): Anzahl RPCs je Art, reset_stats() setzt zurück
+    """
+
+    def __init__(self, latency_ms: float = 0.0):
+        self.latency_ms = float(latency_ms)
+        self._docs = {}  # path → (data, update_time)
+        self._lock = threading.RLock()
+        self._calls = {}
+        self._watches = []
+        self._clock = itertools.count(1)
+
+    # --- Zählung & Latenz ---------------------------------
+    def _rpc(self, kind):
+        with self._lock:
+            self._calls[kind] = self._calls.get(kind, 0) + 1
+        if self.latency_ms > 0:
+            time.sleep(self.latency_ms / 1000.0)
+
+    def stats(self) -> dict:
+        with self._lock:
+            result = dict(self._calls)
+        result["total"] = sum(v for k, v in result.items())
+        return result
+
+    def reset_stats(self):
+        with self._lock:
+            self._calls = {}
+
+    # --- API ----------------------------------------------
+    def collection(self, name):
+        return CollectionReference(self, name)
+
+    def document(self, path):
+        return DocumentReference(self, path)
+
+    def get_all(self, references, field_paths=None, transaction=None):
+        # Ein RPC (BatchGetDocuments) für alle Dokumente
+        if transaction is not None:
+            transaction._check_active()
+        self._rpc("batch_get")
+        snaps = [self._snapshot(ref) for ref in references]
+        if transaction is not None:
+            for snap in snaps:
+                transaction._reads[snap.reference.path] = snap.update_time
+        return iter(snaps)
+
+    def batch(self):
+        return WriteBatch(self)
+
+    def transaction(self, max_attempts=5, read_only=False):
+        return Transaction(self, max_attempts=max_attempts, read_only=read_only)
+
+    def write_option(self, last_update_time=None, exists=None):
+        if last_update_time is not None:
+            return _LastUpdateOption(last_update_time)
+        return _ExistsOption(exists)
+
+    # --- intern -------------------------------------------
+    def _snapshot(self, reference):
+        with self._lock:
+            entry = self._docs.get(reference.path)
+        if entry is None:
+            return DocumentSnapshot(reference, None, None)
+        return DocumentSnapshot(reference, copy.deepcopy(entry[0]), entry[1])
+
+    def _list(self, collection_path):
+        prefix = collection_path + "/"
+        result = []
+        with self._lock:
+            for path, (data, update_time) in self._docs.items():
+                if path.startswith(prefix) and "/" not in path[len(prefix):]:
+                    ref = DocumentReference(self, path)
+                    result.append(DocumentSnapshot(ref, copy.deepcopy(data), update_time))
+        return result
+
+    def _next_time(self):
+        # Strikt monoton, auch bei gleicher Wanduhrzeit
+        tick = next(self._clock)
+        return (_now(), tick)
+
+    def _check_option(self, path, option):
+        if option is None:
+            return
+        current = self._docs.get(path)
+        if isinstance(option, _LastUpdateOption):
+            if current is None or current[1] != option.last_update_time:
+                raise FailedPrecondition(f"Dokument {path} wurde zwischenzeitlich geändert.")
+        elif isinstance(option, _ExistsOption):
+            if option.exists and current is None:
+                raise NotFound(path)
+            if option.exists is False and current is not None:
+                raise AlreadyExists(path)
+
+    def _apply(self, writes):
+        with self._lock:
+            # Erst alle Vorbedingungen prüfen → Batch ist atomar
+            for op, ref, data, merge, option in writes:
+                self._check_option(ref.path, option)
+                current = self._docs.get(ref.path)
+                if op == "create" and current is not None:
+                    raise AlreadyExists(ref.path)
+                if op == "update" and current is None:
+                    raise NotFound(ref.path)
+
+            update_time = self._next_time()
+            changed = []
+            for op, ref, data, merge, option in writes:
+                current = self._docs.get(ref.path)
+                if op == "delete":
+                    self._docs.pop(ref.path, None)
+                elif op in ("set", "create"):
+                    if merge and current is not None:
+                        new_data = copy.deepcopy(current[0])
+                        _merge(new_data, data)
+                    else:
+                        new_data = _resolve_sentinels(data)
+                    self._docs[ref.path] = (new_data, update_time)
+                elif op == "update":
+                    new_data = copy.deepcopy(current[0])
+                    for field_path, value in data.items():
+                        _set_path(new_data, field_path, value)
+                    self._docs[ref.path] = (new_data, update_time)
+                changed.append(ref.path)
+            watches = list(self._watches)
+
+        for path in changed:
+            for watch in watches:
+                watch._fire(path)
+        return [update_time for _ in writes]
+
+    def _watch(self, path, callback, document=False):
+        watch = Watch(self, path, callback, document)
+        with self._lock:
+            self._watches.append(watch)
+        watch._fire(path if document else f"{path}/_initial")
+        return watch
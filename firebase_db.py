@@ -1,52 +1,135 @@
+import threading
+
 import streamlit as st
-import firebase_admin
-from firebase_admin import credentials, firestore
+
+from config import get_setting
 
 # ---------------------------------------------------------
 # Firestore initialisieren
 # ---------------------------------------------------------
-firebase_secrets = st.secrets["firebase"]
-firebase_creds = dict(firebase_secrets)
+# firestore_backend = "cloud" (Standard) → echtes Firestore aus st.secrets["firebase"]
+# firestore_backend = "fake"            → In-Memory-Ersatz (fake_firestore.py),
+#                                         fake_latency_ms simuliert die Netzwerk-Latenz
+_USE_FAKE = get_setting("firestore_backend", "cloud") == "fake"
+
+
+def _create_client():
+    if _USE_FAKE:
+        from fake_firestore import FakeClient
+        return FakeClient(latency_ms=float(get_setting("fake_latency_ms", 0)))
+
+    import firebase_admin
+    from firebase_admin import credentials, firestore
+
+    firebase_secrets = st.secrets["firebase"]
+    firebase_creds = dict(firebase_secrets)
+
+    if not firebase_admin._apps:
+        cred = credentials.Certificate(firebase_creds)
+        firebase_admin.initialize_app(cred)
+
+    return firestore.client()
+
+
+# Der Client entsteht erst beim ersten Zugriff (get_db): Seiten und Skripte,
+# die Firestore nicht brauchen, zahlen weder Verbindungsaufbau noch
+# das Laden der Zugangsdaten.
+_db = None
+_db_lock = threading.Lock()
+
+
+def get_db():
+    global _db
+    if _db is None:
+        with _db_lock:
+            if _db is None:
+                _db = _create_client()
+    return _db
+
 
-if not firebase_admin._apps:
-    cred = credentials.Certificate(firebase_creds)
-    firebase_admin.initialize_app(cred)
+def __getattr__(name):
+    # Kompatibilität: "from firebase_db import db" funktioniert weiterhin
+    if name == "db":
+        return get_db()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
-db = firestore.client()
+
+def _api():
+    """Modul mit transactional / Increment / DELETE_FIELD passend zum Client."""
+    if _USE_FAKE:
+        import fake_firestore as api
+    else:
+        from firebase_admin import firestore as api
+    return api
+
+
+def conflict_errors() -> tuple:
+    """Fehler, mit denen Firestore eine verletzte Vorbedingung meldet."""
+    if _USE_FAKE:
+        from fake_firestore import FailedPrecondition, NotFound, AlreadyExists, Aborted
+        return (FailedPrecondition, NotFound, AlreadyExists, Aborted)
+
+    from google.api_core import exceptions
+    return (
+        exceptions.FailedPrecondition,
+        exceptions.NotFound,
+        exceptions.Conflict,
+        exceptions.Aborted,
+    )
+
+
+def _remember_version(versions, path: str, doc):
+    """
+    Merkt sich update_time und Feldnamen eines gelesenen Dokuments
+    (für Schreiben mit Vorbedingung, siehe write_documents).
+    """
+    if versions is None:
+        return
+    key = (path, doc.id)
+    if doc.exists:
+        versions[key] = (doc.update_time, frozenset(doc.to_dict().keys()))
+    else:
+        versions[key] = None
 
 # ---------------------------------------------------------
 # Hilfsfunktion: Pfad validieren
 # ---------------------------------------------------------
+# "<hotel_id>/<subpath>", für Unter-Sammlungen auch
+# "<hotel_id>/<subpath>/<doc_id>/<subpath>" (z.B. "h1/archiv/2025-03/gaeste")
 def _parse_path(path: str):
     parts = path.split("/")
-    if len(parts) != 2:
+    if len(parts) < 2 or len(parts) % 2 or not all(parts):
         raise ValueError(f"Ungültiger Pfad: {path}. Erwartet: '<hotel_id>/<subpath>'")
-    return parts[0], parts[1]
+    return parts[0], "/".join(parts[1:])
 
 # ---------------------------------------------------------
 # Sicherstellen, dass hotel_id-Dokument existiert
 # ---------------------------------------------------------
-def _ensure_hotel_document(hotel_id: str):
-    doc_ref = db.collection("hotel_app").document(hotel_id)
+# Wird nur bei der Mandanten-Anlage (superadmin.create_tenant) und der
+# Migration aufgerufen – nicht mehr bei jedem Laden/Speichern.
+# Firestore braucht das Eltern-Dokument für Unter-Sammlungen nicht.
+# Prozessweites Gedächtnis: Hotel-Dokumente, die sicher existieren
+_known_hotels = set()
+
+
+def ensure_hotel_document(hotel_id: str):
+    if hotel_id in _known_hotels:
+        return
+
+    doc_ref = get_db().collection("hotel_app").document(hotel_id)
     if not doc_ref.get().exists:
         doc_ref.set({"created": True})
 
+    _known_hotels.add(hotel_id)
+
 # ---------------------------------------------------------
 # JSON laden
 # ---------------------------------------------------------
-def load_json(path: str):
-    hotel_id, subpath = _parse_path(path)
+def load_json(path: str, transaction=None, versions=None):
+    doc_ref = _collection(path).document("data")
 
-    _ensure_hotel_document(hotel_id)
-
-    doc_ref = (
-        db.collection("hotel_app")
-          .document(hotel_id)
-          .collection(subpath)
-          .document("data")
-    )
-
-    doc = doc_ref.get()
+    doc = doc_ref.get(transaction=transaction)
+    _remember_version(versions, path, doc)
 
     if doc.exists:
         data = doc.to_dict().get("data")
@@ -59,15 +142,342 @@ def load_json(path: str):
 # JSON speichern
 # ---------------------------------------------------------
 def save_json(path: str, data):
-    hotel_id, subpath = _parse_path(path)
+    doc_ref = _collection(path).document("data")
+
+    doc_ref.set({"data": data})
 
-    _ensure_hotel_document(hotel_id)
+# ---------------------------------------------------------
+# Dokument-Layout: ein Dokument pro Eintrag
+# ---------------------------------------------------------
+# Statt eines großen "data"-Arrays liegt jeder Eintrag (Gast, Zimmer)
+# als eigenes Dokument unter hotel_app/<hotel_id>/<subpath>/<id>.
+# Das alte Array-Dokument heißt weiterhin "data".
+LEGACY_DOC_ID = "data"
+
+# Firestore erlaubt maximal 500 Schreiboperationen pro Batch
+BATCH_LIMIT = 500
+
+
+def _collection(path: str):
+    hotel_id, subpath = _parse_path(path)
 
-    doc_ref = (
-        db.collection("hotel_app")
+    names = subpath.split("/")
+    collection = (
+        get_db().collection("hotel_app")
           .document(hotel_id)
-          .collection(subpath)
-          .document("data")
+          .collection(names[0])
     )
+    # Unter-Sammlungen: abwechselnd Dokument und Sammlung
+    for doc_id, name in zip(names[1::2], names[2::2]):
+        collection = collection.document(doc_id).collection(name)
+    return collection
 
-    doc_ref.set({"data": data})
+
+def load_documents(path: str, transaction=None, versions=None):
+    """
+    Lädt alle Einzeldokumente einer Sammlung (ohne das alte "data"-Dokument).
+    """
+    result = []
+    for doc in _collection(path).stream(transaction=transaction):
+        if doc.id == LEGACY_DOC_ID:
+            continue
+        _remember_version(versions, path, doc)
+        result.append(doc.to_dict())
+    return result
+
+
+def query_documents(path: str, filters=(), order_by=(), limit=None, start_after=None, transaction=None):
+    """
+    Einzeldokumente, die alle filters [(feld, operator, wert), ...] erfüllen –
+    gefiltert wird beim Server, übertragen nur die Treffer.
+    - order_by:    Felder, nach denen sortiert wird (aufsteigend)
+    - start_after: Werte dieser Felder beim letzten Dokument der Vorseite
+    Filter plus Sortierung brauchen einen zusammengesetzten Index
+    (firestore.indexes.json).
+    """
+    api = _api()
+    query = _collection(path)
+    for field_path, op, value in filters:
+        query = query.where(filter=api.FieldFilter(field_path, op, value))
+    for field_path in order_by:
+        query = query.order_by(field_path)
+    if start_after is not None:
+        query = query.start_after(dict(zip(order_by, start_after)))
+    if limit is not None:
+        query = query.limit(limit)
+
+    # Das alte "data"-Dokument hat die Sortierfelder nicht und fällt damit
+    # bei Firestore heraus; hier trotzdem ausdrücklich überspringen
+    return [
+        doc.to_dict()
+        for doc in query.stream(transaction=transaction)
+        if doc.id != LEGACY_DOC_ID
+    ]
+
+
+def load_document(path: str, doc_id, transaction=None, versions=None):
+    doc = _collection(path).document(str(doc_id)).get(transaction=transaction)
+    _remember_version(versions, path, doc)
+    if doc.exists:
+        return doc.to_dict()
+    return None
+
+
+def load_documents_by_id(keys, transaction=None, versions=None) -> dict:
+    """
+    Mehrere Einzeldokumente in einem Roundtrip (get_all), auch aus
+    verschiedenen Sammlungen.
+    - keys: Liste von (path, doc_id)
+    - Ergebnis: {(path, str(doc_id)): data oder None}
+    """
+    refs = {}
+    for path, doc_id in keys:
+        ref = _collection(path).document(str(doc_id))
+        refs[ref.path] = (path, str(doc_id), ref)
+    if not refs:
+        return {}
+
+    result = {}
+    docs = get_db().get_all([ref for _, _, ref in refs.values()], transaction=transaction)
+    for doc in docs:
+        path, doc_id, _ = refs[doc.reference.path]
+        _remember_version(versions, path, doc)
+        result[(path, doc_id)] = doc.to_dict() if doc.exists else None
+    return result
+
+
+def watch_json(path: str, callback):
+    """
+    Beobachtet das Array-Dokument <path>/data.
+    callback(items) bei jeder Änderung; gibt die Funktion zum Beenden zurück.
+    """
+    def _on_snapshot(docs, changes, read_time):
+        doc = docs[0] if docs else None
+        data = doc.to_dict().get("data") if doc is not None and doc.exists else None
+        callback(data if isinstance(data, list) else [])
+
+    watch = _collection(path).document(LEGACY_DOC_ID).on_snapshot(_on_snapshot)
+    return watch.unsubscribe
+
+
+def watch_documents(path: str, callback):
+    """
+    Beobachtet alle Einzeldokumente einer Sammlung.
+    callback(items) mit dem kompletten neuen Stand bei jeder Änderung.
+    """
+    def _on_snapshot(docs, changes, read_time):
+        callback([doc.to_dict() for doc in docs if doc.id != LEGACY_DOC_ID])
+
+    watch = _collection(path).on_snapshot(_on_snapshot)
+    return watch.unsubscribe
+
+
+def save_document(path: str, doc_id, data: dict):
+    _collection(path).document(str(doc_id)).set(data)
+
+
+def update_document(path: str, doc_id, fields: dict):
+    _collection(path).document(str(doc_id)).update(fields)
+
+
+def delete_document(path: str, doc_id):
+    _collection(path).document(str(doc_id)).delete()
+
+
+def save_documents(path: str, items: dict):
+    """
+    Ersetzt den kompletten Inhalt einer Sammlung.
+    - items: {doc_id: data}
+    - Dokumente, die nicht mehr in items vorkommen, werden gelöscht.
+    """
+    collection = _collection(path)
+
+    wanted = {str(k) for k in items}
+    existing = {
+        ref.id for ref in collection.list_documents()
+        if ref.id != LEGACY_DOC_ID
+    }
+
+    ops = [("set", doc_id, data) for doc_id, data in items.items()]
+    ops += [("delete", doc_id, None) for doc_id in existing - wanted]
+
+    for start in range(0, len(ops), BATCH_LIMIT):
+        batch = get_db().batch()
+        for op, doc_id, data in ops[start:start + BATCH_LIMIT]:
+            ref = collection.document(str(doc_id))
+            if op == "set":
+                batch.set(ref, data)
+            else:
+                batch.delete(ref)
+        batch.commit()
+
+
+# ---------------------------------------------------------
+# Mehrere Dokumente atomar schreiben
+# ---------------------------------------------------------
+def _increments(fields: dict) -> dict:
+    api = _api()
+    return {
+        name: _increments(value) if isinstance(value, dict) else api.Increment(value)
+        for name, value in fields.items()
+    }
+
+
+def _merge_fields(fields: dict) -> dict:
+    api = _api()
+    return {
+        name: _merge_fields(value) if isinstance(value, dict)
+        else api.DELETE_FIELD if value is None else value
+        for name, value in fields.items()
+    }
+
+
+def write_documents(
+    writes, transaction=None, versions=None, increments=None, appends=None, merges=None
+):
+    """
+    Schreibt mehrere Dokumente in einem Roundtrip.
+    - writes: Liste von (path, doc_id, data); data=None → Dokument löschen
+    - increments: Liste von (path, doc_id, {feld: betrag}); die Felder werden
+      serverseitig hochgezählt (Increment, auch verschachtelt), das Dokument
+      bei Bedarf angelegt
+    - appends: Liste von (path, doc_id, feld, einträge); hängt die Einträge
+      serverseitig an das Array an (ArrayUnion), ohne es vorher zu lesen
+    - merges: Liste von (path, doc_id, {feld: wert}); setzt nur diese
+      (auch verschachtelten) Felder, None löscht ein Feld
+    - transaction: Schreiben innerhalb einer laufenden Transaktion
+      (Firestore schreibt beim Abschluss der Transaktion)
+    - sonst ein WriteBatch
+    - atomar: alle Operationen zusammen höchstens BATCH_LIMIT, sonst
+      ValueError (größere Änderungen muss der Aufrufer in in sich
+      stimmige Teile zerlegen, siehe night_audit.py)
+    - versions: beim Lesen gemerkte Versionen (siehe load_document). Für
+      diese Dokumente wird nur geschrieben, wenn sie seitdem unverändert
+      sind; sonst schlägt der Commit mit einem der conflict_errors() fehl.
+    """
+    increments = increments or []
+    appends = appends or []
+    merges = merges or []
+    if not writes and not increments and not appends and not merges:
+        return
+
+    total = len(writes) + len(increments) + len(appends) + len(merges)
+    if total > BATCH_LIMIT:
+        raise ValueError(
+            f"{total} Operationen in einem Commit, höchstens {BATCH_LIMIT} möglich"
+        )
+
+    def _increment(writer):
+        # Ohne Vorbedingung: Zähler und Anhänge vertragen gleichzeitige Änderungen
+        for path, doc_id, fields in increments:
+            ref = _collection(path).document(str(doc_id))
+            writer.set(ref, _increments(fields), merge=True)
+        for path, doc_id, field_name, items in appends:
+            ref = _collection(path).document(str(doc_id))
+            writer.set(ref, {field_name: _api().ArrayUnion(items)}, merge=True)
+        for path, doc_id, fields in merges:
+            ref = _collection(path).document(str(doc_id))
+            writer.set(ref, _merge_fields(fields), merge=True)
+
+    def _apply(writer, chunk):
+        for path, doc_id, data in chunk:
+            ref = _collection(path).document(str(doc_id))
+            key = (path, str(doc_id))
+
+            if versions is None or key not in versions:
+                # Ohne Vorbedingung (blind) schreiben
+                if data is None:
+                    writer.delete(ref)
+                else:
+                    writer.set(ref, data)
+                continue
+
+            version = versions[key]
+            if version is None:
+                # Beim Lesen nicht vorhanden → darf noch nicht existieren
+                if data is not None:
+                    writer.create(ref, data)
+                continue
+
+            update_time, fields = version
+            option = get_db().write_option(last_update_time=update_time)
+            if data is None:
+                writer.delete(ref, option=option)
+            else:
+                # update() statt set(): nur update/delete kennen Vorbedingungen.
+                # Entfallene Felder explizit löschen, damit das Ergebnis set() entspricht.
+                updates = dict(data)
+                for field_name in fields - set(data):
+                    updates[field_name] = _api().DELETE_FIELD
+                writer.update(ref, updates, option=option)
+
+    if transaction is not None:
+        _apply(transaction, writes)
+        _increment(transaction)
+        return
+
+    batch = get_db().batch()
+    _apply(batch, writes)
+    _increment(batch)
+    batch.commit()
+
+
+# ---------------------------------------------------------
+# Transaktion mit automatischer Wiederholung
+# ---------------------------------------------------------
+def run_transaction(fn, max_attempts: int = 5):
+    """
+    Führt fn(transaction) in einer Firestore-Transaktion aus.
+    Bei gleichzeitigen Änderungen wiederholt Firestore fn automatisch
+    (bis max_attempts); fn muss daher alle Daten über die Transaktion lesen.
+    """
+    transaction = get_db().transaction(max_attempts=max_attempts)
+
+    @_api().transactional
+    def _run(tx):
+        return fn(tx)
+
+    return _run(transaction)
+
+
+# ---------------------------------------------------------
+# Migration: "data"-Array → Einzeldokumente
+# ---------------------------------------------------------
+def migrate_to_documents(path: str, key: str) -> int:
+    """
+    Wandelt das alte Array-Dokument <path>/data in Einzeldokumente um.
+    - key: Feld, das als Dokument-ID dient ("id" für Gäste, "number" für Zimmer)
+    - Das "data"-Dokument wird im selben letzten Batch gelöscht.
+    - Gibt die Anzahl migrierter Einträge zurück (0, wenn nichts zu tun ist).
+    """
+    collection = _collection(path)
+    legacy_ref = collection.document(LEGACY_DOC_ID)
+
+    snap = legacy_ref.get()
+    if not snap.exists:
+        return 0
+
+    data = snap.to_dict().get("data")
+    if not isinstance(data, list):
+        data = []
+
+    ops = [item for item in data if key in item]
+
+    # Jeder Batch schreibt max. BATCH_LIMIT - 1 Dokumente,
+    # damit im letzten Batch noch Platz für das Löschen bleibt.
+    chunk = BATCH_LIMIT - 1
+    starts = list(range(0, len(ops), chunk)) or [0]
+
+    for i, start in enumerate(starts):
+        batch = get_db().batch()
+        for item in ops[start:start + chunk]:
+            batch.set(collection.document(str(item[key])), item)
+        if i == len(starts) - 1:
+            batch.delete(legacy_ref)
+        batch.commit()
+
+    return len(ops)
+
+
+def list_hotel_ids():
+    return [ref.id for ref in get_db().collection("hotel_app").list_documents()]
@@ -1,25 +1,42 @@
 import streamlit as st
-import io
 import base64
-from PIL import Image
-from datetime import datetime
+from datetime import date, datetime, timedelta
 
 from logic import (
     add_guest,
+    add_guests_bulk,
     add_night_to_guest,
+    add_nights_bulk,
+    set_nights_paid_bulk,
     set_night_paid_status,
     calculate_nights_summary,
     search_guests_by_name,
+    search_archived_guests,
     list_all_guests,
+    query_guests,
+    get_guest_by_id,
     checkout_guest,
     delete_guest,
     update_guest_details,
+    get_archive_summary,
+    get_dashboard_aggregates,
+    list_archived_guests,
+    list_guests_for_month,
+    get_night_ledger,
+    count_rooms,
+    book_room,
+    cancel_reservation,
+    check_in_reservation,
+    find_free_rooms,
+    get_next_reservation,
+    get_occupancy_index,
+    list_upcoming_reservations,
 )
 from models import Guest
 from utils import load_language, translator
 from pdf_generator import generate_receipt_pdf, generate_receipt_csv
 from users import change_password
-from firebase_db import db
+from firebase_db import get_db
 
 
 # ---------------------------------------------------------
@@ -72,16 +89,16 @@ def load_css():
 # ---------------------------------------------------------
 # Header
 # ---------------------------------------------------------
-def image_to_base64(img):
-    buffer = io.BytesIO()
-    img.save(buffer, format="PNG")
-    return base64.b64encode(buffer.getvalue()).decode()
+@st.cache_data
+def load_logo_base64(path: str = "logo.png") -> str:
+    # Datei ist bereits PNG → Bytes direkt kodieren, ohne PIL zu laden
+    with open(path, "rb") as f:
+        return base64.b64encode(f.read()).decode()
 
 
 def show_header(t):
     try:
-        logo = Image.open("logo.png")
-        encoded = image_to_base64(logo)
+        encoded = load_logo_base64()
 
         st.markdown(
             f"""
@@ -111,7 +128,7 @@ def show_header(t):
 # ---------------------------------------------------------
 # Guest Accordion
 # ---------------------------------------------------------
-def render_guest_accordion(hotel_id: str, guest: Guest, t, editable=True):
+def render_guest_accordion(hotel_id: str, guest: Guest, t, editable=True, archived=False):
     gid = guest.id
     is_open = st.session_state.get("open_guest_id") == gid
     symbol = get_currency_symbol()
@@ -127,7 +144,7 @@ def render_guest_accordion(hotel_id: str, guest: Guest, t, editable=True):
 
     st.write(f"{t('guest_details_room')}: {guest.room_number} ({guest.room_category})")
     st.write(f"{t('guest_details_price')}: {guest.price_per_night} {symbol}")
-    st.write(f"{t('checkin')}: {guest.checkin_date}")
+    st.write(f"{t('checkin')}: {guest.checkin_date or '-'}")
     if guest.checkout_date:
         st.write(f"{t('checkout')}: {guest.checkout_date}")
 
@@ -151,14 +168,16 @@ def render_guest_accordion(hotel_id: str, guest: Guest, t, editable=True):
                     set_night_paid_status(hotel_id, gid, n.number, True)
                     st.rerun()
 
-    with st.expander(t("add_nights"), expanded=False):
-        colA, colB = st.columns([1, 2])
-        paid_new = colA.checkbox(t("paid"), key=f"paid_new_{gid}")
-        label_btn = t("add_paid_night") if paid_new else t("add_unpaid_night")
-        if colB.button(label_btn, key=f"add_night_{gid}"):
-            add_night_to_guest(hotel_id, gid, paid_new)
-            st.success(t("guest_saved"))
-            st.rerun()
+    # Archivierte Gäste sind abgeschlossen → nur noch lesen
+    if not archived:
+        with st.expander(t("add_nights"), expanded=False):
+            colA, colB = st.columns([1, 2])
+            paid_new = colA.checkbox(t("paid"), key=f"paid_new_{gid}")
+            label_btn = t("add_paid_night") if paid_new else t("add_unpaid_night")
+            if colB.button(label_btn, key=f"add_night_{gid}"):
+                add_night_to_guest(hotel_id, gid, paid_new)
+                st.success(t("guest_saved"))
+                st.rerun()
 
     st.write(f"### {t('summary')}")
 
@@ -193,16 +212,20 @@ def render_guest_accordion(hotel_id: str, guest: Guest, t, editable=True):
     if editable and guest.status == "checked_in":
         colA, colB = st.columns(2)
         if colA.button(t("checkout_guest"), key=f"checkout_{gid}"):
-            checkout_guest(hotel_id, gid)
-            st.success(t("guest_checked_out"))
-            st.rerun()
+            try:
+                checkout_guest(hotel_id, gid)
+            except ValueError as e:
+                st.error(str(e))
+            else:
+                st.success(t("guest_checked_out"))
+                st.rerun()
 
         if colB.button(t("edit_guest"), key=f"edit_{gid}"):
             st.session_state["edit_guest_id"] = gid
             st.session_state["page"] = "Gast bearbeiten"
             st.rerun()
 
-    if guest.status == "checked_out":
+    if guest.status == "checked_out" and not archived:
         if st.button(t("delete_guest_button"), key=f"delete_{gid}"):
             delete_guest(hotel_id, gid)
             st.success(t("guest_deleted"))
@@ -216,59 +239,28 @@ def page_dashboard(hotel_id, t):
     st.header(t("dashboard"))
 
     symbol = get_currency_symbol()
-    guests = list_all_guests(hotel_id, include_checked_out=True)
-
-    current_guests = [g for g in guests if g.status == "checked_in"]
-    checked_out_guests = [g for g in guests if g.status == "checked_out"]
-
-    occupied_rooms = {
-        g.room_number: g.room_category
-        for g in guests
-        if g.status == "checked_in"
-    }
-
-    now = datetime.now()
-    current_year = now.year
-    current_month = now.month
-
-    revenue_this_month = 0.0
-    unpaid_nights_this_month = 0
-    unpaid_sum_this_month = 0.0
-
-    monthly_stats = {}
-    room_nights = {}
-    open_balances = []
 
-    for g in guests:
-        cp, cu, sp, su = calculate_nights_summary(g)
-
-        room_nights[g.room_number] = room_nights.get(g.room_number, 0) + (cp + cu)
+    # Ein kleines Dokument statt aller Gäste (siehe logic.rebuild_aggregates)
+    aggregates = get_dashboard_aggregates(hotel_id)
+    guest_counts = aggregates["guests"]
 
-        if cu > 0 and su > 0:
-            open_balances.append((g, cu, su))
+    current = aggregates["months"].get(datetime.now().strftime("%Y-%m"), {})
+    revenue_this_month = current.get("sum_paid", 0.0)
+    unpaid_nights_this_month = current.get("count_unpaid", 0)
+    unpaid_sum_this_month = current.get("sum_unpaid", 0.0)
 
-        if g.checkin_date:
-            try:
-                d = datetime.strptime(g.checkin_date, "%Y-%m-%d")
-            except ValueError:
-                continue
-
-            key = (d.year, d.month)
-            if key not in monthly_stats:
-                monthly_stats[key] = [0, 0.0, 0]
-            monthly_stats[key][0] += cp
-            monthly_stats[key][1] += sp
-            monthly_stats[key][2] += cu
-
-            if d.year == current_year and d.month == current_month:
-                revenue_this_month += sp
-                unpaid_nights_this_month += cu
-                unpaid_sum_this_month += su
+    room_nights = {
+        int(room_number): nights
+        for room_number, nights in aggregates["room_nights"].items()
+        if nights
+    }
 
     st.subheader(t("dashboard_summary_title"))
-    st.write(f"{t('stats_current_guests')}: {len(current_guests)}")
-    st.write(f"{t('stats_checked_out')}: {len(checked_out_guests)}")
-    st.write(f"{t('stats_rooms_occupied')}: {len(occupied_rooms)}")
+    checked_out_count = guest_counts.get("checked_out", 0) + guest_counts.get("archived", 0)
+    st.write(f"{t('stats_current_guests')}: {guest_counts.get('checked_in', 0)}")
+    st.write(f"{t('stats_checked_out')}: {checked_out_count}")
+    # Ein eingecheckter Gast pro Zimmer (add_guest prüft die Belegung)
+    st.write(f"{t('stats_rooms_occupied')}: {guest_counts.get('checked_in', 0)}")
     st.write(f"{t('dashboard_revenue_this_month')}: {revenue_this_month} {symbol}")
     st.write(
         f"{t('dashboard_unpaid_nights_this_month')}: "
@@ -292,16 +284,17 @@ def page_dashboard(hotel_id, t):
     st.markdown("---")
 
     st.subheader(t("dashboard_open_balances_title"))
+    open_balances = sorted(aggregates["open_balances"].items(), key=lambda item: int(item[0]))
     if not open_balances:
         st.info(t("dashboard_no_open_balances"))
     else:
         rows = []
-        for g, cu, su in open_balances:
+        for _, b in open_balances:
             rows.append({
-                t("guest_name_label"): g.name,
-                t("room_number_label"): g.room_number,
-                t("unpaid_nights"): cu,
-                t("sum_unpaid"): f"{su} {symbol}",
+                t("guest_name_label"): b["name"],
+                t("room_number_label"): b["room_number"],
+                t("unpaid_nights"): b["count_unpaid"],
+                t("sum_unpaid"): f"{b['sum_unpaid']} {symbol}",
             })
         st.table(rows)
 
@@ -318,6 +311,13 @@ def page_new_guest(hotel_id, t):
         name = st.text_input(t("guest_name_label"), key="new_guest_name")
         room = st.number_input(t("room_number_label"), min_value=1, key="new_guest_room")
 
+        # Folgt eine Reservierung, endet der Aufenthalt spätestens mit ihrer Anreise
+        following = get_next_reservation(hotel_id, int(room))
+        if following is not None:
+            st.warning(t("room_reserved_from").format(
+                room=int(room), date=following.arrival, name=following.guest_name
+            ))
+
         category_options = [
             t("room_cat_single"),
             t("room_cat_double"),
@@ -341,13 +341,17 @@ def page_new_guest(hotel_id, t):
             if not st.session_state["new_guest_name"]:
                 st.error(t("name_required"))
             else:
-                add_guest(
-                    hotel_id,
-                    st.session_state["new_guest_name"],
-                    int(st.session_state["new_guest_room"]),
-                    st.session_state["new_guest_category"],
-                    float(st.session_state["new_guest_price"])
-                )
+                try:
+                    add_guest(
+                        hotel_id,
+                        st.session_state["new_guest_name"],
+                        int(st.session_state["new_guest_room"]),
+                        st.session_state["new_guest_category"],
+                        float(st.session_state["new_guest_price"])
+                    )
+                except ValueError as e:
+                    st.error(str(e))
+                    return
 
                 st.success(t("guest_saved"))
 
@@ -358,6 +362,43 @@ def page_new_guest(hotel_id, t):
 
                 st.rerun()
 
+    with st.expander(t("create_group"), expanded=False):
+        # Eine Zeile pro Gast: "Name, Zimmernummer"
+        lines = st.text_area(t("group_lines_label"), key="new_group_lines")
+        group_category = st.selectbox(
+            t("room_category_label"), category_options, key="new_group_category"
+        )
+        group_price = st.number_input(
+            t("price_per_night_label"), min_value=0.0, key="new_group_price"
+        )
+
+        if st.button(t("save_group")):
+            entries = []
+            for line in lines.splitlines():
+                if not line.strip():
+                    continue
+                name_part, _, room_part = line.rpartition(",")
+                if not name_part.strip() or not room_part.strip().isdigit():
+                    st.error(t("group_invalid_line").format(line=line))
+                    return
+                entries.append({
+                    "name": name_part.strip(),
+                    "room_number": int(room_part),
+                    "room_category": group_category,
+                    "price_per_night": float(group_price),
+                })
+
+            try:
+                created = add_guests_bulk(hotel_id, entries)
+            except ValueError as e:
+                st.error(str(e))
+                return
+
+            st.success(t("group_saved").format(count=len(created)))
+            if "new_group_lines" in st.session_state:
+                del st.session_state["new_group_lines"]
+            st.rerun()
+
 
 # ---------------------------------------------------------
 # Gästeliste
@@ -365,14 +406,149 @@ def page_new_guest(hotel_id, t):
 def page_guest_list(hotel_id, t):
     st.header(t("guest_list_page"))
 
-    guests = list_all_guests(hotel_id, include_checked_out=False)
+    if st.checkbox(t("select_multiple"), key="guest_list_multi"):
+        guests = list_all_guests(hotel_id, include_checked_out=False)
+        if not guests:
+            st.info(t("no_guests"))
+            return
+        render_bulk_actions(hotel_id, guests, t)
+        return
 
-    if not guests:
+    if not render_guest_pages(hotel_id, t, "guest_list", status="checked_in"):
         st.info(t("no_guests"))
-        return
 
+
+# ---------------------------------------------------------
+# Gästelisten seitenweise
+# ---------------------------------------------------------
+# Pro Seite wird nur eine Seite Gäste geladen und gezeichnet (query_guests
+# mit Cursor). In session_state pro Liste (key):
+# - <key>_page_size: Gäste pro Seite
+# - <key>_cursors:   Cursor für den Anfang jeder bisher besuchten Seite
+# - <key>_page:      aktuelle Seite (Index in <key>_cursors)
+PAGE_SIZES = [25, 50, 100]
+
+
+def render_guest_pages(hotel_id, t, key, status, editable=True) -> bool:
+    """Eine Seite der Gäste mit diesem Status als Liste oder Tabelle; False = keine Gäste."""
+    col1, col2 = st.columns(2)
+    page_size = col1.selectbox(t("page_size"), PAGE_SIZES, key=f"{key}_page_size")
+    view = col2.radio(
+        t("view_mode"), ["list", "table"],
+        format_func=lambda v: t(f"view_{v}"),
+        horizontal=True,
+        key=f"{key}_view",
+    )
+
+    # Andere Seitengröße → Cursor passen nicht mehr, zurück auf Seite 1
+    if st.session_state.get(f"{key}_cursors_size") != page_size:
+        st.session_state[f"{key}_cursors"] = [None]
+        st.session_state[f"{key}_page"] = 0
+        st.session_state[f"{key}_cursors_size"] = page_size
+
+    cursors = st.session_state[f"{key}_cursors"]
+    page = st.session_state[f"{key}_page"]
+
+    guests, next_cursor = query_guests(hotel_id, status=status, limit=page_size, cursor=cursors[page])
+    if not guests and page > 0:
+        # Seite durch Checkout/Löschen leer geworden → zurück auf Seite 1
+        st.session_state[f"{key}_cursors"] = [None]
+        st.session_state[f"{key}_page"] = 0
+        st.rerun()
+    if not guests:
+        return False
+
+    if view == "table":
+        render_guest_table(hotel_id, t, key, guests, editable)
+    else:
+        for g in guests:
+            render_guest_accordion(hotel_id, g, t, editable=editable)
+
+    col_prev, col_page, col_next = st.columns([1, 2, 1])
+    if col_prev.button(t("previous_page"), key=f"{key}_prev", disabled=page == 0):
+        st.session_state[f"{key}_page"] = page - 1
+        st.rerun()
+    col_page.write(t("page_label").format(page=page + 1))
+    if col_next.button(t("next_page"), key=f"{key}_next", disabled=next_cursor is None):
+        del cursors[page + 1:]
+        cursors.append(next_cursor)
+        st.session_state[f"{key}_page"] = page + 1
+        st.rerun()
+    return True
+
+
+def render_guest_table(hotel_id, t, key, guests, editable=True):
+    # Kompakte Tabelle; die gewählte Zeile öffnet darunter die Details
+    symbol = get_currency_symbol()
+    rows = []
     for g in guests:
-        render_guest_accordion(hotel_id, g, t)
+        # Gespeicherte Summen – die Nächte werden nicht dekodiert
+        _, count_unpaid, _, sum_unpaid = calculate_nights_summary(g)
+        rows.append({
+            t("guest_name_label"): g.name,
+            t("room"): g.room_number,
+            t("room_category_label"): g.room_category,
+            t("checkin"): g.checkin_date,
+            t("checkout"): g.checkout_date,
+            t("unpaid_nights"): count_unpaid,
+            t("sum_unpaid"): f"{sum_unpaid} {symbol}",
+        })
+
+    # Streamlit merkt sich die Auswahl als Zeilennummer pro Widget-Key:
+    # der Key hängt an den angezeigten Gästen, damit eine alte Auswahl nach
+    # Checkout, Blättern oder Filtern nicht auf einen anderen Gast zeigt
+    ids = tuple(g.id for g in guests)
+    event = st.dataframe(
+        rows,
+        hide_index=True,
+        on_select="rerun",
+        selection_mode="single-row",
+        key=f"{key}_table_{hash(ids)}",
+    )
+
+    selected = [row for row in event.selection.rows if 0 <= row < len(guests)]
+    guest = guests[selected[0]] if selected else None
+
+    # Nur eine neu gewählte Zeile klappt die Details auf; danach bleibt
+    # das Zu-/Aufklappen beim Knopf des Gastes
+    selected_key = f"{key}_table_selected"
+    selected_id = guest.id if guest is not None else None
+    if st.session_state.get(selected_key) != selected_id:
+        st.session_state[selected_key] = selected_id
+        if guest is not None:
+            st.session_state["open_guest_id"] = guest.id
+
+    if guest is not None:
+        st.markdown("---")
+        render_guest_accordion(hotel_id, guest, t, editable=editable)
+
+
+def render_bulk_actions(hotel_id, guests, t):
+    # Mehrfachauswahl: eine Aktion für alle gewählten Gäste, ein Speichervorgang
+    names = {g.id: f"{g.name} ({t('room')} {g.room_number})" for g in guests}
+    selected = st.multiselect(
+        t("selected_guests"),
+        list(names),
+        format_func=names.get,
+        key="guest_list_selected",
+    )
+
+    col1, col2, col3 = st.columns(3)
+    action = None
+    if col1.button(t("add_paid_night"), key="bulk_paid_night", disabled=not selected):
+        action = lambda: add_nights_bulk(hotel_id, selected, True)
+    if col2.button(t("add_unpaid_night"), key="bulk_unpaid_night", disabled=not selected):
+        action = lambda: add_nights_bulk(hotel_id, selected, False)
+    if col3.button(t("bulk_mark_paid"), key="bulk_mark_paid", disabled=not selected):
+        action = lambda: set_nights_paid_bulk(hotel_id, selected, True)
+
+    if action is not None:
+        try:
+            updated = action()
+        except ValueError as e:
+            st.error(str(e))
+        else:
+            st.success(t("bulk_done").format(count=len(updated)))
 
 
 # ---------------------------------------------------------
@@ -385,12 +561,19 @@ def page_search(hotel_id, t):
         q = st.text_input(t("search_name"))
 
     if q:
-        results = search_guests_by_name(hotel_id, q)
-        if not results:
+        # Beste 50 Treffer; Suchindex statt Durchlauf über alle Gäste
+        results = search_guests_by_name(hotel_id, q, limit=50, include_archive=False)
+        archived = search_archived_guests(hotel_id, q, limit=50)
+        if not results and not archived:
             st.warning(t("no_results"))
-        else:
-            for g in results:
-                render_guest_accordion(hotel_id, g, t)
+        for g in results:
+            render_guest_accordion(hotel_id, g, t)
+
+        # Archivierte Treffer nur lesen
+        if archived:
+            st.subheader(t("archive"))
+        for g in archived:
+            render_guest_accordion(hotel_id, g, t, editable=False, archived=True)
 
 
 # ---------------------------------------------------------
@@ -399,76 +582,207 @@ def page_search(hotel_id, t):
 def page_checkout(hotel_id, t):
     st.header(t("checkout_page"))
 
-    guests = list_all_guests(hotel_id, include_checked_out=True)
-    checked_out = [g for g in guests if g.status == "checked_out"]
-
-    if not checked_out:
+    if not render_guest_pages(hotel_id, t, "checkout", status="checked_out", editable=False):
         st.info(t("no_checked_out_guests"))
+
+    # Archiv: nur den gewählten Monat laden
+    months = sorted(get_archive_summary(hotel_id)["months"], reverse=True)
+    if not months:
         return
 
-    for g in checked_out:
-        render_guest_accordion(hotel_id, g, t, editable=False)
+    st.markdown("---")
+    st.subheader(t("archive"))
+    month_key = st.selectbox(t("archive_month"), months, key="archive_month")
+    year, month = (int(part) for part in month_key.split("-"))
+
+    for g in list_archived_guests(hotel_id, year, month):
+        render_guest_accordion(hotel_id, g, t, editable=False, archived=True)
 
 
 # ---------------------------------------------------------
 # Monatsbericht
 # ---------------------------------------------------------
 def page_monthly_report(hotel_id, t):
+    # NumPy erst hier laden: die übrigen Seiten brauchen es nicht
+    from reporting import build_ledger, by_guest, by_room, occupancy, year_over_year
+
     st.header(t("monthly_report"))
 
-    guests = list_all_guests(hotel_id, include_checked_out=True)
     symbol = get_currency_symbol()
 
     now = datetime.now()
     years = {now.year}
-
-    for g in guests:
-        if g.checkin_date:
-            try:
-                d = datetime.strptime(g.checkin_date, "%Y-%m-%d")
-                years.add(d.year)
-            except ValueError:
-                pass
-
+    # Jahre aus der Archiv-Zusammenfassung und den Kennzahlen – ohne Gäste zu laden
+    for month_key in get_archive_summary(hotel_id)["months"]:
+        years.add(int(month_key.split("-")[0]))
+    for month_key in get_dashboard_aggregates(hotel_id)["months"]:
+        years.add(int(month_key.split("-")[0]))
     years = sorted(years)
 
     col1, col2 = st.columns(2)
     year = col1.selectbox(t("year"), years, index=len(years) - 1)
     month = col2.selectbox(t("month"), list(range(1, 13)), index=now.month - 1)
 
-    filtered = []
-    total_paid = 0.0
-    total_unpaid = 0.0
+    # Nur die Aufenthalte dieses Monats: Abfrage nach Check-in-Zeitraum
+    # plus die eine Archiv-Partition; Summen per NumPy (reporting.py)
+    month_guests = list_guests_for_month(hotel_id, year, month)
+    per_guest = by_guest(build_ledger(month_guests))
 
-    for g in guests:
-        if not g.checkin_date:
-            continue
-        try:
-            d = datetime.strptime(g.checkin_date, "%Y-%m-%d")
-        except ValueError:
-            continue
-
-        if d.year == year and d.month == month:
-            cp, cu, sp, su = calculate_nights_summary(g)
-            filtered.append((g, cp, cu, sp, su))
-            total_paid += sp
-            total_unpaid += su
-
-    if not filtered:
+    if not month_guests:
         st.info(t("no_month_data"))
+    else:
+        # Zeilen aus den Gästen, nicht aus dem Journal: Gäste ohne Nächte bleiben sichtbar
+        empty = {"count_paid": 0, "count_unpaid": 0, "sum_paid": 0.0, "sum_unpaid": 0.0}
+        total_paid = 0.0
+        total_unpaid = 0.0
+
+        st.subheader(t("monthly_details"))
+        for g in month_guests:
+            s = per_guest.get(g.id, empty)
+            st.write(f"**{g.name}** – {t('room')} {g.room_number}")
+            st.write(f"{t('paid_nights')}: {s['count_paid']}, {t('unpaid_nights')}: {s['count_unpaid']}")
+            st.write(f"{t('sum_paid')}: {s['sum_paid']} {symbol}, {t('sum_unpaid')}: {s['sum_unpaid']} {symbol}")
+            st.markdown("---")
+            total_paid += s["sum_paid"]
+            total_unpaid += s["sum_unpaid"]
+
+        st.subheader(t("monthly_total"))
+        st.write(f"{t('sum_paid')}: {total_paid} {symbol}")
+        st.write(f"{t('sum_unpaid')}: {total_unpaid} {symbol}")
+        st.write(f"{t('total')}: {total_paid + total_unpaid} {symbol}")
+
+    st.markdown("---")
+    # Jahresvergleich und Auslastung brauchen alle Nächte – nur auf Wunsch laden
+    if not st.checkbox(t("show_year_over_year"), key="show_year_over_year"):
         return
 
-    st.subheader(t("monthly_details"))
-    for g, cp, cu, sp, su in filtered:
-        st.write(f"**{g.name}** – {t('room')} {g.room_number}")
-        st.write(f"{t('paid_nights')}: {cp}, {t('unpaid_nights')}: {cu}")
-        st.write(f"{t('sum_paid')}: {sp} {symbol}, {t('sum_unpaid')}: {su} {symbol}")
+    ledger = get_night_ledger(hotel_id)
+
+    st.subheader(t("year_over_year"))
+    rows = []
+    for y, revenue in year_over_year(ledger).items():
+        row = {t("year"): y}
+        for m, value in enumerate(revenue, start=1):
+            row[f"{m:02d}"] = f"{value:.2f}"
+        row[t("total")] = f"{sum(revenue):.2f} {symbol}"
+        rows.append(row)
+    if rows:
+        st.table(rows)
+
+    st.subheader(f"{t('occupancy')} {year}")
+    # Ohne gespeicherte Zimmer: alle je belegten Zimmer zählen
+    room_count = count_rooms(hotel_id) or len(by_room(ledger))
+    rates = occupancy(ledger, year, room_count)
+    st.table([{f"{m:02d}": f"{rate:.0%}" for m, rate in enumerate(rates, start=1)}])
+
+
+# ---------------------------------------------------------
+# Belegungsplan
+# ---------------------------------------------------------
+def page_calendar(hotel_id, t):
+    st.header(t("calendar_page"))
+
+    # Raster: Zeilen = Zimmer, Spalten = Tage, Zelle = Gast
+    col1, col2 = st.columns(2)
+    start = col1.date_input(t("calendar_start"), value=date.today(), key="calendar_start")
+    days = int(col2.number_input(t("calendar_days"), min_value=7, max_value=62, value=14, key="calendar_days"))
+    end = start + timedelta(days=days)
+    day_keys = [start + timedelta(days=i) for i in range(days)]
+
+    # Ein Lesezugriff für alle Pläne; pro Zimmer nur die Reservierungen im Zeitraum
+    index = get_occupancy_index(hotel_id)
+    rows = []
+    for number in sorted(index.rooms):
+        row = {t("room"): number}
+        cells = dict.fromkeys(day_keys, "")
+        for r in index.calendar(number).overlapping(start, end):
+            for day in day_keys:
+                if r.arrival <= day < r.departure:
+                    cells[day] = r.guest_name
+        row.update({f"{day:%d.%m.}": name for day, name in cells.items()})
+        rows.append(row)
+    if rows:
+        st.dataframe(rows, hide_index=True)
+    else:
+        st.info(t("no_rooms_yet"))
+
+    category_options = [
+        t("room_cat_single"),
+        t("room_cat_double"),
+        t("room_cat_family"),
+        t("room_cat_suite"),
+    ]
+
+    with st.expander(t("free_rooms"), expanded=False):
+        col1, col2, col3 = st.columns(3)
+        arrival = col1.date_input(t("arrival"), value=date.today(), key="free_arrival")
+        departure = col2.date_input(
+            t("departure"), value=date.today() + timedelta(days=1), key="free_departure"
+        )
+        category = col3.selectbox(
+            t("room_category_label"), [None] + category_options,
+            format_func=lambda c: c or t("all_categories"),
+            key="free_category",
+        )
+        if st.button(t("free_rooms"), key="free_search"):
+            try:
+                free = find_free_rooms(hotel_id, arrival, departure, category)
+            except ValueError as e:
+                st.error(str(e))
+            else:
+                if not free:
+                    st.warning(t("no_free_rooms"))
+                for room in free:
+                    st.write(f"{t('room')} {room.number} – {room.category}")
+
+    with st.expander(t("book_room"), expanded=False):
+        numbers = sorted(index.rooms)
+        if not numbers:
+            st.info(t("no_rooms_yet"))
+        else:
+            room_number = st.selectbox(t("room"), numbers, key="booking_room")
+            name = st.text_input(t("guest_name_label"), key="booking_name")
+            col1, col2 = st.columns(2)
+            arrival = col1.date_input(t("arrival"), value=date.today(), key="booking_arrival")
+            departure = col2.date_input(
+                t("departure"), value=date.today() + timedelta(days=1), key="booking_departure"
+            )
+            if st.button(t("save_reservation"), key="booking_save"):
+                if not name:
+                    st.error(t("name_required"))
+                else:
+                    try:
+                        book_room(hotel_id, int(room_number), name, arrival, departure)
+                    except ValueError as e:
+                        st.error(str(e))
+                    else:
+                        st.success(t("reservation_saved"))
+                        st.rerun()
+
+    st.subheader(t("upcoming_reservations"))
+    upcoming = list_upcoming_reservations(hotel_id)
+    if not upcoming:
+        st.info(t("no_reservations"))
+    for r in upcoming:
+        st.write(f"**{r.guest_name}** – {t('room')} {r.room_number}: {r.arrival} – {r.departure}")
+        col1, col2, col3 = st.columns([2, 1, 1])
+        price = col1.number_input(
+            t("price_per_night_label"), min_value=0.0, key=f"reservation_price_{r.id}"
+        )
+        try:
+            if col2.button(t("check_in"), key=f"reservation_checkin_{r.id}"):
+                check_in_reservation(hotel_id, r.room_number, r.id, float(price))
+                st.success(t("reservation_checked_in"))
+                st.rerun()
+            if col3.button(t("cancel_reservation"), key=f"reservation_cancel_{r.id}"):
+                cancel_reservation(hotel_id, r.room_number, r.id)
+                st.success(t("reservation_cancelled"))
+                st.rerun()
+        except ValueError as e:
+            st.error(str(e))
         st.markdown("---")
 
-    st.subheader(t("monthly_total"))
-    st.write(f"{t('sum_paid')}: {total_paid} {symbol}")
-    st.write(f"{t('sum_unpaid')}: {total_unpaid} {symbol}")
-    st.write(f"{t('total')}: {total_paid + total_unpaid} {symbol}")
+
 # ---------------------------------------------------------
 # Gast bearbeiten
 # ---------------------------------------------------------
@@ -478,8 +792,7 @@ def page_edit_guest(hotel_id, t):
         st.error("Kein Gast ausgewählt.")
         return
 
-    guests = list_all_guests(hotel_id, include_checked_out=True)
-    guest = next((g for g in guests if g.id == gid), None)
+    guest = get_guest_by_id(hotel_id, gid)
 
     if not guest:
         st.error("Gast nicht gefunden.")
@@ -584,7 +897,7 @@ def render_sidebar(t, user):
         if new_code != current_code:
             st.session_state["currency"] = new_code
             try:
-                db.collection("users").document(user["id"]).update({"currency": new_code})
+                get_db().collection("users").document(user["id"]).update({"currency": new_code})
                 st.session_state["user"]["currency"] = new_code
             except Exception:
                 pass
@@ -596,6 +909,7 @@ def render_sidebar(t, user):
             t("new_guest_page"): "Neuen Gast anlegen",
             t("guest_list_page"): "Gästeliste",
             t("search_page"): "Suche",
+            t("calendar_page"): "Belegungsplan",
             t("checkout_page"): "Checkout",
             t("monthly_report"): "Monatsabrechnung",
             t("change_password"): "Passwort ändern",
@@ -692,6 +1006,8 @@ def main():
         page_guest_list(hotel_id, t)
     elif page == "Suche":
         page_search(hotel_id, t)
+    elif page == "Belegungsplan":
+        page_calendar(hotel_id, t)
     elif page == "Checkout":
         page_checkout(hotel_id, t)
     elif page == "Monatsabrechnung":
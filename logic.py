@@ -1,17 +1,36 @@
-from typing import List, Optional, Tuple
-from datetime import datetime
-
-from models import Guest, Room, Night
-from database import load_guests, save_guests, load_rooms, save_rooms
-
-
-# ---------------------------------------------------------
-# Hilfsfunktionen für IDs
-# ---------------------------------------------------------
-def _get_next_guest_id(guests: List[Guest]) -> int:
-    if not guests:
-        return 1
-    return max(g.id for g in guests) + 1
+import uuid
+from typing import TYPE_CHECKING, List, Optional, Tuple
+from datetime import date, timedelta
+
+from models import OPEN_END, Guest, Reservation, Room, Night
+from config import get_setting
+from database import (
+    load_guests_with_status,
+    load_search_index,
+    load_state,
+    query_guests as run_guest_query,
+    GuestQuery,
+    get_guest,
+    get_room as load_room,
+    AGGREGATES_DOC_ID,
+    add_counts,
+    archive_month,
+    empty_aggregates,
+    guest_aggregates,
+    open_balance,
+    load_aggregates,
+    load_archive,
+    load_archive_search_index,
+    load_archive_summary,
+    load_archived_guests,
+    load_calendar,
+    load_calendars,
+)
+from reservations import OccupancyIndex
+from unit_of_work import TenantSession, run_session
+
+if TYPE_CHECKING:
+    from reporting import NightLedger
 
 
 # ---------------------------------------------------------
@@ -23,42 +42,35 @@ def add_room(hotel_id: str, number: int, category: str) -> None:
     - Wenn Zimmernummer schon existiert → Kategorie aktualisieren, kein Fehler.
     - Wenn nicht existiert → neues Zimmer anlegen.
     """
-    rooms = load_rooms(hotel_id)
+    def _op(s: TenantSession):
+        existing = s.get_room(number)
 
-    existing = None
-    for r in rooms:
-        if r.number == number:
-            existing = r
-            break
+        if existing:
+            # Kategorie ggf. korrigieren, Belegung bleibt wie sie ist
+            existing.category = category
+            s.save_room(existing)
+        else:
+            s.save_room(Room(number=number, category=category, occupied=False))
+
+    run_session(hotel_id, _op)
 
-    if existing:
-        # Kategorie ggf. korrigieren, Belegung bleibt wie sie ist
-        existing.category = category
-    else:
-        new_room = Room(number=number, category=category, occupied=False)
-        rooms.append(new_room)
 
-    save_rooms(hotel_id, rooms)
+def _set_room_occupied(s: TenantSession, room_number: int, occupied: bool) -> None:
+    room = s.get_room(room_number)
+    if room is not None and room.occupied != occupied:
+        room.occupied = occupied
+        s.save_room(room)
 
 
 def set_room_occupied(hotel_id: str, room_number: int, occupied: bool) -> None:
-    rooms = load_rooms(hotel_id)
-    changed = False
-    for r in rooms:
-        if r.number == room_number:
-            r.occupied = occupied
-            changed = True
-            break
-    if changed:
-        save_rooms(hotel_id, rooms)
+    def _op(s: TenantSession):
+        _set_room_occupied(s, room_number, occupied)
+
+    run_session(hotel_id, _op)
 
 
 def get_room(hotel_id: str, room_number: int) -> Optional[Room]:
-    rooms = load_rooms(hotel_id)
-    for r in rooms:
-        if r.number == room_number:
-            return r
-    return None
+    return load_room(hotel_id, room_number)
 
 
 # ---------------------------------------------------------
@@ -71,15 +83,23 @@ def add_guest(
     room_category: str,
     price_per_night: float,
 ) -> Guest:
-    guests = load_guests(hotel_id)
-    rooms = load_rooms(hotel_id)
+    def _op(s: TenantSession):
+        s.preload_rooms([room_number])
+        _occupy_room(s, room_number, room_category)
+        guest = _new_guest(s.next_guest_id(), name, room_number, room_category, price_per_night)
+        _start_stay(s, guest)
+        s.save_guest(guest)
+        return guest
+
+    return run_session(hotel_id, _op)
 
-    room = get_room(hotel_id, room_number)
+
+def _occupy_room(s: TenantSession, room_number: int, room_category: str) -> Room:
+    room = s.get_room(room_number)
 
     # Zimmer existiert nicht → automatisch anlegen
     if room is None:
         room = Room(number=room_number, category=room_category, occupied=False)
-        rooms.append(room)
     else:
         # Kategorie ggf. korrigieren
         if room.category != room_category:
@@ -88,46 +108,49 @@ def add_guest(
     if room.occupied:
         raise ValueError(f"Zimmer {room_number} ist bereits belegt.")
 
-    new_id = _get_next_guest_id(guests)
-    today = datetime.now().strftime("%Y-%m-%d")
+    # Zimmer belegen
+    room.occupied = True
+    s.save_room(room)
+    return room
 
-    guest = Guest(
-        id=new_id,
+
+def _new_guest(
+    guest_id: int, name: str, room_number: int, room_category: str, price_per_night: float
+) -> Guest:
+    return Guest(
+        id=guest_id,
         name=name,
         room_number=room_number,
         room_category=room_category,
         price_per_night=price_per_night,
         nights=[],
-        checkin_date=today,
+        checkin_date=date.today(),
         checkout_date=None,
         status="checked_in",
     )
 
-    guests.append(guest)
-    save_guests(hotel_id, guests)
-
-    # Zimmer belegen
-    room.occupied = True
-    save_rooms(hotel_id, rooms)
 
+def get_guest_by_id(hotel_id: str, guest_id: int) -> Optional[Guest]:
+    """Aktiver Gast oder – falls schon archiviert – der Gast aus dem Archiv."""
+    guest = get_guest(hotel_id, guest_id)
+    if guest is None:
+        archived = load_archived_guests(hotel_id, [guest_id])
+        guest = archived[0] if archived else None
     return guest
 
 
-def get_guest_by_id(hotel_id: str, guest_id: int) -> Optional[Guest]:
-    guests = load_guests(hotel_id)
-    for g in guests:
-        if g.id == guest_id:
-            return g
-    return None
+def update_guest(hotel_id: str, updated_guest: Guest) -> None:
+    def _op(s: TenantSession):
+        s.save_guest(updated_guest)
 
+    run_session(hotel_id, _op)
 
-def update_guest(hotel_id: str, updated_guest: Guest) -> None:
-    guests = load_guests(hotel_id)
-    for i, g in enumerate(guests):
-        if g.id == updated_guest.id:
-            guests[i] = updated_guest
-            break
-    save_guests(hotel_id, guests)
+
+def _require_guest(s: TenantSession, guest_id: int) -> Guest:
+    guest = s.get_guest(guest_id)
+    if not guest:
+        raise ValueError("Gast nicht gefunden")
+    return guest
 
 
 # ---------------------------------------------------------
@@ -142,183 +165,700 @@ def update_guest_details(
     new_price: float
 ) -> Guest:
 
-    guests = load_guests(hotel_id)
-    rooms = load_rooms(hotel_id)
+    def _op(s: TenantSession):
+        guest = _require_guest(s, guest_id)
 
-    guest = get_guest_by_id(hotel_id, guest_id)
-    if not guest:
-        raise ValueError("Gast nicht gefunden")
+        old_room_number = guest.room_number
+        if new_room_number != old_room_number or new_name != guest.name:
+            # Zimmer und Belegungspläne, die sich ändern können, auf einmal lesen
+            s.preload_rooms([old_room_number, new_room_number])
 
-    old_room_number = guest.room_number
+        # Name aktualisieren (auch im Belegungsplan)
+        if new_name != guest.name:
+            calendar = s.get_calendar(old_room_number)
+            stay = calendar.find_stay(guest.id)
+            if stay is not None:
+                stay.guest_name = new_name
+                s.save_calendar(calendar)
+        guest.name = new_name
 
-    # Name aktualisieren
-    guest.name = new_name
+        # Wenn Zimmer gewechselt wird
+        if new_room_number != old_room_number:
 
-    # Wenn Zimmer gewechselt wird
-    if new_room_number != old_room_number:
+            # Neues Zimmer prüfen
+            new_room = s.get_room(new_room_number)
 
-        # Altes Zimmer freigeben
-        for r in rooms:
-            if r.number == old_room_number:
-                r.occupied = False
-                break
+            # Neues Zimmer existiert nicht → automatisch anlegen
+            if new_room is None:
+                new_room = Room(number=new_room_number, category=new_room_category, occupied=False)
+            else:
+                # Kategorie ggf. korrigieren
+                if new_room.category != new_room_category:
+                    new_room.category = new_room_category
 
-        # Neues Zimmer prüfen
-        new_room = get_room(hotel_id, new_room_number)
+            # Neues Zimmer darf nicht belegt sein
+            if new_room.occupied:
+                raise ValueError(f"Zimmer {new_room_number} ist bereits belegt.")
 
-        # Neues Zimmer existiert nicht → automatisch anlegen
-        if new_room is None:
-            new_room = Room(number=new_room_number, category=new_room_category, occupied=False)
-            rooms.append(new_room)
-        else:
-            # Kategorie ggf. korrigieren
-            if new_room.category != new_room_category:
-                new_room.category = new_room_category
+            # Altes Zimmer freigeben
+            _set_room_occupied(s, old_room_number, False)
 
-        # Neues Zimmer darf nicht belegt sein
-        if new_room.occupied:
-            raise ValueError(f"Zimmer {new_room_number} ist bereits belegt.")
+            # Neues Zimmer belegen
+            new_room.occupied = True
+            s.save_room(new_room)
 
-        # Neues Zimmer belegen
-        new_room.occupied = True
+            # Belegungsplan: Aufenthalt im alten Zimmer endet heute
+            _end_stay(s, guest)
 
-        # Gast aktualisieren
-        guest.room_number = new_room_number
+            # Gast aktualisieren
+            guest.room_number = new_room_number
+            _start_stay(s, guest)
 
-    # Kategorie aktualisieren
-    guest.room_category = new_room_category
+        # Kategorie aktualisieren
+        guest.room_category = new_room_category
 
-    # Neuer Preis gilt nur für zukünftige Nächte
-    guest.price_per_night = new_price
+        # Neuer Preis gilt nur für zukünftige Nächte
+        guest.price_per_night = new_price
 
-    # Speichern
-    update_guest(hotel_id, guest)
-    save_rooms(hotel_id, rooms)
+        s.save_guest(guest)
 
-    return guest
+        return guest
+
+    return run_session(hotel_id, _op)
 
 
 # ---------------------------------------------------------
 # Nächte
 # ---------------------------------------------------------
 def add_night_to_guest(hotel_id: str, guest_id: int, paid: bool) -> Guest:
-    guests = load_guests(hotel_id)
-    for g in guests:
-        if g.id == guest_id:
-            next_number = 1
-            if g.nights:
-                next_number = max(n.number for n in g.nights) + 1
-
-            # Jede Nacht speichert ihren eigenen Preis
-            g.nights.append(Night(
-                number=next_number,
-                paid=paid,
-                price=g.price_per_night
-            ))
+    def _op(s: TenantSession):
+        g = _require_guest(s, guest_id)
 
-            update_guest(hotel_id, g)
-            return g
+        # Jede Nacht speichert ihren eigenen Preis
+        g.nights.append(Night(
+            number=g.nights.next_number(),
+            paid=paid,
+            price=g.price_per_night
+        ))
 
-    raise ValueError("Gast nicht gefunden")
+        s.save_guest(g)
+
+        return g
+
+    return run_session(hotel_id, _op)
 
 
 def set_night_paid_status(
     hotel_id: str, guest_id: int, night_number: int, paid: bool
 ) -> Guest:
-    guest = get_guest_by_id(hotel_id, guest_id)
-    if not guest:
-        raise ValueError("Gast nicht gefunden")
+    def _op(s: TenantSession):
+        guest = _require_guest(s, guest_id)
 
-    for n in guest.nights:
-        if n.number == night_number:
-            n.paid = paid
-            break
+        guest.nights.set_paid(night_number, paid)
 
-    update_guest(hotel_id, guest)
-    return guest
+        s.save_guest(guest)
+
+        return guest
+
+    return run_session(hotel_id, _op)
+
+
+# ---------------------------------------------------------
+# Sammelaktionen (Reisegruppen, Sammelzahlungen)
+# ---------------------------------------------------------
+# Alle Prüfungen laufen im Speicher; geschrieben wird einmal am Ende
+# (ein Batch). Schlägt eine Prüfung fehl, wird nichts gespeichert.
+def add_guests_bulk(hotel_id: str, entries: List[dict]) -> List[Guest]:
+    """
+    Checkt mehrere Gäste auf einmal ein.
+    - entries: [{"name", "room_number", "room_category", "price_per_night"}, ...]
+    - belegtes oder innerhalb der Gruppe doppelt genutztes Zimmer → ValueError
+    - IDs werden mit einem einzigen Zähler-Aufruf reserviert
+    """
+    def _op(s: TenantSession):
+        # Alle Zimmer samt Belegungsplänen mit einem Lesezugriff statt zwei pro Gast
+        s.preload_rooms(e["room_number"] for e in entries)
+        for e in entries:
+            # Doppelte Zimmer fallen hier auf: das erste ist danach belegt
+            _occupy_room(s, e["room_number"], e["room_category"])
+
+        ids = s.next_guest_ids(len(entries))
+        guests = [
+            _new_guest(
+                guest_id, e["name"], e["room_number"], e["room_category"], e["price_per_night"]
+            )
+            for guest_id, e in zip(ids, entries)
+        ]
+        for g in guests:
+            _start_stay(s, g)
+            s.save_guest(g)
+        return guests
+
+    if not entries:
+        return []
+    return run_session(hotel_id, _op)
+
+
+def _require_guests(s: TenantSession, guest_ids: List[int]) -> List[Guest]:
+    # Ein Lesezugriff für alle statt einem pro Gast
+    s.preload(guests=True)
+    return [_require_guest(s, gid) for gid in guest_ids]
+
+
+def add_nights_bulk(hotel_id: str, guest_ids: List[int], paid: bool) -> List[Guest]:
+    """Fügt jedem der Gäste eine Nacht zu seinem aktuellen Preis hinzu."""
+    def _op(s: TenantSession):
+        guests = _require_guests(s, guest_ids)
+        for g in guests:
+            g.nights.append(Night(
+                number=g.nights.next_number(),
+                paid=paid,
+                price=g.price_per_night
+            ))
+            s.save_guest(g)
+        return guests
+
+    if not guest_ids:
+        return []
+    return run_session(hotel_id, _op)
+
+
+def set_nights_paid_bulk(
+    hotel_id: str,
+    guest_ids: List[int],
+    paid: bool = True,
+    night_numbers: Optional[List[int]] = None,
+) -> List[Guest]:
+    """
+    Setzt den Bezahlt-Status für mehrere Gäste.
+    - night_numbers=None → alle Nächte der Gäste
+    - sonst nur diese Nummern (fehlende werden übersprungen)
+    """
+    def _op(s: TenantSession):
+        guests = _require_guests(s, guest_ids)
+        for g in guests:
+            if night_numbers is None:
+                g.nights.set_all_paid(paid)
+            else:
+                for number in night_numbers:
+                    g.nights.set_paid(number, paid)
+            s.save_guest(g)
+        return guests
+
+    if not guest_ids:
+        return []
+    return run_session(hotel_id, _op)
 
 
 # ---------------------------------------------------------
 # Summenberechnung (mit Rückwärtskompatibilität)
 # ---------------------------------------------------------
 def calculate_nights_summary(guest: Guest) -> Tuple[int, int, float, float]:
-    paid_nights = [n for n in guest.nights if n.paid]
-    unpaid_nights = [n for n in guest.nights if not n.paid]
+    # Gespeicherte, bei jeder Änderung mitgeführte Summen – die Nächte werden
+    # dafür nicht dekodiert. Fehlen sie (alte Datensätze), wird einmal aus
+    # Bitmap und Preis-Abschnitten berechnet.
+    # Alte Nächte ohne price-Feld bekommen beim Laden guest.price_per_night
+    # (siehe models.guest_from_dict).
+    return guest.nights.summary()
 
-    count_paid = len(paid_nights)
-    count_unpaid = len(unpaid_nights)
 
-    # Falls alte Nächte kein price-Feld haben → fallback auf guest.price_per_night
-    def get_price(n):
-        return getattr(n, "price", guest.price_per_night)
+def _summary_differs(stored, actual) -> bool:
+    if stored[0] != actual[0] or stored[1] != actual[1]:
+        return True
+    # Summen werden aufaddiert → Rundungsfehler unter einem Cent ignorieren
+    return abs(stored[2] - actual[2]) >= 0.005 or abs(stored[3] - actual[3]) >= 0.005
 
-    sum_paid = sum(get_price(n) for n in paid_nights)
-    sum_unpaid = sum(get_price(n) for n in unpaid_nights)
 
-    return count_paid, count_unpaid, sum_paid, sum_unpaid
+def validate_guest_summaries(hotel_id: str, repair: bool = False) -> List[int]:
+    """
+    Vergleicht die gespeicherten Summen (count_paid, ...) aller aktiven Gäste
+    mit den aus den Nächten berechneten und gibt die IDs der Abweichungen zurück.
+    - repair=True: abweichende Summen neu berechnen und in einem Commit speichern
+    """
+    def _op(s: TenantSession):
+        wrong = []
+        for g in s.guests:
+            if _summary_differs(g.nights.summary(), g.nights.compute_summary()):
+                wrong.append(g.id)
+                if repair:
+                    g.nights.refresh_summary()
+                    s.save_guest(g)
+        return wrong
+
+    return run_session(hotel_id, _op)
 
 
 # ---------------------------------------------------------
 # Suche & Listen
 # ---------------------------------------------------------
-def search_guests_by_name(hotel_id: str, query: str) -> List[Guest]:
-    guests = load_guests(hotel_id)
-    query_lower = query.lower()
-    return [g for g in guests if query_lower in g.name.lower()]
+def search_guests_by_name(
+    hotel_id: str,
+    query: str,
+    limit: Optional[int] = None,
+    include_archive: bool = True,
+) -> List[Guest]:
+    """
+    Gäste, deren Name zur Anfrage passt, beste Treffer zuerst (search_index.py).
+    Findet auch Wortanfänge, Schreibweisen ohne Akzente/Umlaute ("Muller",
+    "Mueller" → "Müller") und ähnliche Namen.
+    Mit include_archive auch archivierte Gäste (bei gleichen Punkten nach
+    den aktiven).
+    """
+    ranked = load_search_index(hotel_id).search(query, limit)
+    state = load_state(hotel_id)
+    found = [(state.get_guest(guest_id), score) for guest_id, score in ranked]
+    found = [(g, score) for g, score in found if g is not None]
 
+    if include_archive:
+        found += _search_archive(hotel_id, query, limit)
+        # stabil: bei gleichen Punkten bleiben aktive Gäste vorne
+        found.sort(key=lambda item: -item[1])
+    guests = [g for g, _ in found]
+    return guests[:limit] if limit is not None else guests
 
-def list_all_guests(hotel_id: str, include_checked_out: bool = False) -> List[Guest]:
-    guests = load_guests(hotel_id)
-    if include_checked_out:
-        return guests
-    return [g for g in guests if g.status == "checked_in"]
+
+def search_archived_guests(hotel_id: str, query: str, limit: Optional[int] = None) -> List[Guest]:
+    """Nur archivierte Gäste, beste Treffer zuerst (Suche wie search_guests_by_name)."""
+    return [g for g, _ in _search_archive(hotel_id, query, limit)]
+
+
+def _search_archive(hotel_id: str, query: str, limit: Optional[int]) -> List[Tuple[Guest, float]]:
+    ranked = load_archive_search_index(hotel_id).search(query, limit)
+    if not ranked:
+        return []
+    # Nur die Treffer aus ihren Monaten laden
+    scores = dict(ranked)
+    guests = load_archived_guests(hotel_id, [guest_id for guest_id, _ in ranked])
+    return [(g, scores[g.id]) for g in guests]
+
+
+def list_all_guests(
+    hotel_id: str, include_checked_out: bool = False, include_archive: bool = True
+) -> List[Guest]:
+    """
+    Eingecheckte Gäste; mit include_checked_out alle Gäste nach ID – auch die
+    archivierten (include_archive=False: nur die aktive Liste).
+    """
+    if not include_checked_out:
+        return list_guests_with_status(hotel_id, "checked_in")
+
+    guests = load_state(hotel_id).guests()
+    if include_archive:
+        # Alle Archiv-Monate; nur für Auswertungen über den gesamten Bestand
+        archived = []
+        for month in sorted(load_archive_summary(hotel_id)["months"]):
+            archived.extend(load_archive(hotel_id, month))
+        if archived:
+            guests = sorted(guests + archived, key=lambda g: g.id)
+    return guests
+
+
+def list_guests_with_status(hotel_id: str, status: str) -> List[Guest]:
+    """Gäste mit diesem Status, aus dem Status-Index bzw. per Abfrage beim Server."""
+    return load_guests_with_status(hotel_id, status)
+
+
+def query_guests(
+    hotel_id: str,
+    status: Optional[str] = None,
+    room_number: Optional[int] = None,
+    checkin_from: Optional[date] = None,
+    checkin_to: Optional[date] = None,
+    limit: Optional[int] = None,
+    cursor: Optional[tuple] = None,
+) -> Tuple[List[Guest], Optional[tuple]]:
+    """
+    Gäste nach Status, Zimmer und Check-in-Zeitraum [von, bis), sortiert nach
+    Check-in und ID. Mit limit seitenweise: der zurückgegebene Cursor holt
+    die nächste Seite (None = keine weitere).
+    """
+    query = GuestQuery(
+        status=status,
+        room_number=room_number,
+        checkin_from=checkin_from,
+        checkin_to=checkin_to,
+    )
+    return run_guest_query(hotel_id, query, limit, cursor)
 
 
 # ---------------------------------------------------------
 # Checkout & Löschen
 # ---------------------------------------------------------
 def checkout_guest(hotel_id: str, guest_id: int) -> None:
-    guests = load_guests(hotel_id)
-    rooms = load_rooms(hotel_id)
-    today = datetime.now().strftime("%Y-%m-%d")
+    def _op(s: TenantSession):
+        g = s.get_guest(guest_id)
+        if not g:
+            return
+        s.preload_rooms([g.room_number])
 
-    for g in guests:
-        if g.id == guest_id:
-            g.status = "checked_out"
-            g.checkout_date = today
+        g.status = "checked_out"
+        g.checkout_date = date.today()
+        s.save_guest(g)
 
-            # Zimmer freigeben
-            for r in rooms:
-                if r.number == g.room_number:
-                    r.occupied = False
-                    break
-            break
+        # Zimmer freigeben
+        _set_room_occupied(s, g.room_number, False)
+        _end_stay(s, g)
 
-    save_guests(hotel_id, guests)
-    save_rooms(hotel_id, rooms)
+    run_session(hotel_id, _op)
 
 
 def delete_guest(hotel_id: str, guest_id: int) -> None:
-    guests = load_guests(hotel_id)
-    rooms = load_rooms(hotel_id)
+    def _op(s: TenantSession):
+        guest_to_delete = _require_guest(s, guest_id)
+        s.preload_rooms([guest_to_delete.room_number])
 
-    guest_to_delete = None
+        s.delete_guest(guest_id)
 
-    for g in guests:
-        if g.id == guest_id:
-            guest_to_delete = g
-            break
+        # Zimmer freigeben
+        _set_room_occupied(s, guest_to_delete.room_number, False)
+        _end_stay(s, guest_to_delete, remove=True)
 
-    if guest_to_delete is None:
-        raise ValueError("Gast nicht gefunden")
+    run_session(hotel_id, _op)
+
+
+# ---------------------------------------------------------
+# Archiv: abgereiste Gäste nach Monat
+# ---------------------------------------------------------
+def _is_archivable(guest: Guest, cutoff: date) -> bool:
+    if guest.status != "checked_out" or archive_month(guest) is None:
+        return False
+    if guest.checkout_date is None or guest.checkout_date > cutoff:
+        return False
+
+    # Offene Beträge bleiben in der aktiven Liste (Dashboard: offene Posten)
+    _, count_unpaid, _, _ = calculate_nights_summary(guest)
+    return count_unpaid == 0
+
+
+# Gäste pro Commit: jeder archivierte Gast kostet zwei Schreibzugriffe
+# (aktiv löschen, ins Archiv schreiben); Firestore erlaubt 500 pro Batch
+ARCHIVE_BATCH = 200
+
+
+def archive_departed_guests(hotel_id: str, today: Optional[date] = None) -> int:
+    """
+    Verschiebt ausgecheckte, vollständig bezahlte Gäste nach Ablauf von
+    archive_grace_days (Standard 30, negativ = nie) in das Monatsarchiv
+    ihres Check-ins. Gibt die Anzahl archivierter Gäste zurück.
+    Läuft als eigener Job (archive_guests.py), nicht beim Checkout.
+    """
+    grace_days = int(get_setting("archive_grace_days", 30))
+    if grace_days < 0:
+        return 0
+    cutoff = (today or date.today()) - timedelta(days=grace_days)
+
+    def _op(s: TenantSession):
+        checked_out = s.guests_with_status("checked_out")
+        archivable = [g for g in checked_out if _is_archivable(g, cutoff)]
+        for g in archivable[:ARCHIVE_BATCH]:
+            s.archive_guest(g)
+        return len(archivable[:ARCHIVE_BATCH]), len(archivable) > ARCHIVE_BATCH
+
+    total = 0
+    more = True
+    while more:
+        archived, more = run_session(hotel_id, _op)
+        total += archived
+    return total
+
+
+def list_archived_guests(hotel_id: str, year: int, month: int) -> List[Guest]:
+    return load_archive(hotel_id, f"{year:04d}-{month:02d}")
+
+
+def get_archive_summary(hotel_id: str) -> dict:
+    """
+    Kennzahlen des Archivs ohne die archivierten Gäste zu laden:
+    {"months": {"YYYY-MM": {"guests", "count_paid", "count_unpaid",
+    "sum_paid", "sum_unpaid"}}, "room_nights": {"<zimmer>": nächte}}
+    """
+    return load_archive_summary(hotel_id)
+
+
+def list_guests_for_month(hotel_id: str, year: int, month: int) -> List[Guest]:
+    """Alle Gäste mit Check-in im Monat: aktive plus die Archiv-Partition."""
+    first = date(year, month, 1)
+    next_month = date(year + month // 12, month % 12 + 1, 1)
+    active, _ = query_guests(hotel_id, checkin_from=first, checkin_to=next_month)
+    return active + list_archived_guests(hotel_id, year, month)
+
+
+# ---------------------------------------------------------
+# Kennzahlen für das Dashboard (meta/aggregates)
+# ---------------------------------------------------------
+def rebuild_aggregates(hotel_id: str) -> dict:
+    """
+    Baut meta/aggregates aus allen aktiven Gästen und der Archiv-Zusammenfassung
+    neu auf (Erstbefüllung, Reparatur). Ändert sich das Dokument währenddessen,
+    wird mit frischen Daten wiederholt.
+    """
+    def _op(s: TenantSession):
+        # Version merken: gleichzeitige Commits führen zur Wiederholung
+        s.get_meta(AGGREGATES_DOC_ID)
+
+        aggregates = empty_aggregates()
+        for g in s.guests:
+            add_counts(aggregates, guest_aggregates(g))
+            balance = open_balance(g)
+            if balance is not None:
+                aggregates["open_balances"][str(g.id)] = balance
+
+        archive = s.backend.archive_summary(hotel_id)
+        for month, m in archive["months"].items():
+            add_counts(aggregates, {
+                "guests": {"archived": m["guests"]},
+                "months": {month: {key: m[key] for key in (
+                    "count_paid", "count_unpaid", "sum_paid", "sum_unpaid"
+                )}},
+            })
+        add_counts(aggregates, {"room_nights": archive["room_nights"]})
+
+        aggregates["built"] = date.today().isoformat()
+        s.save_meta(AGGREGATES_DOC_ID, aggregates)
+        return aggregates
+
+    return run_session(hotel_id, _op)
+
+
+def get_dashboard_aggregates(hotel_id: str) -> dict:
+    """
+    Kennzahlen aus einem einzigen Dokument. Noch nie aufgebaut
+    (Hotel aus der Zeit davor) → einmalig rebuild_aggregates.
+    """
+    aggregates = load_aggregates(hotel_id)
+    if not aggregates or "built" not in aggregates:
+        aggregates = rebuild_aggregates(hotel_id)
+
+    result = empty_aggregates()
+    result.update(aggregates)
+    # Serverseitige Increments lassen Nullen stehen (z.B. Status ohne Gäste,
+    # Monat nach Löschung); add_counts in ein leeres dict lässt sie weg
+    for key in ("months", "room_nights", "guests"):
+        result[key] = add_counts({}, result[key])
+    return result
+
+
+# ---------------------------------------------------------
+# Belegungsplan & Reservierungen (reservations.py)
+# ---------------------------------------------------------
+# Jedes Zimmer hat einen Plan mit Zeiträumen [Anreise, Abreise).
+# Gäste ohne Reservierung stehen ab dem Check-in mit offener Abreise darin
+# (bis zur nächsten Reservierung des Zimmers) und werden beim Checkout
+# auf den tatsächlichen Abreisetag gekürzt.
+def _today() -> date:
+    return date.today()
+
+
+def _start_stay(s: TenantSession, guest: Guest) -> None:
+    calendar = s.get_calendar(guest.room_number)
+    today = _today()
+
+    reserved = calendar.covering(today)
+    if reserved is not None:
+        raise ValueError(
+            f"Zimmer {guest.room_number} ist heute für {reserved.guest_name} reserviert."
+        )
+
+    calendar.add(Reservation(
+        id=uuid.uuid4().hex,
+        room_number=guest.room_number,
+        guest_name=guest.name,
+        arrival=today,
+        departure=calendar.next_arrival(today) or OPEN_END,
+        status="checked_in",
+        guest_id=guest.id,
+    ))
+    s.save_calendar(calendar)
+
+
+def _end_stay(s: TenantSession, guest: Guest, remove: bool = False) -> None:
+    calendar = s.get_calendar(guest.room_number)
+    stay = calendar.find_stay(guest.id)
+    if stay is None:
+        # Gast von vor dem Belegungsplan
+        return
+
+    today = _today()
+    if remove or stay.arrival >= today:
+        # Gelöscht oder noch am Anreisetag abgereist: keine belegte Nacht
+        calendar.remove(stay.id)
+    else:
+        # Über die nächste Anreise hinaus geblieben: nur bis dahin eintragen,
+        # statt den Checkout an der Überschneidung scheitern zu lassen
+        departure = today
+        following = calendar.next_arrival(stay.arrival + timedelta(days=1))
+        if following is not None and following < departure:
+            departure = following
+        calendar.change(stay, stay.arrival, departure)
+        stay.status = "checked_out"
+
+    # Alte Aufenthalte nicht endlos mitschleppen
+    keep_days = int(get_setting("calendar_keep_days", 365))
+    calendar.prune(date.today() - timedelta(days=keep_days))
+    s.save_calendar(calendar)
+
+
+def get_occupancy_index(hotel_id: str) -> OccupancyIndex:
+    """Zimmer mit ihren Belegungsplänen (ein Lesezugriff für alle Pläne)."""
+    return OccupancyIndex(load_state(hotel_id).rooms(), load_calendars(hotel_id))
+
+
+def find_free_rooms(
+    hotel_id: str,
+    arrival: date,
+    departure: date,
+    room_category: Optional[str] = None,
+) -> List[Room]:
+    """
+    Zimmer, die von arrival bis departure (Abreisetag) frei sind.
+    - optional nur eine Kategorie
+    - belegte Zimmer ohne Eintrag im Plan gelten als belegt (Abreise offen)
+    """
+    if departure <= arrival:
+        raise ValueError("Die Abreise muss nach der Anreise liegen.")
+    return get_occupancy_index(hotel_id).free_rooms(
+        arrival, departure, room_category, today=_today()
+    )
+
+
+def book_room(
+    hotel_id: str,
+    room_number: int,
+    guest_name: str,
+    arrival: date,
+    departure: date,
+) -> Reservation:
+    """
+    Reserviert ein Zimmer für [arrival, departure).
+    - Zimmer muss existieren, Anreise frühestens heute
+    - Überschneidung mit einer anderen Reservierung → ValueError
+    """
+    if arrival < date.today():
+        raise ValueError("Die Anreise liegt in der Vergangenheit.")
+
+    def _op(s: TenantSession):
+        s.preload_rooms([room_number])
+        room = s.get_room(room_number)
+        if room is None:
+            raise ValueError(f"Zimmer {room_number} existiert nicht.")
+
+        calendar = s.get_calendar(room_number)
+        today = _today()
+        stay = calendar.covering(today)
+        if room.occupied and stay is None:
+            raise ValueError(f"Zimmer {room_number} ist belegt (Abreise offen).")
+
+        # Laufender Aufenthalt ohne Abreisedatum endet spätestens mit dieser Anreise
+        if (
+            stay is not None
+            and stay.status == "checked_in"
+            and stay.departure == OPEN_END
+            and arrival > today
+        ):
+            calendar.change(stay, stay.arrival, arrival)
+
+        reservation = Reservation(
+            id=uuid.uuid4().hex,
+            room_number=room_number,
+            guest_name=guest_name,
+            arrival=arrival,
+            departure=departure,
+        )
+        calendar.add(reservation)
+        s.save_calendar(calendar)
+        return reservation
+
+    return run_session(hotel_id, _op)
+
+
+def _require_reservation(s: TenantSession, room_number: int, reservation_id: str):
+    calendar = s.get_calendar(room_number)
+    reservation = calendar.find(reservation_id)
+    if reservation is None or reservation.status != "reserved":
+        raise ValueError("Reservierung nicht gefunden")
+    return calendar, reservation
+
+
+def cancel_reservation(hotel_id: str, room_number: int, reservation_id: str) -> None:
+    def _op(s: TenantSession):
+        calendar, reservation = _require_reservation(s, room_number, reservation_id)
+        calendar.remove(reservation.id)
+        s.save_calendar(calendar)
+
+    run_session(hotel_id, _op)
+
+
+def check_in_reservation(
+    hotel_id: str, room_number: int, reservation_id: str, price_per_night: float
+) -> Guest:
+    """
+    Checkt den Gast einer Reservierung ein.
+    - vor dem Anreisetag nur, wenn das Zimmer ab heute frei ist
+    - die Reservierung bleibt als Aufenthalt im Plan (status "checked_in")
+    """
+    def _op(s: TenantSession):
+        s.preload_rooms([room_number])
+        calendar, reservation = _require_reservation(s, room_number, reservation_id)
+        today = _today()
+        if reservation.arrival > today:
+            # Vorzeitige Anreise: prüft auf Überschneidung
+            calendar.change(reservation, today, reservation.departure)
+
+        room = s.get_room(room_number)
+        category = room.category if room is not None else ""
+        _occupy_room(s, room_number, category)
+
+        guest = _new_guest(
+            s.next_guest_id(), reservation.guest_name, room_number, category, price_per_night
+        )
+        s.save_guest(guest)
+
+        reservation.status = "checked_in"
+        reservation.guest_id = guest.id
+        s.save_calendar(calendar)
+        return guest
+
+    return run_session(hotel_id, _op)
+
+
+def get_next_reservation(
+    hotel_id: str, room_number: int, today: Optional[date] = None
+) -> Optional[Reservation]:
+    """
+    Nächste Reservierung des Zimmers ab morgen. Ein heutiger Check-in ohne
+    Reservierung endet spätestens mit deren Anreise (Hinweis beim Check-in).
+    """
+    day = (today or date.today()) + timedelta(days=1)
+    reservations = sorted(load_calendar(hotel_id, room_number), key=lambda r: r.arrival)
+    return next(
+        (r for r in reservations if r.status == "reserved" and r.arrival >= day), None
+    )
+
+
+def list_upcoming_reservations(hotel_id: str, today: Optional[date] = None) -> List[Reservation]:
+    """Noch nicht eingecheckte Reservierungen, nach Anreise sortiert."""
+    day = today or date.today()
+    index = get_occupancy_index(hotel_id)
+    upcoming = [
+        r
+        for calendar in index.calendars.values()
+        for r in calendar
+        if r.status == "reserved" and r.departure > day
+    ]
+    return sorted(upcoming, key=lambda r: (r.arrival, r.room_number))
+
+
+# ---------------------------------------------------------
+# Auswertungen über das Nächte-Journal (reporting.py)
+# ---------------------------------------------------------
+def get_night_ledger(hotel_id: str, include_archive: bool = True) -> "NightLedger":
+    """Alle Nächte des Hotels spaltenweise: aktive Gäste plus alle Archiv-Monate."""
+    # NumPy erst hier laden: nur die Auswertungen brauchen es
+    from reporting import build_ledger
 
-    # Zimmer freigeben
-    for r in rooms:
-        if r.number == guest_to_delete.room_number:
-            r.occupied = False
-            break
+    guests = list_all_guests(hotel_id, include_checked_out=True, include_archive=include_archive)
+    return build_ledger(guests)
 
-    guests = [g for g in guests if g.id != guest_id]
 
-    save_guests(hotel_id, guests)
-    save_rooms(hotel_id, rooms)
+def count_rooms(hotel_id: str) -> int:
+    return len(load_state(hotel_id).rooms())
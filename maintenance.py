@@ -0,0 +1,63 @@
+"""
+Wartung der mitgeführten Kennzahlen.
+
+Aufruf:
+    python maintenance.py check-summaries              # alle Hotels prüfen
+    python maintenance.py check-summaries --repair     # Abweichungen reparieren
+    python maintenance.py check-summaries hotel_a ...  # nur bestimmte Hotels
+    python maintenance.py rebuild-aggregates           # Dashboard-Kennzahlen neu aufbauen
+"""
+import argparse
+import sys
+
+from database import get_backend
+from logic import rebuild_aggregates, validate_guest_summaries
+
+
+def check_summaries(hotel_ids, repair: bool) -> int:
+    found = 0
+    for hotel_id in hotel_ids:
+        wrong = validate_guest_summaries(hotel_id, repair=repair)
+        found += len(wrong)
+        if not wrong:
+            print(f"{hotel_id}: ok")
+        else:
+            action = "repariert" if repair else "abweichend"
+            print(f"{hotel_id}: {len(wrong)} Gäste {action} (IDs {', '.join(map(str, wrong))})")
+    return found
+
+
+def rebuild_all_aggregates(hotel_ids) -> None:
+    for hotel_id in hotel_ids:
+        aggregates = rebuild_aggregates(hotel_id)
+        print(
+            f"{hotel_id}: {len(aggregates['months'])} Monate, "
+            f"{len(aggregates['open_balances'])} offene Posten"
+        )
+
+
+def main(argv) -> int:
+    parser = argparse.ArgumentParser(description="Wartung der mitgeführten Kennzahlen")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    check = commands.add_parser("check-summaries", help="Summen pro Gast prüfen")
+    check.add_argument("hotel_ids", nargs="*", help="Standard: alle Hotels")
+    check.add_argument("--repair", action="store_true", help="Abweichungen neu berechnen")
+
+    rebuild = commands.add_parser("rebuild-aggregates", help="meta/aggregates neu aufbauen")
+    rebuild.add_argument("hotel_ids", nargs="*", help="Standard: alle Hotels")
+
+    args = parser.parse_args(argv)
+    hotel_ids = args.hotel_ids or get_backend().list_hotel_ids()
+
+    if args.command == "check-summaries":
+        found = check_summaries(hotel_ids, args.repair)
+        # Ohne --repair: Abweichungen als Fehler melden (z.B. für cron)
+        return 1 if found and not args.repair else 0
+    if args.command == "rebuild-aggregates":
+        rebuild_all_aggregates(hotel_ids)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
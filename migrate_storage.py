@@ -0,0 +1,41 @@
+"""
+Einmalige Migration: "data"-Arrays → ein Dokument pro Gast / Zimmer.
+
+Aufruf:
+    python migrate_storage.py              # alle Hotels
+    python migrate_storage.py hotel_a ...  # nur bestimmte Hotels
+
+Danach in secrets.toml  storage_layout = "documents"  setzen.
+Die Migration ist idempotent: bereits migrierte Hotels werden übersprungen.
+"""
+import sys
+
+from firebase_db import migrate_to_documents, list_hotel_ids, ensure_hotel_document
+
+# Sammlung → Feld, das als Dokument-ID dient
+COLLECTIONS = {
+    "gaeste": "id",
+    "raeume": "number",
+}
+
+
+def migrate_hotel(hotel_id: str) -> dict:
+    ensure_hotel_document(hotel_id)
+
+    result = {}
+    for subpath, key in COLLECTIONS.items():
+        result[subpath] = migrate_to_documents(f"{hotel_id}/{subpath}", key)
+    return result
+
+
+def main(argv):
+    hotel_ids = argv or list_hotel_ids()
+
+    for hotel_id in hotel_ids:
+        result = migrate_hotel(hotel_id)
+        summary = ", ".join(f"{k}: {v}" for k, v in result.items())
+        print(f"{hotel_id}: {summary}")
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
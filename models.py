@@ -1,79 +1,472 @@
-from dataclasses import dataclass, asdict, field
+from dataclasses import dataclass, field
+from datetime import date, datetime
 from typing import List, Optional
 
 # ---------------------------------------------------------
 # Datenklasse: Nacht
 # ---------------------------------------------------------
-@dataclass
+# slots=True: kein __dict__ pro Objekt → weniger Speicher, schnellerer Zugriff
+# frozen=True: Nächte aus PackedNights sind Kopien; eine Zuweisung wie
+# n.paid = True ginge verloren und schlägt deshalb mit einem Fehler fehl
+@dataclass(frozen=True, slots=True)
 class Night:
     number: int
     paid: bool = False
     price: float = 0.0   # <-- WICHTIG: hinzugefügt!
 
 
+# ---------------------------------------------------------
+# Kompakte Nächte: Bezahlt-Bitmap + Preis-Abschnitte
+# ---------------------------------------------------------
+class PackedNights:
+    """
+    Alle Nächte eines Gastes in kompakter Form.
+    - paid:     Bitmap als Zahl, Bit i = Nacht i bezahlt
+    - segments: Preise lauflängenkodiert, [[anzahl, preis], ...]
+    - numbers:  Nummern der Nächte; None = fortlaufend 1..n (Normalfall)
+    Verhält sich wie eine Liste von Night (len, Iteration, Index, append).
+    Iterieren und Index liefern Kopien (Night ist unveränderlich):
+    Änderungen nur über append(), set_paid() und set_all_paid().
+    Gespeichert als "nights_packed" (siehe guest_to_dict):
+        {"paid": "<hex>", "prices": [[anzahl, preis], ...]}
+    Aus gespeicherten Daten wird erst beim ersten Zugriff dekodiert –
+    Seiten, die nur Namen und Status brauchen, zahlen dafür nichts.
+    Die Summen (summary) werden bei append/set_paid mitgeführt und mit dem
+    Gast gespeichert (count_paid, ...); summary() dekodiert dann gar nicht.
+    """
+
+    __slots__ = (
+        "_paid", "_segments", "_numbers", "_count", "_raw", "_fallback_price", "_summary",
+    )
+
+    def __init__(self, paid: int = 0, segments=None, numbers: Optional[List[int]] = None):
+        self._paid = paid
+        self._segments: List[List] = [list(seg) for seg in (segments or [])]
+        self._numbers = numbers
+        self._count = sum(count for count, _ in self._segments)
+        self._raw = None
+        self._fallback_price = 0.0
+        # (count_paid, count_unpaid, sum_paid, sum_unpaid); None = noch nicht berechnet
+        self._summary = None if self._segments else (0, 0, 0.0, 0.0)
+
+    # --- Aufbau -------------------------------------------
+    @classmethod
+    def from_nights(cls, nights) -> "PackedNights":
+        packed = cls()
+        for n in nights:
+            packed.append(n)
+        return packed
+
+    @classmethod
+    def _lazy(cls, raw, fallback_price: float = 0.0, summary=None) -> "PackedNights":
+        packed = cls.__new__(cls)
+        packed._raw = raw
+        packed._fallback_price = fallback_price
+        packed._summary = summary
+        return packed
+
+    @classmethod
+    def from_dict(cls, data: dict, summary=None) -> "PackedNights":
+        """Aus "nights_packed"; dekodiert beim ersten Zugriff."""
+        return cls._lazy(data, summary=summary)
+
+    @classmethod
+    def from_legacy(cls, nights: list, fallback_price: float = 0.0, summary=None) -> "PackedNights":
+        """Aus dem alten Format [{number, paid, price}, ...]; ebenfalls verzögert."""
+        return cls._lazy(nights, fallback_price, summary)
+
+    def copy(self) -> "PackedNights":
+        """Unabhängige Kopie; noch nicht dekodierte Daten bleiben verzögert."""
+        raw = self._raw
+        if raw is not None:
+            return PackedNights._lazy(raw, self._fallback_price, self._summary)
+        packed = PackedNights(
+            self._paid,
+            self._segments,
+            list(self._numbers) if self._numbers is not None else None,
+        )
+        packed._summary = self._summary
+        return packed
+
+    def _decode(self) -> None:
+        """
+        Dekodiert beim ersten Zugriff (sonst nichts zu tun).
+        Geteilte Gäste (TenantCache) werden aus mehreren Threads gelesen:
+        _raw wird nur einmal gelesen, der Zustand erst vollständig aufgebaut
+        und dann veröffentlicht. Dekodieren zwei Threads gleichzeitig,
+        schreiben beide dasselbe Ergebnis.
+        """
+        raw = self._raw
+        if raw is None:
+            return
+        if isinstance(raw, dict):
+            numbers = raw.get("numbers")
+            decoded = PackedNights(
+                paid=int(raw.get("paid") or "0", 16),
+                segments=raw.get("prices", []),
+                numbers=list(numbers) if numbers is not None else None,
+            )
+        else:
+            decoded = PackedNights.from_nights(
+                Night(
+                    n.get("number", 0),
+                    n.get("paid", False),
+                    n.get("price", self._fallback_price),  # <-- fallback
+                )
+                for n in raw
+            )
+
+        self._paid = decoded._paid
+        self._segments = decoded._segments
+        self._numbers = decoded._numbers
+        self._count = decoded._count
+        # Zuletzt: andere Threads sehen erst danach den dekodierten Zustand
+        self._raw = None
+
+    @property
+    def decoded(self) -> bool:
+        return self._raw is None
+
+    def to_dict(self) -> dict:
+        raw = self._raw
+        if isinstance(raw, dict):
+            # Unverändert → gespeicherte Form direkt weiterreichen
+            return raw
+        if self._raw is not None:
+            self._decode()
+
+        data = {
+            "paid": format(self._paid, "x"),
+            "prices": [list(seg) for seg in self._segments],
+        }
+        if self._numbers is not None:
+            data["numbers"] = list(self._numbers)
+        return data
+
+    # --- Listen-Verhalten ---------------------------------
+    def __len__(self) -> int:
+        if self._raw is not None:
+            self._decode()
+        return self._count
+
+    def __bool__(self) -> bool:
+        return len(self) > 0
+
+    def _number(self, index: int) -> int:
+        return self._numbers[index] if self._numbers is not None else index + 1
+
+    def _price(self, index: int) -> float:
+        start = 0
+        for count, price in self._segments:
+            if index < start + count:
+                return price
+            start += count
+        raise IndexError(index)
+
+    def __iter__(self):
+        if self._raw is not None:
+            self._decode()
+
+        paid = self._paid
+        index = 0
+        for count, price in self._segments:
+            for _ in range(count):
+                yield Night(self._number(index), bool(paid >> index & 1), price)
+                index += 1
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return list(self)[index]
+
+        count_all = len(self)
+        if index < 0:
+            index += count_all
+        if not 0 <= index < count_all:
+            raise IndexError(index)
+
+        start = 0
+        for count, price in self._segments:
+            if index < start + count:
+                return Night(self._number(index), bool(self._paid >> index & 1), price)
+            start += count
+
+    def __eq__(self, other):
+        if isinstance(other, (PackedNights, list)):
+            return list(self) == list(other)
+        return NotImplemented
+
+    def __repr__(self):
+        return f"PackedNights({list(self)!r})"
+
+    def append(self, night: Night) -> None:
+        if self._raw is not None:
+            self._decode()
+        index = self._count
+
+        # Lücke oder abweichende Nummer → Nummern explizit führen
+        if self._numbers is None and night.number != index + 1:
+            self._numbers = list(range(1, index + 1))
+        if self._numbers is not None:
+            self._numbers.append(night.number)
+
+        if night.paid:
+            self._paid |= 1 << index
+
+        if self._segments and self._segments[-1][1] == night.price:
+            self._segments[-1][0] += 1
+        else:
+            self._segments.append([1, night.price])
+        self._count += 1
+
+        if self._summary is not None:
+            count_paid, count_unpaid, sum_paid, sum_unpaid = self._summary
+            if night.paid:
+                self._summary = (count_paid + 1, count_unpaid, sum_paid + night.price, sum_unpaid)
+            else:
+                self._summary = (count_paid, count_unpaid + 1, sum_paid, sum_unpaid + night.price)
+
+    # --- Zugriffe ohne Night-Objekte ----------------------
+    def next_number(self) -> int:
+        if not self:
+            return 1
+        if self._numbers is None:
+            return self._count + 1
+        return max(self._numbers) + 1
+
+    def set_paid(self, number: int, paid: bool) -> bool:
+        """
+        Setzt den Bezahlt-Status einer Nacht; False, wenn es sie nicht gibt.
+        Der einzige Weg dafür – Night-Objekte aus der Iteration sind Kopien.
+        """
+        if self._raw is not None:
+            self._decode()
+
+        if self._numbers is None:
+            index = number - 1
+            if not 0 <= index < self._count:
+                return False
+        else:
+            if number not in self._numbers:
+                return False
+            index = self._numbers.index(number)
+
+        if bool(self._paid >> index & 1) == paid:
+            return True
+
+        if paid:
+            self._paid |= 1 << index
+        else:
+            self._paid &= ~(1 << index)
+
+        if self._summary is not None:
+            count_paid, count_unpaid, sum_paid, sum_unpaid = self._summary
+            price = self._price(index)
+            if paid:
+                self._summary = (count_paid + 1, count_unpaid - 1, sum_paid + price, sum_unpaid - price)
+            else:
+                self._summary = (count_paid - 1, count_unpaid + 1, sum_paid - price, sum_unpaid + price)
+        return True
+
+    def set_all_paid(self, paid: bool) -> None:
+        _, _, sum_paid, sum_unpaid = self.compute_summary()
+        self._paid = (1 << self._count) - 1 if paid else 0
+
+        total = sum_paid + sum_unpaid
+        if paid:
+            self._summary = (self._count, 0, total, 0.0)
+        else:
+            self._summary = (0, self._count, 0.0, total)
+
+    def summary(self):
+        """(count_paid, count_unpaid, sum_paid, sum_unpaid), ohne Night-Objekte."""
+        if self._summary is None:
+            self._summary = self.compute_summary()
+        return self._summary
+
+    def refresh_summary(self) -> None:
+        """Mitgeführte Summen verwerfen und neu berechnen."""
+        self._summary = self.compute_summary()
+
+    def packed(self):
+        """
+        (anzahl, paid-Bitmap, Preis-Abschnitte, Nummern oder None) – die
+        kompakte Form zum spaltenweisen Auswerten (siehe reporting.py).
+        Nicht verändern; Änderungen nur über append/set_paid.
+        """
+        if self._raw is not None:
+            self._decode()
+        return self._count, self._paid, self._segments, self._numbers
+
+    def compute_summary(self):
+        """Summen neu aus Bitmap und Preis-Abschnitten (Prüfung, Reparatur)."""
+        if self._raw is not None:
+            self._decode()
+
+        count_paid = 0
+        sum_paid = 0.0
+        sum_unpaid = 0.0
+
+        start = 0
+        for count, price in self._segments:
+            paid_here = bin(self._paid >> start & ((1 << count) - 1)).count("1")
+            count_paid += paid_here
+            sum_paid += paid_here * price
+            sum_unpaid += (count - paid_here) * price
+            start += count
+
+        return count_paid, self._count - count_paid, sum_paid, sum_unpaid
+
+
 # ---------------------------------------------------------
 # Datenklasse: Gast
 # ---------------------------------------------------------
-@dataclass
+@dataclass(slots=True)
 class Guest:
     id: int
     name: str
     room_number: int
     room_category: str
     price_per_night: float
-    nights: List[Night] = field(default_factory=list)
-    checkin_date: str = ""
-    checkout_date: Optional[str] = None
+    nights: PackedNights = field(default_factory=PackedNights)
+    checkin_date: Optional[date] = None
+    checkout_date: Optional[date] = None
     status: str = "checked_in"  # "checked_in" oder "checked_out"
 
+    def __post_init__(self):
+        # Listen von Night (z.B. nights=[]) in die kompakte Form bringen
+        if not isinstance(self.nights, PackedNights):
+            self.nights = PackedNights.from_nights(self.nights)
+
 
 # ---------------------------------------------------------
 # Datenklasse: Zimmer
 # ---------------------------------------------------------
-@dataclass
+@dataclass(slots=True)
 class Room:
     number: int
     category: str  # "Einzel", "Doppel", "Familie", ...
     occupied: bool = False
 
 
+# ---------------------------------------------------------
+# Datenklasse: Reservierung (Belegung eines Zimmers über Daten)
+# ---------------------------------------------------------
+# Abreise offen (Gast ohne geplantes Abreisedatum)
+OPEN_END = date.max
+
+
+@dataclass(slots=True)
+class Reservation:
+    id: str
+    room_number: int
+    guest_name: str
+    arrival: date             # erste Nacht
+    departure: date           # Abreisetag (nicht mehr belegt)
+    status: str = "reserved"  # "reserved", "checked_in" oder "checked_out"
+    guest_id: Optional[int] = None  # ab dem Check-in
+
+
+# ---------------------------------------------------------
+# Datum: gespeichert als ISO-Text, im Modell als date
+# ---------------------------------------------------------
+# Einmal beim Dekodieren umgewandelt; Vergleiche, Sortierung und
+# Monatsgruppen arbeiten danach ohne strptime.
+def parse_date(value) -> Optional[date]:
+    """
+    Gespeichertes Datum → date.
+    - "YYYY-MM-DD" (auch mit angehängter Uhrzeit), date oder datetime
+    - leer oder unlesbar → None
+    """
+    if not value:
+        return None
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, date):
+        return value
+    try:
+        return date.fromisoformat(value[:10])
+    except (TypeError, ValueError):
+        return None
+
+
+def format_date(value: Optional[date]) -> Optional[str]:
+    """date → ISO-Text für die Speicherung (None bleibt None)."""
+    return value.isoformat() if value is not None else None
+
+
+# Gespeicherte Summen eines Gastes (siehe PackedNights.summary)
+SUMMARY_FIELDS = ("count_paid", "count_unpaid", "sum_paid", "sum_unpaid")
+
+
+def _stored_summary(data: dict):
+    try:
+        return tuple(data[name] for name in SUMMARY_FIELDS)
+    except KeyError:
+        # Ältere Datensätze: Summen werden bei Bedarf berechnet
+        return None
+
+
 # ---------------------------------------------------------
 # Konvertierung: Guest → dict
 # ---------------------------------------------------------
+# Ältere App-Versionen lesen nur die Liste "nights". Sie wird zusätzlich
+# geschrieben, bis alle Instanzen nights_packed kennen; danach
+# legacy_nights = "off" setzen (siehe database.create_backend).
+WRITE_LEGACY_NIGHTS = True
+
+
 def guest_to_dict(guest: Guest) -> dict:
-    return {
+    data = {
         "id": guest.id,
         "name": guest.name,
         "room_number": guest.room_number,
         "room_category": guest.room_category,
         "price_per_night": guest.price_per_night,
-        "nights": [
-            {
-                "number": n.number,
-                "paid": n.paid,
-                "price": n.price,   # <-- WICHTIG: hinzugefügt!
-            }
-            for n in guest.nights
-        ],
-        "checkin_date": guest.checkin_date,
-        "checkout_date": guest.checkout_date,
+        "nights_packed": guest.nights.to_dict(),
+        # Mitgeführte Summen: Übersichten brauchen die Nächte nicht zu dekodieren
+        **dict(zip(SUMMARY_FIELDS, guest.nights.summary())),
+        "checkin_date": format_date(guest.checkin_date) or "",
+        "checkout_date": format_date(guest.checkout_date),
         "status": guest.status,
     }
+    if WRITE_LEGACY_NIGHTS:
+        data["nights"] = [
+            {"number": n.number, "paid": n.paid, "price": n.price}
+            for n in guest.nights
+        ]
+    return data
 
 
 # ---------------------------------------------------------
 # Konvertierung: dict → Guest
 # ---------------------------------------------------------
 def guest_from_dict(data: dict) -> Guest:
-    nights_raw = data.get("nights", [])
-    nights = [
-        Night(
-            number=n.get("number", 0),
-            paid=n.get("paid", False),
-            price=n.get("price", data.get("price_per_night", 0.0)),  # <-- fallback
+    # Schneller Weg: vollständige Datensätze im aktuellen Format
+    try:
+        return Guest(
+            data["id"],
+            data["name"],
+            data["room_number"],
+            data["room_category"],
+            data["price_per_night"],
+            PackedNights._lazy(data["nights_packed"], summary=_stored_summary(data)),
+            parse_date(data["checkin_date"]),
+            parse_date(data["checkout_date"]),
+            data["status"],
+        )
+    except KeyError:
+        pass
+
+    # Alte oder unvollständige Datensätze: fehlende Felder mit Standardwerten
+    packed = data.get("nights_packed")
+    summary = _stored_summary(data)
+    if packed is not None:
+        nights = PackedNights.from_dict(packed, summary)
+    else:
+        # Altes Format: Liste von {number, paid, price}
+        nights = PackedNights.from_legacy(
+            data.get("nights", []), data.get("price_per_night", 0.0), summary
         )
-        for n in nights_raw
-    ]
 
     return Guest(
         id=data.get("id", 0),
@@ -82,8 +475,8 @@ def guest_from_dict(data: dict) -> Guest:
         room_category=data.get("room_category", ""),
         price_per_night=data.get("price_per_night", 0.0),
         nights=nights,
-        checkin_date=data.get("checkin_date", ""),
-        checkout_date=data.get("checkout_date"),
+        checkin_date=parse_date(data.get("checkin_date")),
+        checkout_date=parse_date(data.get("checkout_date")),
         status=data.get("status", "checked_in"),
     )
 
@@ -92,15 +485,46 @@ def guest_from_dict(data: dict) -> Guest:
 # Konvertierung: Room → dict
 # ---------------------------------------------------------
 def room_to_dict(room: Room) -> dict:
-    return asdict(room)
+    # Kein asdict(): das kopiert jedes Feld rekursiv
+    return {"number": room.number, "category": room.category, "occupied": room.occupied}
 
 
 # ---------------------------------------------------------
 # Konvertierung: dict → Room
 # ---------------------------------------------------------
 def room_from_dict(data: dict) -> Room:
-    return Room(
-        number=data.get("number", 0),
-        category=data.get("category", ""),
-        occupied=data.get("occupied", False),
+    try:
+        return Room(data["number"], data["category"], data["occupied"])
+    except KeyError:
+        return Room(
+            number=data.get("number", 0),
+            category=data.get("category", ""),
+            occupied=data.get("occupied", False),
+        )
+
+
+# ---------------------------------------------------------
+# Konvertierung: Reservation ↔ dict
+# ---------------------------------------------------------
+def reservation_to_dict(reservation: Reservation) -> dict:
+    return {
+        "id": reservation.id,
+        "room_number": reservation.room_number,
+        "guest_name": reservation.guest_name,
+        "arrival": format_date(reservation.arrival),
+        "departure": format_date(reservation.departure),
+        "status": reservation.status,
+        "guest_id": reservation.guest_id,
+    }
+
+
+def reservation_from_dict(data: dict) -> Reservation:
+    return Reservation(
+        id=data["id"],
+        room_number=data.get("room_number", 0),
+        guest_name=data.get("guest_name", ""),
+        arrival=parse_date(data.get("arrival")) or date.min,
+        departure=parse_date(data.get("departure")) or OPEN_END,
+        status=data.get("status", "reserved"),
+        guest_id=data.get("guest_id"),
     )
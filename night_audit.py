@@ -0,0 +1,136 @@
+"""
+Nachtlauf (Night Audit): bucht jedem eingecheckten Gast eine Nacht.
+
+- Preis: der aktuelle price_per_night des Gastes, Nacht unbezahlt
+- pro Hotel ein Commit für je AUDIT_BATCH Gäste (ein Firestore-Batch
+  fasst höchstens 500 Schreibvorgänge)
+- idempotent pro Geschäftsdatum: der Fortschritt (Datum, zuletzt
+  gebuchte Gast-ID) steht in meta/night_audit und wird im selben Commit
+  geschrieben wie die Nächte; ein abgebrochener Lauf macht beim nächsten
+  Aufruf dort weiter, ein zweiter Lauf für dasselbe (oder ein früheres)
+  Datum bucht nichts
+
+Aufruf (z.B. per cron kurz nach Mitternacht):
+    python night_audit.py                              # alle Hotels, heute
+    python night_audit.py hotel_a hotel_b              # nur diese Hotels
+    python night_audit.py --date 2025-03-01 hotel_a    # bestimmtes Datum
+"""
+import argparse
+import sys
+import time
+from datetime import date
+from typing import List, Optional
+
+from database import get_backend
+from models import Night
+from unit_of_work import TenantSession, run_session
+
+META_DOC_ID = "night_audit"
+# Gäste pro Commit; Rest des Batches: Verwaltungsdokument und Zähler
+AUDIT_BATCH = 400
+
+
+def run_night_audit(hotel_id: str, business_date: Optional[date] = None) -> dict:
+    """
+    Führt den Nachtlauf für ein Hotel aus.
+    Ergebnis: {"hotel_id", "date", "posted": gebuchte Nächte,
+               "skipped": True, wenn das Datum schon gebucht war, "ms"}
+    """
+    day = (business_date or date.today()).isoformat()
+    start = time.perf_counter()
+
+    def _op(s: TenantSession):
+        audit = s.get_meta(META_DOC_ID) or {}
+        # ISO-Daten lassen sich als Text vergleichen
+        if audit.get("last_date", "") >= day:
+            return None
+
+        # Abgebrochener Lauf für dieses Datum: nach der zuletzt gebuchten ID weiter
+        resumed = audit.get("date") == day
+        after = audit.get("last_guest_id", 0) if resumed else 0
+        posted = audit.get("posted", 0) if resumed else 0
+
+        guests = sorted(
+            (g for g in s.guests_with_status("checked_in") if g.id > after),
+            key=lambda g: g.id,
+        )
+        batch = guests[:AUDIT_BATCH]
+        for g in batch:
+            g.nights.append(Night(
+                number=g.nights.next_number(),
+                paid=False,
+                price=g.price_per_night,
+            ))
+            s.save_guest(g)
+        posted += len(batch)
+
+        if len(guests) > AUDIT_BATCH:
+            s.save_meta(META_DOC_ID, {
+                "last_date": audit.get("last_date", ""),
+                "date": day,
+                "last_guest_id": batch[-1].id,
+                "posted": posted,
+            })
+            return posted, True
+
+        s.save_meta(META_DOC_ID, {"last_date": day, "posted": posted})
+        return posted, False
+
+    posted = None
+    more = True
+    while more:
+        result = run_session(hotel_id, _op)
+        if result is None:
+            break
+        posted, more = result
+
+    return {
+        "hotel_id": hotel_id,
+        "date": day,
+        "posted": posted or 0,
+        "skipped": posted is None,
+        "ms": (time.perf_counter() - start) * 1000,
+    }
+
+
+def run_all(hotel_ids: Optional[List[str]] = None, business_date: Optional[date] = None) -> List[dict]:
+    """
+    Nachtlauf für mehrere Hotels (Standard: alle).
+    Ein Fehler bei einem Hotel hält die übrigen nicht auf; er steht
+    unter "error" im Ergebnis dieses Hotels.
+    """
+    results = []
+    for hotel_id in hotel_ids or get_backend().list_hotel_ids():
+        try:
+            results.append(run_night_audit(hotel_id, business_date))
+        except Exception as e:
+            results.append({"hotel_id": hotel_id, "error": str(e)})
+    return results
+
+
+def main(argv) -> int:
+    parser = argparse.ArgumentParser(description="Nachtlauf: eine Nacht pro eingechecktem Gast buchen")
+    parser.add_argument("hotel_ids", nargs="*", help="Standard: alle Hotels")
+    parser.add_argument("--date", type=date.fromisoformat, default=None,
+                        help="Geschäftsdatum YYYY-MM-DD (Standard: heute)")
+    args = parser.parse_args(argv)
+
+    results = run_all(args.hotel_ids, args.date)
+
+    failed = 0
+    for r in results:
+        if "error" in r:
+            failed += 1
+            print(f"{r['hotel_id']}: FEHLER {r['error']}")
+        elif r["skipped"]:
+            print(f"{r['hotel_id']}: {r['date']} bereits gebucht ({r['ms']:.1f} ms)")
+        else:
+            print(f"{r['hotel_id']}: {r['posted']} Nächte für {r['date']} gebucht ({r['ms']:.1f} ms)")
+
+    total_ms = sum(r.get("ms", 0.0) for r in results)
+    print(f"{len(results)} Hotels, {failed} Fehler, {total_ms:.1f} ms")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -1,4 +1,3 @@
-import fitz  # PyMuPDF
 import csv
 import io
 from models import Guest
@@ -8,6 +7,9 @@ from models import Guest
 # PDF-Rechnung
 # ---------------------------------------------------------
 def generate_receipt_pdf(guest: Guest, t):
+    # PyMuPDF erst hier laden: der Import ist teuer und wird nur für Belege gebraucht
+    import fitz
+
     doc = fitz.open()
     page = doc.new_page()
 
@@ -25,7 +27,7 @@ def generate_receipt_pdf(guest: Guest, t):
     write(f"{t('guest_name')}: {guest.name}")
     write(f"{t('room')}: {guest.room_number} ({guest.room_category})")
     write(f"{t('price_per_night')}: {guest.price_per_night:.2f} €")
-    write(f"{t('checkin')}: {guest.checkin_date}")
+    write(f"{t('checkin')}: {guest.checkin_date or '-'}")
     write(f"{t('checkout')}: {guest.checkout_date or '-'}")
 
     # Nächte
@@ -70,7 +72,7 @@ def generate_receipt_csv(guest: Guest, t):
     writer.writerow([t("guest_name"), guest.name])
     writer.writerow([t("room"), f"{guest.room_number} ({guest.room_category})"])
     writer.writerow([t("price_per_night"), f"{guest.price_per_night:.2f} €"])
-    writer.writerow([t("checkin"), guest.checkin_date])
+    writer.writerow([t("checkin"), guest.checkin_date or "-"])
     writer.writerow([t("checkout"), guest.checkout_date or "-"])
     writer.writerow([])
 
@@ -0,0 +1,256 @@
+"""
+Auswertungen über ein spaltenweises Nächte-Journal (NumPy).
+
+Alle Nächte eines Hotels (aktive und archivierte Gäste) werden einmal in
+parallele Arrays gelegt – eine Zeile pro Nacht:
+    guest_id, room, day (Tage seit 1970-01-01), price, paid, category
+Das Datum einer Nacht ist checkin_date + (Nummer - 1) Tage. Gruppierungen
+nach Monat/Zimmer/Kategorie laufen über np.unique + np.bincount statt
+über Schleifen pro Gast und Nacht.
+"""
+from datetime import date
+from typing import Dict, Iterable, List, Optional
+
+import numpy as np
+
+from models import Guest
+
+# Tag einer Nacht ohne gültiges Check-in-Datum
+NO_DATE = np.iinfo(np.int32).min
+
+_EPOCH = date(1970, 1, 1).toordinal()
+
+
+# ---------------------------------------------------------
+# Journal
+# ---------------------------------------------------------
+class NightLedger:
+    """
+    Nächte als Spalten gleicher Länge.
+    - category: Index in categories (Zimmerkategorie des Gastes)
+    - guests:   Gast-ID → Gast (Name, Zimmer für Detailansichten)
+    """
+
+    __slots__ = ("guest_id", "room", "day", "price", "paid", "category", "categories", "guests")
+
+    def __init__(self, guest_id, room, day, price, paid, category,
+                 categories: List[str], guests: Dict[int, Guest]):
+        self.guest_id = guest_id
+        self.room = room
+        self.day = day
+        self.price = price
+        self.paid = paid
+        self.category = category
+        self.categories = categories
+        self.guests = guests
+
+    def __len__(self) -> int:
+        return len(self.day)
+
+    def select(self, mask) -> "NightLedger":
+        """Teil-Journal mit den Zeilen, für die mask True ist."""
+        return NightLedger(
+            self.guest_id[mask], self.room[mask], self.day[mask],
+            self.price[mask], self.paid[mask], self.category[mask],
+            self.categories, self.guests,
+        )
+
+    @property
+    def dated(self):
+        """Maske: Nächte mit bekanntem Datum."""
+        return self.day != NO_DATE
+
+    @property
+    def month(self):
+        """Monate seit 1970-01 (-1 ohne Datum)."""
+        months = self.day.astype("datetime64[D]").astype("datetime64[M]").astype(np.int64)
+        return np.where(self.dated, months, -1)
+
+    @property
+    def year(self):
+        """Kalenderjahr (-1 ohne Datum)."""
+        return np.where(self.dated, self.month // 12 + 1970, -1)
+
+    def years(self) -> List[int]:
+        return [int(y) for y in np.unique(self.year[self.dated])]
+
+
+def _checkin_day(guest: Guest) -> int:
+    checkin = guest.checkin_date
+    return checkin.toordinal() - _EPOCH if checkin is not None else NO_DATE
+
+
+def build_ledger(guests: Iterable[Guest]) -> NightLedger:
+    """
+    Journal aus Gästen; liest die kompakte Form (PackedNights.packed) direkt.
+    Pro Gast werden nur Python-Listen gefüllt, aufgefächert wird in einem
+    Schritt mit np.repeat (keine NumPy-Aufrufe pro Gast).
+    """
+    counts, firsts, ids, rooms, categories = [], [], [], [], []
+    seg_counts, seg_prices = [], []
+    paid_bytes = bytearray()
+    paid_offsets = []
+    numbered = []   # (Zeilenanfang, Nummern) für Nächte mit Lücken
+    category_index: Dict[str, int] = {}
+    by_id: Dict[int, Guest] = {}
+    rows = 0
+
+    for g in guests:
+        by_id[g.id] = g
+        count, paid, segments, numbers = g.nights.packed()
+        if not count:
+            continue
+
+        counts.append(count)
+        firsts.append(_checkin_day(g))
+        ids.append(g.id)
+        rooms.append(g.room_number)
+        categories.append(category_index.setdefault(g.room_category, len(category_index)))
+        for seg_count, price in segments:
+            seg_counts.append(seg_count)
+            seg_prices.append(price)
+
+        # Bitmaps byteweise aneinanderhängen; Startbit pro Gast merken
+        paid_offsets.append(len(paid_bytes) * 8)
+        paid_bytes += paid.to_bytes((count + 7) // 8, "little")
+
+        if numbers is not None:
+            numbered.append((rows, numbers))
+        rows += count
+
+    counts = np.asarray(counts, dtype=np.int64)
+    starts = np.cumsum(counts) - counts
+    # Position jeder Nacht innerhalb ihres Gastes: 0, 1, 2, ...
+    offset = np.arange(rows, dtype=np.int64) - np.repeat(starts, counts)
+
+    firsts = np.repeat(np.asarray(firsts, dtype=np.int64), counts)
+    number = offset + 1
+    for row, numbers in numbered:
+        number[row:row + len(numbers)] = numbers
+    day = np.where(firsts == NO_DATE, NO_DATE, firsts + number - 1).astype(np.int32)
+
+    bits = np.unpackbits(np.frombuffer(bytes(paid_bytes), dtype=np.uint8), bitorder="little")
+    paid = bits[np.repeat(np.asarray(paid_offsets, dtype=np.int64), counts) + offset].astype(bool)
+
+    return NightLedger(
+        np.repeat(np.asarray(ids, dtype=np.int64), counts),
+        np.repeat(np.asarray(rooms, dtype=np.int32), counts),
+        day,
+        np.repeat(np.asarray(seg_prices, dtype=np.float64), np.asarray(seg_counts, dtype=np.int64)),
+        paid,
+        np.repeat(np.asarray(categories, dtype=np.int16), counts),
+        list(category_index),
+        by_id,
+    )
+
+
+# ---------------------------------------------------------
+# Gruppierungen
+# ---------------------------------------------------------
+def _totals(ledger: NightLedger, keys) -> Dict[int, dict]:
+    """
+    Summen pro Schlüssel (gleiche Form wie calculate_nights_summary):
+    {schlüssel: {"count_paid", "count_unpaid", "sum_paid", "sum_unpaid"}}
+    """
+    if not len(ledger):
+        return {}
+
+    groups, inverse = np.unique(keys, return_inverse=True)
+    n = len(groups)
+    paid_price = np.where(ledger.paid, ledger.price, 0.0)
+
+    count_all = np.bincount(inverse, minlength=n)
+    count_paid = np.bincount(inverse, weights=ledger.paid, minlength=n)
+    sum_all = np.bincount(inverse, weights=ledger.price, minlength=n)
+    sum_paid = np.bincount(inverse, weights=paid_price, minlength=n)
+
+    return {
+        int(key): {
+            "count_paid": int(count_paid[i]),
+            "count_unpaid": int(count_all[i] - count_paid[i]),
+            "sum_paid": float(sum_paid[i]),
+            "sum_unpaid": float(sum_all[i] - sum_paid[i]),
+        }
+        for i, key in enumerate(groups)
+    }
+
+
+def month_key(month: int) -> str:
+    """Monate seit 1970-01 → "YYYY-MM"."""
+    return f"{month // 12 + 1970:04d}-{month % 12 + 1:02d}"
+
+
+def month_index(year: int, month: int) -> int:
+    """(Jahr, Monat) → Monate seit 1970-01."""
+    return (year - 1970) * 12 + month - 1
+
+
+def by_month(ledger: NightLedger) -> Dict[str, dict]:
+    """Summen pro Monat der Nacht ("YYYY-MM"); Nächte ohne Datum entfallen."""
+    dated = ledger.select(ledger.dated)
+    return {month_key(m): v for m, v in _totals(dated, dated.month).items()}
+
+
+def by_room(ledger: NightLedger) -> Dict[int, dict]:
+    return _totals(ledger, ledger.room)
+
+
+def by_category(ledger: NightLedger) -> Dict[str, dict]:
+    return {
+        ledger.categories[c]: v
+        for c, v in _totals(ledger, ledger.category).items()
+    }
+
+
+def by_guest(ledger: NightLedger) -> Dict[int, dict]:
+    return _totals(ledger, ledger.guest_id)
+
+
+def year_over_year(ledger: NightLedger, years: Optional[List[int]] = None) -> Dict[int, List[float]]:
+    """
+    Umsatz (bezahlt + offen) pro Jahr und Monat:
+    {jahr: [januar, ..., dezember]}. Standard: alle Jahre im Journal.
+    """
+    years = years if years is not None else ledger.years()
+    if not years:
+        return {}
+
+    dated = ledger.select(ledger.dated)
+    first = min(years)
+    cells = dated.month - month_index(first, 1)
+    inside = (cells >= 0) & (cells < (max(years) - first + 1) * 12)
+
+    revenue = np.bincount(
+        cells[inside], weights=dated.price[inside],
+        minlength=(max(years) - first + 1) * 12,
+    ).reshape(-1, 12)
+    return {year: revenue[year - first].tolist() for year in years}
+
+
+def occupancy(ledger: NightLedger, year: int, room_count: int) -> List[float]:
+    """
+    Auslastung pro Monat des Jahres (0..1): belegte Zimmernächte geteilt
+    durch room_count × Tage des Monats. Ein Zimmer zählt pro Tag einmal.
+    """
+    if room_count <= 0:
+        return [0.0] * 12
+
+    first = np.datetime64(f"{year:04d}-01", "M")
+    months = first + np.arange(13)
+    days_in_month = np.diff(months.astype("datetime64[D]")).astype(np.int64)
+
+    dated = ledger.select(ledger.dated & (ledger.year == year))
+    if not len(dated):
+        return [0.0] * 12
+
+    # Paare (Zimmer, Tag) nur einmal zählen, auch bei Doppelbuchungen
+    first_day = int(dated.day.min())
+    span = int(dated.day.max()) - first_day + 1
+    pairs = np.unique(dated.room.astype(np.int64) * span + (dated.day - first_day))
+    occupied_days = pairs % span + first_day
+    occupied_months = (
+        occupied_days.astype("datetime64[D]").astype("datetime64[M]") - first
+    ).astype(np.int64)
+
+    nights = np.bincount(occupied_months, minlength=12)
+    return (nights / (days_in_month * room_count)).tolist()
@@ -0,0 +1,176 @@
+from bisect import bisect_left, bisect_right
+from datetime import date
+from typing import Dict, Iterable, List, Optional
+
+from models import OPEN_END, Reservation, Room
+
+
+# ---------------------------------------------------------
+# Belegungsplan eines Zimmers
+# ---------------------------------------------------------
+class RoomCalendar:
+    """
+    Reservierungen eines Zimmers als sortierte Intervall-Liste.
+    - Intervall [arrival, departure): Abreisetag ist wieder frei
+    - Intervalle eines Zimmers überschneiden sich nie; nach Anreise sortiert
+      sind damit auch die Abreisen sortiert → Überschneidung per bisect
+      in O(log n)
+    - Daten als date; offene Abreise = OPEN_END (date.max)
+    Gespeichert wird die ganze Liste (ein Dokument bzw. eine Zeile pro Zimmer).
+    """
+
+    def __init__(self, room_number: int, reservations: Iterable[Reservation] = ()):
+        self.room_number = room_number
+        self._items: List[Reservation] = sorted(reservations, key=lambda r: r.arrival)
+        self._arrivals = [r.arrival for r in self._items]
+        self._departures = [r.departure for r in self._items]
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+    def __iter__(self):
+        return iter(self._items)
+
+    def reservations(self) -> List[Reservation]:
+        return list(self._items)
+
+    # --- Abfragen -----------------------------------------
+    def overlapping(self, arrival: date, departure: date) -> List[Reservation]:
+        """Reservierungen, die [arrival, departure) schneiden."""
+        # Erste mit Abreise nach arrival; ab dort bis Anreise vor departure
+        start = bisect_right(self._departures, arrival)
+        end = bisect_left(self._arrivals, departure)
+        return self._items[start:max(start, end)]
+
+    def is_free(self, arrival: date, departure: date) -> bool:
+        start = bisect_right(self._departures, arrival)
+        return start >= len(self._items) or self._items[start].arrival >= departure
+
+    def covering(self, day: date) -> Optional[Reservation]:
+        """Reservierung, die diesen Tag (diese Nacht) belegt."""
+        index = bisect_right(self._departures, day)
+        if index < len(self._items) and self._items[index].arrival <= day:
+            return self._items[index]
+        return None
+
+    def next_arrival(self, day: date) -> Optional[date]:
+        """Erste Anreise am oder nach diesem Tag."""
+        index = bisect_left(self._arrivals, day)
+        return self._arrivals[index] if index < len(self._arrivals) else None
+
+    def find(self, reservation_id: str) -> Optional[Reservation]:
+        for r in self._items:
+            if r.id == reservation_id:
+                return r
+        return None
+
+    def find_stay(self, guest_id: int) -> Optional[Reservation]:
+        """Laufender Aufenthalt (status "checked_in") dieses Gastes."""
+        for r in reversed(self._items):
+            if r.guest_id == guest_id and r.status == "checked_in":
+                return r
+        return None
+
+    # --- Ändern -------------------------------------------
+    def add(self, reservation: Reservation) -> None:
+        """Trägt ein; ValueError bei Überschneidung oder leerem Zeitraum."""
+        if reservation.arrival >= reservation.departure:
+            raise ValueError("Die Abreise muss nach der Anreise liegen.")
+        conflicts = self.overlapping(reservation.arrival, reservation.departure)
+        if conflicts:
+            raise ValueError(_conflict_message(self.room_number, conflicts[0]))
+
+        index = bisect_right(self._arrivals, reservation.arrival)
+        self._items.insert(index, reservation)
+        self._arrivals.insert(index, reservation.arrival)
+        self._departures.insert(index, reservation.departure)
+
+    def remove(self, reservation_id: str) -> Optional[Reservation]:
+        for index, r in enumerate(self._items):
+            if r.id == reservation_id:
+                del self._items[index]
+                del self._arrivals[index]
+                del self._departures[index]
+                return r
+        return None
+
+    def change(self, reservation: Reservation, arrival: date, departure: date) -> None:
+        """Zeitraum einer eingetragenen Reservierung ändern (mit Prüfung)."""
+        self.remove(reservation.id)
+        old = reservation.arrival, reservation.departure
+        reservation.arrival, reservation.departure = arrival, departure
+        try:
+            self.add(reservation)
+        except ValueError:
+            reservation.arrival, reservation.departure = old
+            self.add(reservation)
+            raise
+
+    def prune(self, before: date) -> int:
+        """Abgeschlossene Aufenthalte mit Abreise vor diesem Tag entfernen."""
+        keep = [
+            r for r in self._items
+            if not (r.status == "checked_out" and r.departure < before)
+        ]
+        removed = len(self._items) - len(keep)
+        if removed:
+            self._items = keep
+            self._arrivals = [r.arrival for r in keep]
+            self._departures = [r.departure for r in keep]
+        return removed
+
+
+def _conflict_message(room_number: int, other: Reservation) -> str:
+    if other.departure == OPEN_END:
+        return f"Zimmer {room_number} ist ab {other.arrival} belegt (Abreise offen)."
+    return (
+        f"Zimmer {room_number} ist vom {other.arrival} bis {other.departure} "
+        f"bereits vergeben ({other.guest_name})."
+    )
+
+
+# ---------------------------------------------------------
+# Belegung aller Zimmer
+# ---------------------------------------------------------
+class OccupancyIndex:
+    """
+    Belegungspläne aller Zimmer eines Hotels für Verfügbarkeitsabfragen.
+    free_rooms prüft pro Zimmer in O(log n) – unabhängig davon, wie viele
+    Reservierungen und Gäste das Hotel insgesamt hat.
+    """
+
+    def __init__(self, rooms: Iterable[Room], calendars: Dict[int, List[Reservation]]):
+        self.rooms: Dict[int, Room] = {r.number: r for r in rooms}
+        self.calendars: Dict[int, RoomCalendar] = {
+            number: RoomCalendar(number, calendars.get(number, ()))
+            for number in self.rooms
+        }
+
+    def calendar(self, room_number: int) -> RoomCalendar:
+        calendar = self.calendars.get(room_number)
+        return calendar if calendar is not None else RoomCalendar(room_number)
+
+    def free_rooms(
+        self,
+        arrival: date,
+        departure: date,
+        category: Optional[str] = None,
+        today: Optional[date] = None,
+    ) -> List[Room]:
+        """
+        Zimmer ohne Reservierung in [arrival, departure), optional nur einer Kategorie.
+        Mit today: belegte Zimmer ohne Eintrag im Plan (Gäste von vor dem
+        Belegungsplan) gelten ab heute als belegt.
+        """
+        result = []
+        for number in sorted(self.rooms):
+            room = self.rooms[number]
+            if category is not None and room.category != category:
+                continue
+            calendar = self.calendars[number]
+            if not calendar.is_free(arrival, departure):
+                continue
+            if today is not None and room.occupied and calendar.covering(today) is None:
+                continue
+            result.append(room)
+        return result
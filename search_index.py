@@ -0,0 +1,195 @@
+import heapq
+import re
+import threading
+import unicodedata
+from bisect import bisect_left, insort
+from collections import Counter
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from models import Guest
+
+# Deutsche Umschrift: "Müller" ist auch unter "Mueller" zu finden
+_TRANSLIT = str.maketrans({"ä": "ae", "ö": "oe", "ü": "ue", "ß": "ss"})
+_WORD = re.compile(r"\w+")
+
+# Punkte pro Suchwort: genau > Anfang > Teilwort > ähnlich (Trigramme)
+SCORE_EXACT = 1.0
+SCORE_PREFIX = 0.8
+SCORE_SUBSTRING = 0.6
+SCORE_FUZZY = 0.5
+# Mindest-Ähnlichkeit (Jaccard der Trigramme) für ungefähre Treffer
+FUZZY_MIN = 0.3
+
+
+def fold(text: str) -> str:
+    """Kleinschreibung ohne Akzente: "Müller" → "muller", "Zoë" → "zoe"."""
+    decomposed = unicodedata.normalize("NFKD", text)
+    return "".join(c for c in decomposed if not unicodedata.combining(c)).casefold()
+
+
+def query_tokens(text: str) -> List[str]:
+    return _WORD.findall(fold(text))
+
+
+def name_tokens(name: str) -> Set[str]:
+    """Indexierte Wörter eines Namens, je ohne Akzente und in Umschrift."""
+    words = _WORD.findall(name.lower())
+    return {fold(w) for w in words} | {fold(w.translate(_TRANSLIT)) for w in words}
+
+
+def _trigrams(token: str) -> Set[str]:
+    padded = f"  {token} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+# ---------------------------------------------------------
+# Suchindex über Gastnamen
+# ---------------------------------------------------------
+class GuestSearchIndex:
+    """
+    Namenssuche ohne Durchlauf über alle Gäste.
+    - Wort → Gast-IDs; sortierte Wortliste für Präfixe (bisect)
+    - Trigramm → Wörter für Teilwörter und ähnliche Schreibweisen
+    Die Indizes enthalten jedes Wort nur einmal – die Kosten einer Suche
+    hängen an der Zahl verschiedener Namen, nicht an der Zahl der Gäste.
+    put/remove/sync ändern nur die betroffenen Gäste.
+    """
+
+    def __init__(self, guests: Iterable[Guest] = ()):
+        self._names: Dict[int, str] = {}
+        # Sortierschlüssel bei gleicher Punktzahl
+        self._folded: Dict[int, str] = {}
+        self._guest_tokens: Dict[int, Set[str]] = {}
+        self._postings: Dict[str, Set[int]] = {}
+        self._sorted: List[str] = []
+        self._trigrams: Dict[str, Set[str]] = {}
+        self._lock = threading.RLock()
+        self.sync(guests)
+
+    @classmethod
+    def from_names(cls, names: Dict[int, str]) -> "GuestSearchIndex":
+        """Index aus {Gast-ID: Name}, z.B. für archivierte Gäste."""
+        index = cls()
+        for guest_id, name in names.items():
+            index.put(guest_id, name)
+        return index
+
+    def __len__(self) -> int:
+        return len(self._names)
+
+    # --- Pflege -------------------------------------------
+    def put(self, guest_id: int, name: str) -> None:
+        with self._lock:
+            if self._names.get(guest_id) == name:
+                return
+            self.remove(guest_id)
+
+            tokens = name_tokens(name)
+            self._names[guest_id] = name
+            self._folded[guest_id] = fold(name)
+            self._guest_tokens[guest_id] = tokens
+            for token in tokens:
+                guest_ids = self._postings.get(token)
+                if guest_ids is None:
+                    guest_ids = self._postings[token] = set()
+                    insort(self._sorted, token)
+                    for gram in _trigrams(token):
+                        self._trigrams.setdefault(gram, set()).add(token)
+                guest_ids.add(guest_id)
+
+    def remove(self, guest_id: int) -> None:
+        with self._lock:
+            self._names.pop(guest_id, None)
+            self._folded.pop(guest_id, None)
+            for token in self._guest_tokens.pop(guest_id, ()):
+                guest_ids = self._postings[token]
+                guest_ids.discard(guest_id)
+                if guest_ids:
+                    continue
+                # Letzter Gast mit diesem Wort: Wort ganz austragen
+                del self._postings[token]
+                del self._sorted[bisect_left(self._sorted, token)]
+                for gram in _trigrams(token):
+                    tokens = self._trigrams[gram]
+                    tokens.discard(token)
+                    if not tokens:
+                        del self._trigrams[gram]
+
+    def sync(self, guests: Iterable[Guest]) -> None:
+        """Auf den Stand dieser Gästeliste bringen; nur Abweichungen neu indizieren."""
+        with self._lock:
+            seen = set()
+            for g in guests:
+                seen.add(g.id)
+                self.put(g.id, g.name)
+            for guest_id in [gid for gid in self._names if gid not in seen]:
+                self.remove(guest_id)
+
+    # --- Suchen -------------------------------------------
+    def _matches(self, query: str) -> Dict[str, float]:
+        """Indexierte Wörter, die zu einem Suchwort passen, mit Punkten."""
+        found: Dict[str, float] = {}
+
+        if query in self._postings:
+            found[query] = SCORE_EXACT
+
+        start = bisect_left(self._sorted, query)
+        for token in self._sorted[start:]:
+            if not token.startswith(query):
+                break
+            found.setdefault(token, SCORE_PREFIX)
+
+        if len(query) < 3:
+            return found
+
+        grams = _trigrams(query)
+        inner = [self._trigrams.get(query[i:i + 3], set()) for i in range(len(query) - 2)]
+        for token in set.intersection(*inner):
+            if query in token:
+                found.setdefault(token, SCORE_SUBSTRING)
+
+        shared = Counter()
+        for gram in grams:
+            shared.update(self._trigrams.get(gram, ()))
+        for token, common in shared.items():
+            if token in found:
+                continue
+            similarity = common / (len(grams) + len(_trigrams(token)) - common)
+            if similarity >= FUZZY_MIN:
+                found[token] = SCORE_FUZZY * similarity
+        return found
+
+    def search(self, query: str, limit: Optional[int] = None) -> List[Tuple[int, float]]:
+        """
+        (Gast-ID, Punkte), beste zuerst. Jedes Wort der Anfrage muss passen;
+        die Punkte sind die Summe der besten Treffer pro Wort.
+        """
+        words = query_tokens(query)
+        if not words:
+            return []
+
+        with self._lock:
+            scores: Dict[int, float] = {}
+            for position, word in enumerate(words):
+                best: Dict[int, float] = {}
+                for token, score in self._matches(word).items():
+                    for guest_id in self._postings[token]:
+                        if score > best.get(guest_id, 0.0):
+                            best[guest_id] = score
+
+                if position == 0:
+                    scores = best
+                else:
+                    scores = {gid: s + best[gid] for gid, s in scores.items() if gid in best}
+                if not scores:
+                    return []
+
+            folded = self._folded
+
+            def _key(item):
+                return -item[1], folded[item[0]], item[0]
+
+            # Mit Limit nur die besten sortieren (Heap statt ganzer Liste)
+            if limit is not None:
+                return heapq.nsmallest(limit, scores.items(), key=_key)
+            return sorted(scores.items(), key=_key)
@@ -0,0 +1,720 @@
+import json
+import sqlite3
+import threading
+import time
+from typing import Callable, Dict, List, Optional, Tuple
+
+from models import (
+    Guest,
+    Reservation,
+    Room,
+    guest_from_dict,
+    guest_to_dict,
+    reservation_from_dict,
+    reservation_to_dict,
+    room_from_dict,
+    room_to_dict,
+)
+from database import (
+    AGGREGATES_DOC_ID,
+    ChangeSet,
+    ConcurrentModificationError,
+    GuestQuery,
+    QUERY_ORDER,
+    StorageBackend,
+    add_counts,
+    archive_month,
+    archive_summary_delta,
+    empty_archive_summary,
+    next_cursor,
+)
+
+# ---------------------------------------------------------
+# Schema
+# ---------------------------------------------------------
+# Gäste, Nächte und Zimmer liegen in eigenen Tabellen mit Indizes
+# für die häufigsten Filter (Status, Zimmer, Check-in-Datum).
+# Felder, die (noch) keine eigene Spalte haben, landen als JSON in "extra".
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS guests (
+    hotel_id        TEXT    NOT NULL,
+    id              INTEGER NOT NULL,
+    name            TEXT    NOT NULL DEFAULT '',
+    room_number     INTEGER NOT NULL DEFAULT 0,
+    room_category   TEXT    NOT NULL DEFAULT '',
+    price_per_night REAL    NOT NULL DEFAULT 0,
+    checkin_date    TEXT    NOT NULL DEFAULT '',
+    checkout_date   TEXT,
+    status          TEXT    NOT NULL DEFAULT 'checked_in',
+    extra           TEXT,
+    version         INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (hotel_id, id)
+);
+CREATE INDEX IF NOT EXISTS idx_guests_status  ON guests (hotel_id, status);
+CREATE INDEX IF NOT EXISTS idx_guests_room    ON guests (hotel_id, room_number);
+CREATE INDEX IF NOT EXISTS idx_guests_checkin ON guests (hotel_id, checkin_date);
+CREATE INDEX IF NOT EXISTS idx_guests_status_checkin ON guests (hotel_id, status, checkin_date, id);
+
+CREATE TABLE IF NOT EXISTS nights (
+    hotel_id TEXT    NOT NULL,
+    guest_id INTEGER NOT NULL,
+    number   INTEGER NOT NULL,
+    paid     INTEGER NOT NULL DEFAULT 0,
+    price    REAL    NOT NULL DEFAULT 0,
+    PRIMARY KEY (hotel_id, guest_id, number)
+) WITHOUT ROWID;
+
+CREATE TABLE IF NOT EXISTS rooms (
+    hotel_id TEXT    NOT NULL,
+    number   INTEGER NOT NULL,
+    category TEXT    NOT NULL DEFAULT '',
+    occupied INTEGER NOT NULL DEFAULT 0,
+    extra    TEXT,
+    version  INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (hotel_id, number)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS idx_rooms_occupied ON rooms (hotel_id, occupied);
+
+-- Archivierte Gäste pro Check-in-Monat ("YYYY-MM"); die Kennzahlen-Spalten
+-- ergeben per GROUP BY die Archiv-Zusammenfassung
+CREATE TABLE IF NOT EXISTS archived_guests (
+    hotel_id     TEXT    NOT NULL,
+    month        TEXT    NOT NULL,
+    id           INTEGER NOT NULL,
+    room_number  INTEGER NOT NULL DEFAULT 0,
+    nights       INTEGER NOT NULL DEFAULT 0,
+    count_paid   INTEGER NOT NULL DEFAULT 0,
+    count_unpaid INTEGER NOT NULL DEFAULT 0,
+    sum_paid     REAL    NOT NULL DEFAULT 0,
+    sum_unpaid   REAL    NOT NULL DEFAULT 0,
+    data         TEXT    NOT NULL,
+    PRIMARY KEY (hotel_id, month, id)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS idx_archived_guests_id ON archived_guests (hotel_id, id);
+
+-- Verwaltungsdaten pro Hotel (z.B. "night_audit"), JSON in data
+CREATE TABLE IF NOT EXISTS meta (
+    hotel_id TEXT    NOT NULL,
+    doc_id   TEXT    NOT NULL,
+    data     TEXT    NOT NULL,
+    version  INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (hotel_id, doc_id)
+) WITHOUT ROWID;
+
+-- Belegungsplan pro Zimmer, Reservierungen als JSON-Liste in data
+CREATE TABLE IF NOT EXISTS calendars (
+    hotel_id    TEXT    NOT NULL,
+    room_number INTEGER NOT NULL,
+    data        TEXT    NOT NULL,
+    version     INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (hotel_id, room_number)
+) WITHOUT ROWID;
+
+-- Zähler pro Hotel, z.B. "guest_id" = zuletzt vergebene Gast-ID
+CREATE TABLE IF NOT EXISTS counters (
+    hotel_id TEXT    NOT NULL,
+    name     TEXT    NOT NULL,
+    value    INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (hotel_id, name)
+) WITHOUT ROWID;
+
+-- Änderungszähler pro Hotel und Art ("guests", "rooms", "calendars", "archive"), siehe data_versions
+CREATE TABLE IF NOT EXISTS data_versions (
+    hotel_id TEXT    NOT NULL,
+    kind     TEXT    NOT NULL,
+    version  INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (hotel_id, kind)
+) WITHOUT ROWID;
+"""
+
+GUEST_COLUMNS = (
+    "id",
+    "name",
+    "room_number",
+    "room_category",
+    "price_per_night",
+    "checkin_date",
+    "checkout_date",
+    "status",
+)
+
+ROOM_COLUMNS = ("number", "category", "occupied")
+
+# Spalten, die nach der ersten Version des Schemas dazugekommen sind:
+# (Tabelle, Spalte, Definition) – werden in bestehenden Dateien ergänzt
+ADDED_COLUMNS = [
+    ("guests", "version", "INTEGER NOT NULL DEFAULT 0"),
+    ("rooms", "version", "INTEGER NOT NULL DEFAULT 0"),
+]
+
+
+# ---------------------------------------------------------
+# Zeilen ↔ dict
+# ---------------------------------------------------------
+def _split_extra(data: dict, columns) -> tuple:
+    values = [data.get(c) for c in columns]
+    extra = {
+        k: v for k, v in data.items()
+        if k not in columns and k not in ("nights", "nights_packed")
+    }
+    return values, (json.dumps(extra) if extra else None)
+
+
+def _guest_row_to_dict(row, nights: list) -> dict:
+    data = dict(zip(GUEST_COLUMNS, row[:len(GUEST_COLUMNS)]))
+    extra = row[len(GUEST_COLUMNS)]
+    if extra:
+        data.update(json.loads(extra))
+    data["nights"] = nights
+    return data
+
+
+def _room_row_to_dict(row) -> dict:
+    data = dict(zip(ROOM_COLUMNS, row[:len(ROOM_COLUMNS)]))
+    data["occupied"] = bool(data["occupied"])
+    extra = row[len(ROOM_COLUMNS)]
+    if extra:
+        data.update(json.loads(extra))
+    return data
+
+
+# ---------------------------------------------------------
+# SQLite-Backend
+# ---------------------------------------------------------
+class SqliteBackend(StorageBackend):
+    """
+    Lokales Backend auf Basis einer SQLite-Datei.
+    - Eine Verbindung pro Thread (Streamlit nutzt mehrere Threads)
+    - path=":memory:" → flüchtige Datenbank (Tests, Benchmarks)
+    """
+
+    name = "sqlite"
+    supports_point_reads = True
+    # Höchstens so viele Platzhalter pro "IN (...)"
+    IN_CHUNK = 500
+
+    def __init__(self, path: str = "hotel.db"):
+        self.path = path
+        self._local = threading.local()
+        self._shared = None
+
+        if path == ":memory:":
+            # In-Memory-DB existiert nur pro Verbindung → eine gemeinsame nutzen
+            self._shared = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+            self._shared_lock = threading.RLock()
+            self._init_schema(self._shared)
+
+    # --- Verbindung ---------------------------------------
+    def _init_schema(self, conn):
+        conn.executescript(SCHEMA)
+        for table, column, definition in ADDED_COLUMNS:
+            existing = {row[1] for row in conn.execute(f"PRAGMA table_info({table})")}
+            if column not in existing:
+                conn.execute(f"ALTER TABLE {table} ADD COLUMN {column} {definition}")
+        conn.commit()
+
+    def _connect(self):
+        if self._shared is not None:
+            return self._shared
+
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._init_schema(conn)
+            self._local.conn = conn
+        return conn
+
+    def _tx(self):
+        """
+        Kontextmanager für eine Schreib-Transaktion.
+        Verschachtelte Aufrufe (z.B. commit() in run_transaction) laufen in
+        der äußeren Transaktion mit.
+        """
+        backend = self
+
+        class _Tx:
+            def __enter__(self_inner):
+                if backend._shared is not None:
+                    backend._shared_lock.acquire()
+                self_inner.conn = backend._connect()
+                self_inner.outer = not self_inner.conn.in_transaction
+                if self_inner.outer:
+                    self_inner.conn.execute("BEGIN IMMEDIATE")
+                return self_inner.conn
+
+            def __exit__(self_inner, exc_type, exc, tb):
+                try:
+                    if self_inner.outer:
+                        if exc_type is None:
+                            self_inner.conn.execute("COMMIT")
+                        else:
+                            self_inner.conn.execute("ROLLBACK")
+                finally:
+                    if backend._shared is not None:
+                        backend._shared_lock.release()
+                return False
+
+        return _Tx()
+
+    def _query(self, sql: str, params=()):
+        if self._shared is not None:
+            with self._shared_lock:
+                return self._shared.execute(sql, params).fetchall()
+        return self._connect().execute(sql, params).fetchall()
+
+    # --- Änderungszähler ----------------------------------
+    def _bump(self, conn, hotel_id: str, kind: str) -> None:
+        conn.execute(
+            "INSERT INTO data_versions (hotel_id, kind, version) VALUES (?, ?, 1) "
+            "ON CONFLICT (hotel_id, kind) DO UPDATE SET version = version + 1",
+            (hotel_id, kind),
+        )
+
+    def data_versions(self, hotel_id: str) -> Optional[dict]:
+        result = {"guests": 0, "rooms": 0}
+        rows = self._query(
+            "SELECT kind, version FROM data_versions WHERE hotel_id = ?",
+            (hotel_id,),
+        )
+        result.update(dict(rows))
+        return result
+
+    # --- Gäste: intern ------------------------------------
+    def _write_guest(self, conn, hotel_id: str, guest: Guest) -> None:
+        data = guest_to_dict(guest)
+        values, extra = _split_extra(data, GUEST_COLUMNS)
+
+        conn.execute(
+            f"INSERT OR REPLACE INTO guests (hotel_id, {', '.join(GUEST_COLUMNS)}, extra, version) "
+            f"VALUES (?, {', '.join('?' for _ in GUEST_COLUMNS)}, ?, "
+            "COALESCE((SELECT version FROM guests WHERE hotel_id = ? AND id = ?), 0) + 1)",
+            [hotel_id, *values, extra, hotel_id, guest.id],
+        )
+        conn.execute(
+            "DELETE FROM nights WHERE hotel_id = ? AND guest_id = ?",
+            (hotel_id, guest.id),
+        )
+        conn.executemany(
+            "INSERT INTO nights (hotel_id, guest_id, number, paid, price) VALUES (?, ?, ?, ?, ?)",
+            [
+                (hotel_id, guest.id, n.number, int(n.paid), n.price)
+                for n in guest.nights
+            ],
+        )
+
+    def _delete_guest(self, conn, hotel_id: str, guest_id: int) -> None:
+        conn.execute("DELETE FROM guests WHERE hotel_id = ? AND id = ?", (hotel_id, guest_id))
+        conn.execute("DELETE FROM nights WHERE hotel_id = ? AND guest_id = ?", (hotel_id, guest_id))
+
+    def _nights_by_guest(
+        self,
+        hotel_id: str,
+        guest_id: Optional[int] = None,
+        guest_ids: Optional[List[int]] = None,
+    ) -> dict:
+        if guest_ids is not None:
+            # Nur die Nächte dieser Gäste (Abfrage-Ergebnis); in Blöcken
+            # unter der Platzhalter-Grenze von SQLite
+            rows = []
+            for start in range(0, len(guest_ids), self.IN_CHUNK):
+                chunk = guest_ids[start:start + self.IN_CHUNK]
+                rows += self._query(
+                    "SELECT guest_id, number, paid, price FROM nights "
+                    f"WHERE hotel_id = ? AND guest_id IN ({', '.join('?' * len(chunk))}) "
+                    "ORDER BY guest_id, number",
+                    (hotel_id, *chunk),
+                )
+        elif guest_id is None:
+            rows = self._query(
+                "SELECT guest_id, number, paid, price FROM nights "
+                "WHERE hotel_id = ? ORDER BY guest_id, number",
+                (hotel_id,),
+            )
+        else:
+            rows = self._query(
+                "SELECT guest_id, number, paid, price FROM nights "
+                "WHERE hotel_id = ? AND guest_id = ? ORDER BY number",
+                (hotel_id, guest_id),
+            )
+
+        result = {}
+        for gid, number, paid, price in rows:
+            result.setdefault(gid, []).append(
+                {"number": number, "paid": bool(paid), "price": price}
+            )
+        return result
+
+    # --- Gäste --------------------------------------------
+    def load_guests(self, hotel_id: str, versions: Optional[dict] = None) -> List[Guest]:
+        rows = self._query(
+            f"SELECT {', '.join(GUEST_COLUMNS)}, extra, version FROM guests "
+            "WHERE hotel_id = ? ORDER BY id",
+            (hotel_id,),
+        )
+        nights = self._nights_by_guest(hotel_id)
+        if versions is not None:
+            for row in rows:
+                versions[("guests", row[0])] = row[-1]
+        return [
+            guest_from_dict(_guest_row_to_dict(row, nights.get(row[0], [])))
+            for row in rows
+        ]
+
+    def query_guests(
+        self,
+        hotel_id: str,
+        query: GuestQuery,
+        limit: Optional[int] = None,
+        cursor: Optional[tuple] = None,
+    ) -> Tuple[List[Guest], Optional[tuple]]:
+        where = ["hotel_id = ?"]
+        params = [hotel_id]
+        for column, op, value in query.filters():
+            where.append(f"{column} {'=' if op == '==' else op} ?")
+            params.append(value)
+        if cursor is not None:
+            where.append("(checkin_date, id) > (?, ?)")
+            params.extend(cursor)
+
+        sql = (
+            f"SELECT {', '.join(GUEST_COLUMNS)}, extra, version FROM guests "
+            f"WHERE {' AND '.join(where)} ORDER BY {', '.join(QUERY_ORDER)}"
+        )
+        if limit is not None:
+            sql += " LIMIT ?"
+            params.append(limit)
+
+        rows = self._query(sql, params)
+        nights = self._nights_by_guest(hotel_id, guest_ids=[row[0] for row in rows])
+        guests = [
+            guest_from_dict(_guest_row_to_dict(row, nights.get(row[0], [])))
+            for row in rows
+        ]
+        return guests, next_cursor(guests, limit)
+
+    def save_guests(self, hotel_id: str, guests: List[Guest]) -> None:
+        with self._tx() as conn:
+            conn.execute("DELETE FROM guests WHERE hotel_id = ?", (hotel_id,))
+            conn.execute("DELETE FROM nights WHERE hotel_id = ?", (hotel_id,))
+            for g in guests:
+                self._write_guest(conn, hotel_id, g)
+            self._bump(conn, hotel_id, "guests")
+
+    def get_guest(self, hotel_id: str, guest_id: int, versions: Optional[dict] = None) -> Optional[Guest]:
+        rows = self._query(
+            f"SELECT {', '.join(GUEST_COLUMNS)}, extra, version FROM guests "
+            "WHERE hotel_id = ? AND id = ?",
+            (hotel_id, guest_id),
+        )
+        if versions is not None:
+            versions[("guests", guest_id)] = rows[0][-1] if rows else None
+        if not rows:
+            return None
+        nights = self._nights_by_guest(hotel_id, guest_id)
+        return guest_from_dict(_guest_row_to_dict(rows[0], nights.get(guest_id, [])))
+
+    def save_guest(self, hotel_id: str, guest: Guest) -> None:
+        with self._tx() as conn:
+            self._write_guest(conn, hotel_id, guest)
+            self._bump(conn, hotel_id, "guests")
+
+    def delete_guest(self, hotel_id: str, guest_id: int) -> None:
+        with self._tx() as conn:
+            self._delete_guest(conn, hotel_id, guest_id)
+            self._bump(conn, hotel_id, "guests")
+
+    # --- Zimmer: intern -----------------------------------
+    def _write_room(self, conn, hotel_id: str, room: Room) -> None:
+        data = room_to_dict(room)
+        values, extra = _split_extra(data, ROOM_COLUMNS)
+        values[ROOM_COLUMNS.index("occupied")] = int(bool(data.get("occupied")))
+
+        conn.execute(
+            f"INSERT OR REPLACE INTO rooms (hotel_id, {', '.join(ROOM_COLUMNS)}, extra, version) "
+            f"VALUES (?, {', '.join('?' for _ in ROOM_COLUMNS)}, ?, "
+            "COALESCE((SELECT version FROM rooms WHERE hotel_id = ? AND number = ?), 0) + 1)",
+            [hotel_id, *values, extra, hotel_id, room.number],
+        )
+
+    # --- Zimmer -------------------------------------------
+    def load_rooms(self, hotel_id: str, versions: Optional[dict] = None) -> List[Room]:
+        rows = self._query(
+            f"SELECT {', '.join(ROOM_COLUMNS)}, extra, version FROM rooms "
+            "WHERE hotel_id = ? ORDER BY number",
+            (hotel_id,),
+        )
+        if versions is not None:
+            for row in rows:
+                versions[("rooms", row[0])] = row[-1]
+        return [room_from_dict(_room_row_to_dict(row)) for row in rows]
+
+    def save_rooms(self, hotel_id: str, rooms: List[Room]) -> None:
+        with self._tx() as conn:
+            conn.execute("DELETE FROM rooms WHERE hotel_id = ?", (hotel_id,))
+            for r in rooms:
+                self._write_room(conn, hotel_id, r)
+            self._bump(conn, hotel_id, "rooms")
+
+    def get_room(self, hotel_id: str, room_number: int, versions: Optional[dict] = None) -> Optional[Room]:
+        rows = self._query(
+            f"SELECT {', '.join(ROOM_COLUMNS)}, extra, version FROM rooms "
+            "WHERE hotel_id = ? AND number = ?",
+            (hotel_id, room_number),
+        )
+        if versions is not None:
+            versions[("rooms", room_number)] = rows[0][-1] if rows else None
+        return room_from_dict(_room_row_to_dict(rows[0])) if rows else None
+
+    def save_room(self, hotel_id: str, room: Room) -> None:
+        with self._tx() as conn:
+            self._write_room(conn, hotel_id, room)
+            self._bump(conn, hotel_id, "rooms")
+
+    def delete_room(self, hotel_id: str, room_number: int) -> None:
+        with self._tx() as conn:
+            conn.execute(
+                "DELETE FROM rooms WHERE hotel_id = ? AND number = ?",
+                (hotel_id, room_number),
+            )
+            self._bump(conn, hotel_id, "rooms")
+
+    # --- Archiv ------------------------------------------
+    def _archive_guest(self, conn, hotel_id: str, guest: Guest) -> None:
+        month = archive_month(guest)
+        stats = archive_summary_delta([guest])["months"][month]
+        conn.execute(
+            "INSERT OR REPLACE INTO archived_guests (hotel_id, month, id, room_number, "
+            "nights, count_paid, count_unpaid, sum_paid, sum_unpaid, data) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            (
+                hotel_id, month, guest.id, guest.room_number,
+                stats["count_paid"] + stats["count_unpaid"],
+                stats["count_paid"], stats["count_unpaid"],
+                stats["sum_paid"], stats["sum_unpaid"],
+                json.dumps(guest_to_dict(guest)),
+            ),
+        )
+
+    def load_archive(self, hotel_id: str, month: str) -> List[Guest]:
+        rows = self._query(
+            "SELECT data FROM archived_guests WHERE hotel_id = ? AND month = ? ORDER BY id",
+            (hotel_id, month),
+        )
+        return [guest_from_dict(json.loads(row[0])) for row in rows]
+
+    def archive_index(self, hotel_id: str) -> Dict[int, dict]:
+        return {
+            gid: {"month": month, "name": name}
+            for gid, month, name in self._query(
+                "SELECT id, month, json_extract(data, '$.name') FROM archived_guests "
+                "WHERE hotel_id = ?",
+                (hotel_id,),
+            )
+        }
+
+    def get_archived_guests(self, hotel_id: str, guest_ids: List[int]) -> List[Guest]:
+        found = {}
+        for start in range(0, len(guest_ids), self.IN_CHUNK):
+            chunk = guest_ids[start:start + self.IN_CHUNK]
+            for gid, data in self._query(
+                "SELECT id, data FROM archived_guests "
+                f"WHERE hotel_id = ? AND id IN ({', '.join('?' * len(chunk))})",
+                (hotel_id, *chunk),
+            ):
+                found[gid] = guest_from_dict(json.loads(data))
+        return [found[gid] for gid in guest_ids if gid in found]
+
+    def archive_summary(self, hotel_id: str) -> dict:
+        summary = empty_archive_summary()
+        for month, guests, cp, cu, sp, su in self._query(
+            "SELECT month, COUNT(*), SUM(count_paid), SUM(count_unpaid), "
+            "SUM(sum_paid), SUM(sum_unpaid) FROM archived_guests "
+            "WHERE hotel_id = ? GROUP BY month",
+            (hotel_id,),
+        ):
+            summary["months"][month] = {
+                "guests": guests, "count_paid": cp, "count_unpaid": cu,
+                "sum_paid": sp, "sum_unpaid": su,
+            }
+        for room, nights in self._query(
+            "SELECT room_number, SUM(nights) FROM archived_guests "
+            "WHERE hotel_id = ? GROUP BY room_number",
+            (hotel_id,),
+        ):
+            summary["room_nights"][str(room)] = nights
+        return summary
+
+    # --- Mandanten ---------------------------------------
+    def list_hotel_ids(self) -> List[str]:
+        rows = self._query(
+            "SELECT hotel_id FROM guests UNION SELECT hotel_id FROM rooms "
+            "UNION SELECT hotel_id FROM archived_guests ORDER BY hotel_id"
+        )
+        return [row[0] for row in rows]
+
+    # --- Verwaltungsdaten --------------------------------
+    def get_meta(self, hotel_id: str, doc_id: str, versions: Optional[dict] = None) -> Optional[dict]:
+        rows = self._query(
+            "SELECT data, version FROM meta WHERE hotel_id = ? AND doc_id = ?",
+            (hotel_id, doc_id),
+        )
+        if versions is not None:
+            versions[("meta", doc_id)] = rows[0][1] if rows else None
+        return json.loads(rows[0][0]) if rows else None
+
+    def _write_meta(self, conn, hotel_id: str, doc_id: str, data: dict) -> None:
+        conn.execute(
+            "INSERT INTO meta (hotel_id, doc_id, data) VALUES (?, ?, ?) "
+            "ON CONFLICT (hotel_id, doc_id) DO UPDATE "
+            "SET data = excluded.data, version = version + 1",
+            (hotel_id, doc_id, json.dumps(data)),
+        )
+
+    def _apply_aggregates(self, conn, hotel_id: str, changes: ChangeSet) -> None:
+        # Innerhalb der Schreib-Transaktion: Lesen, Ändern, Schreiben ist atomar
+        row = conn.execute(
+            "SELECT data FROM meta WHERE hotel_id = ? AND doc_id = ?",
+            (hotel_id, AGGREGATES_DOC_ID),
+        ).fetchone()
+        data = json.loads(row[0]) if row else {}
+
+        add_counts(data, changes.aggregates)
+        balances = data.setdefault("open_balances", {})
+        for gid, entry in changes.open_balances.items():
+            if entry is None:
+                balances.pop(gid, None)
+            else:
+                balances[gid] = entry
+
+        self._write_meta(conn, hotel_id, AGGREGATES_DOC_ID, data)
+
+    # --- Belegungspläne ----------------------------------
+    def get_calendar(
+        self, hotel_id: str, room_number: int, versions: Optional[dict] = None
+    ) -> List[Reservation]:
+        rows = self._query(
+            "SELECT data, version FROM calendars WHERE hotel_id = ? AND room_number = ?",
+            (hotel_id, room_number),
+        )
+        if versions is not None:
+            versions[("calendars", room_number)] = rows[0][1] if rows else None
+        return [reservation_from_dict(item) for item in json.loads(rows[0][0])] if rows else []
+
+    def load_calendars(self, hotel_id: str) -> Dict[int, List[Reservation]]:
+        rows = self._query(
+            "SELECT room_number, data FROM calendars WHERE hotel_id = ?",
+            (hotel_id,),
+        )
+        return {
+            number: [reservation_from_dict(item) for item in json.loads(data)]
+            for number, data in rows
+        }
+
+    def _write_calendar(self, conn, hotel_id: str, room_number: int, reservations: List[Reservation]) -> None:
+        if not reservations:
+            conn.execute(
+                "DELETE FROM calendars WHERE hotel_id = ? AND room_number = ?",
+                (hotel_id, room_number),
+            )
+            return
+        conn.execute(
+            "INSERT INTO calendars (hotel_id, room_number, data) VALUES (?, ?, ?) "
+            "ON CONFLICT (hotel_id, room_number) DO UPDATE "
+            "SET data = excluded.data, version = version + 1",
+            (hotel_id, room_number, json.dumps([reservation_to_dict(r) for r in reservations])),
+        )
+
+    # --- Gast-IDs ----------------------------------------
+    def allocate_guest_ids(self, hotel_id: str, count: int = 1) -> int:
+        with self._tx() as conn:
+            row = conn.execute(
+                "SELECT value FROM counters WHERE hotel_id = ? AND name = 'guest_id'",
+                (hotel_id,),
+            ).fetchone()
+            if row is not None:
+                last = row[0]
+            else:
+                # Noch kein Zähler: bei der höchsten bestehenden ID beginnen
+                last = conn.execute(
+                    "SELECT MAX(id) FROM (SELECT id FROM guests WHERE hotel_id = ? "
+                    "UNION ALL SELECT id FROM archived_guests WHERE hotel_id = ?)",
+                    (hotel_id, hotel_id),
+                ).fetchone()[0] or 0
+            conn.execute(
+                "INSERT INTO counters (hotel_id, name, value) VALUES (?, 'guest_id', ?) "
+                "ON CONFLICT (hotel_id, name) DO UPDATE SET value = excluded.value",
+                (hotel_id, last + count),
+            )
+        return last + 1
+
+    # --- Atomares Schreiben -------------------------------
+    def _check_versions(self, conn, hotel_id: str, changes: ChangeSet, versions: dict) -> None:
+        checks = [("guests", "id", g.id) for g in changes.guests]
+        checks += [("guests", "id", gid) for gid in changes.deleted_guests]
+        checks += [("rooms", "number", r.number) for r in changes.rooms]
+        checks += [("rooms", "number", n) for n in changes.deleted_rooms]
+        checks += [("meta", "doc_id", doc_id) for doc_id in changes.meta]
+        checks += [("calendars", "room_number", n) for n in changes.calendars]
+
+        for table, key_column, key in checks:
+            if (table, key) not in versions:
+                continue
+            row = conn.execute(
+                f"SELECT version FROM {table} WHERE hotel_id = ? AND {key_column} = ?",
+                (hotel_id, key),
+            ).fetchone()
+            current = row[0] if row else None
+            if current != versions[(table, key)]:
+                raise ConcurrentModificationError(
+                    f"{table}/{key} wurde zwischenzeitlich geändert."
+                )
+
+    def commit(self, hotel_id: str, changes: ChangeSet, versions: Optional[dict] = None) -> None:
+        with self._tx() as conn:
+            if versions:
+                self._check_versions(conn, hotel_id, changes, versions)
+            for g in changes.guests:
+                self._write_guest(conn, hotel_id, g)
+            for gid in changes.deleted_guests:
+                self._delete_guest(conn, hotel_id, gid)
+            for g in changes.archived:
+                self._archive_guest(conn, hotel_id, g)
+            for r in changes.rooms:
+                self._write_room(conn, hotel_id, r)
+            for number in changes.deleted_rooms:
+                conn.execute(
+                    "DELETE FROM rooms WHERE hotel_id = ? AND number = ?",
+                    (hotel_id, number),
+                )
+            for doc_id, data in changes.meta.items():
+                self._write_meta(conn, hotel_id, doc_id, data)
+            for number, reservations in changes.calendars.items():
+                self._write_calendar(conn, hotel_id, number, reservations)
+            if changes.aggregates or changes.open_balances:
+                self._apply_aggregates(conn, hotel_id, changes)
+
+            if changes.guests or changes.deleted_guests:
+                self._bump(conn, hotel_id, "guests")
+            if changes.rooms or changes.deleted_rooms:
+                self._bump(conn, hotel_id, "rooms")
+            if changes.calendars:
+                self._bump(conn, hotel_id, "calendars")
+            if changes.archived:
+                self._bump(conn, hotel_id, "archive")
+
+    def run_transaction(self, hotel_id: str, fn: Callable, max_attempts: int = 5):
+        """
+        BEGIN IMMEDIATE sperrt die Datei für andere Schreiber; Lesen und
+        Schreiben innerhalb von fn sind damit serialisiert. Ist die Datei
+        gerade gesperrt, wird erneut versucht.
+        """
+        for attempt in range(max_attempts):
+            try:
+                with self._tx():
+                    return fn(self)
+            except sqlite3.OperationalError as e:
+                if "locked" not in str(e) or attempt == max_attempts - 1:
+                    raise
+                time.sleep(0.01 * (attempt + 1))
@@ -1,20 +1,22 @@
-from firebase_db import db
+from firebase_db import get_db, ensure_hotel_document
 from datetime import datetime
 
 def create_tenant(tenant_id: str):
-    db.collection("tenants").document(tenant_id).set({
+    get_db().collection("tenants").document(tenant_id).set({
         "active": True,
         "created_at": datetime.utcnow()
     })
+    # Hotel-Dokument einmalig hier anlegen (nicht bei jedem Laden/Speichern)
+    ensure_hotel_document(tenant_id)
 
 def deactivate_tenant(tenant_id: str):
-    db.collection("tenants").document(tenant_id).update({"active": False})
+    get_db().collection("tenants").document(tenant_id).update({"active": False})
 
 def delete_tenant(tenant_id: str):
-    db.collection("tenants").document(tenant_id).delete()
+    get_db().collection("tenants").document(tenant_id).delete()
 
 def list_tenants():
-    tenants_ref = db.collection("tenants").stream()
+    tenants_ref = get_db().collection("tenants").stream()
     tenants = []
     for doc in tenants_ref:
         t = doc.to_dict()
@@ -23,7 +25,7 @@ def list_tenants():
     return tenants
 
 def is_tenant_active(tenant_id: str) -> bool:
-    doc = db.collection("tenants").document(tenant_id).get()
+    doc = get_db().collection("tenants").document(tenant_id).get()
     if not doc.exists:
         return False
     return doc.to_dict().get("active", True)
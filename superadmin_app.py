@@ -1,5 +1,7 @@
 import streamlit as st
-from firebase_db import db
+from firebase_db import get_db
+from unit_of_work import get_concurrency_stats
+from utils import startup_stats
 
 def main():
     with st.sidebar:
@@ -12,10 +14,26 @@ def main():
         st.markdown("---")
         st.info("Superadmin-Bereich")
 
+        # Schreibkonflikte zwischen gleichzeitigen Sitzungen (seit Prozessstart)
+        with st.expander("Schreibkonflikte"):
+            stats = get_concurrency_stats()
+            st.write(f"Commits: {stats['commits']}")
+            st.write(f"Konflikte: {stats['conflicts']}")
+            st.write(f"Wiederholungen: {stats['retries']}")
+            st.write(f"Fehlgeschlagen: {stats['failures']}")
+
+        # Erster Seitenaufbau dieses Prozesses (z.B. nach Container-Neustart)
+        with st.expander("Kaltstart"):
+            stats = startup_stats()
+            if not stats:
+                st.write("Noch keine Messung.")
+            for key, value in stats.items():
+                st.write(f"{key}: {value:.0f} ms")
+
     st.title("Superadmin – Verwaltung")
 
     # Benutzer laden
-    users_ref = db.collection("users").stream()
+    users_ref = get_db().collection("users").stream()
     users = []
 
     for doc in users_ref:
@@ -35,11 +53,11 @@ def main():
         col1, col2 = st.columns(2)
 
         if col1.button("Deaktivieren", key=f"deact_{u['id']}"):
-            db.collection("users").document(u["id"]).update({"active": False})
+            get_db().collection("users").document(u["id"]).update({"active": False})
             st.rerun()
 
         if col2.button("Löschen", key=f"del_{u['id']}"):
-            db.collection("users").document(u["id"]).delete()
+            get_db().collection("users").document(u["id"]).delete()
             st.rerun()
 
     st.markdown("---")
@@ -0,0 +1,263 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Dict, List, Optional
+
+from search_index import GuestSearchIndex
+from tenant_state import TenantState
+
+
+# ---------------------------------------------------------
+# Prozessweiter Lese-Cache pro Mandant
+# ---------------------------------------------------------
+# Alle Browser-Tabs (Streamlit-Sitzungen) eines Prozesses teilen sich
+# die geladenen Gäste- und Zimmerlisten eines Hotels.
+# - Aktuell gehalten über einen Listener des Backends (Firestore on_snapshot):
+#   jede Änderung – auch aus anderen Prozessen – ersetzt die Liste im Cache.
+# - Ohne Listener (SQLite, cache_refresh = "version") wird vor jedem Lesen
+#   nur der Änderungszähler des Hotels gelesen (backend.data_versions);
+#   solange er gleich ist, bleibt die bereits dekodierte Liste gültig.
+# - Eigene Schreibzugriffe verwerfen die Einträge sofort (invalidate),
+#   bis der Listener den neuen Stand liefert, wird direkt gelesen.
+# - Höchstens max_tenants Hotels; das am längsten nicht gelesene fliegt raus,
+#   ebenso Hotels, die idle_seconds lang nicht gelesen wurden.
+#   Dabei wird auch der Listener beendet.
+# - get_state liefert beide Listen als indizierten TenantState; er wird
+#   erst neu gebaut, wenn eine der Listen im Cache ersetzt wurde.
+# - get_search_index liefert den Namens-Suchindex; er überlebt invalidate
+#   und wird beim nächsten Lesen nur um geänderte Gäste nachgeführt (sync).
+# - get_archive_search_index: Suchindex über die archivierten Namen; gilt,
+#   solange der Archiv-Zähler (data_versions "archive") gleich bleibt.
+# Die zurückgegebenen Objekte werden geteilt und dürfen nicht verändert
+# werden – Änderungen laufen immer über logic.py / TenantSession.
+KINDS = ("guests", "rooms")
+
+
+class _Entry:
+    def __init__(self):
+        self.data: Dict[str, Optional[list]] = {kind: None for kind in KINDS}
+        # Zählt Änderungen; ein langsamer Ladevorgang darf neuere Daten
+        # (Listener, invalidate) nicht überschreiben
+        self.generation: Dict[str, int] = {kind: 0 for kind in KINDS}
+        # Änderungszähler, zu dem data gelesen wurde (ohne Listener)
+        self.version: Dict[str, Optional[int]] = {kind: None for kind in KINDS}
+        self.unsubscribe: Dict[str, Optional[Callable]] = {}
+        # Aus data gebauter TenantState; gültig, solange dieselben Listen im Cache liegen
+        self.state: Optional[TenantState] = None
+        self.state_source: Optional[tuple] = None
+        # Suchindex und die Gästeliste, auf deren Stand er ist
+        self.search: Optional[GuestSearchIndex] = None
+        self.search_source: Optional[list] = None
+        # Suchindex des Archivs und der Archiv-Zähler, zu dem er gebaut wurde
+        self.archive_search: Optional[GuestSearchIndex] = None
+        self.archive_version: Optional[int] = None
+        self.last_used = time.monotonic()
+
+
+class TenantCache:
+    """
+    Lese-Cache für backend.load_guests / backend.load_rooms.
+    Backends ohne Listener und ohne Änderungszähler werden nicht gecacht –
+    Änderungen anderer Prozesse wären sonst unsichtbar.
+    """
+
+    def __init__(
+        self,
+        backend,
+        max_tenants: int = 50,
+        idle_seconds: float = 600,
+        use_listener: bool = True,
+    ):
+        self.backend = backend
+        self.max_tenants = max_tenants
+        self.idle_seconds = idle_seconds
+        self.use_listener = use_listener
+
+        self._entries: "OrderedDict[str, _Entry]" = OrderedDict()
+        self._lock = threading.RLock()
+        self._stats = {"hits": 0, "misses": 0, "evictions": 0}
+
+    # --- Lesen --------------------------------------------
+    def get(self, hotel_id: str, kind: str) -> list:
+        return list(self._get_shared(hotel_id, kind))
+
+    def get_state(self, hotel_id: str) -> TenantState:
+        """
+        Gäste und Zimmer als indizierter TenantState.
+        Wird nur neu aufgebaut, wenn sich eine der gecachten Listen geändert hat.
+        """
+        guests = self._get_shared(hotel_id, "guests")
+        rooms = self._get_shared(hotel_id, "rooms")
+
+        with self._lock:
+            entry = self._entries.get(hotel_id)
+            if entry is not None and entry.state_source is not None:
+                cached_guests, cached_rooms = entry.state_source
+                if cached_guests is guests and cached_rooms is rooms:
+                    return entry.state
+
+        state = TenantState(guests, rooms)
+
+        with self._lock:
+            entry = self._entries.get(hotel_id)
+            # Nur merken, wenn die Listen noch die aktuellen sind
+            if entry is not None and entry.data["guests"] is guests and entry.data["rooms"] is rooms:
+                entry.state = state
+                entry.state_source = (guests, rooms)
+        return state
+
+    def get_search_index(self, hotel_id: str) -> GuestSearchIndex:
+        """
+        Suchindex über die Gastnamen. Ändert sich die Gästeliste, werden nur
+        neue, umbenannte und gelöschte Gäste im Index nachgetragen.
+        """
+        guests = self._get_shared(hotel_id, "guests")
+
+        with self._lock:
+            entry = self._entries.get(hotel_id)
+            if entry is None:
+                return GuestSearchIndex(guests)
+            if entry.search is None:
+                entry.search = GuestSearchIndex()
+            index = entry.search
+            if entry.search_source is guests:
+                return index
+
+        # sync sperrt den Index selbst; andere Hotels warten nicht
+        index.sync(guests)
+
+        with self._lock:
+            if entry.data["guests"] is guests:
+                entry.search_source = guests
+        return index
+
+    def get_archive_search_index(self, hotel_id: str) -> GuestSearchIndex:
+        """
+        Suchindex über die archivierten Namen. Das Archiv ändert sich nur
+        durch Archivläufe (auch aus anderen Prozessen); geprüft wird daher
+        vor jeder Suche nur der Archiv-Zähler.
+        """
+        versions = self.backend.data_versions(hotel_id)
+        version = versions.get("archive", 0) if versions is not None else None
+
+        with self._lock:
+            entry = self._touch(hotel_id)
+            cached = entry.archive_search
+            if cached is not None and version is not None and entry.archive_version == version:
+                self._stats["hits"] += 1
+                return cached
+            self._stats["misses"] += 1
+
+        names = {gid: e["name"] for gid, e in self.backend.archive_index(hotel_id).items()}
+        index = GuestSearchIndex.from_names(names)
+
+        if version is not None:
+            with self._lock:
+                entry = self._entries.get(hotel_id)
+                if entry is not None:
+                    entry.archive_search = index
+                    entry.archive_version = version
+        return index
+
+    def _get_shared(self, hotel_id: str, kind: str) -> list:
+        loader = getattr(self.backend, f"load_{kind}")
+
+        with self._lock:
+            entry = self._touch(hotel_id)
+            if self.use_listener and kind not in entry.unsubscribe:
+                entry.unsubscribe[kind] = self._subscribe(hotel_id, kind)
+            listening = entry.unsubscribe.get(kind) is not None
+
+            if listening and entry.data[kind] is not None:
+                self._stats["hits"] += 1
+                return entry.data[kind]
+            generation = entry.generation[kind]
+
+        version = None
+        if not listening:
+            # Ein kleines Dokument statt der ganzen Liste lesen
+            versions = self.backend.data_versions(hotel_id)
+            if versions is None:
+                return loader(hotel_id)
+            version = versions.get(kind, 0)
+
+            with self._lock:
+                if entry.data[kind] is not None and entry.version[kind] == version:
+                    self._stats["hits"] += 1
+                    return entry.data[kind]
+
+        with self._lock:
+            self._stats["misses"] += 1
+
+        # Außerhalb der Sperre laden, damit andere Hotels nicht warten.
+        # Der Zähler wurde vorher gelesen: ändert sich etwas während des
+        # Ladens, ist er beim nächsten Lesen höher und es wird neu geladen.
+        items = loader(hotel_id)
+
+        with self._lock:
+            entry = self._entries.get(hotel_id)
+            if entry is not None and entry.generation[kind] == generation:
+                entry.data[kind] = items
+                entry.version[kind] = version
+        return items
+
+    # --- Aktualisieren ------------------------------------
+    def _subscribe(self, hotel_id: str, kind: str) -> Optional[Callable]:
+        def _on_change(items: Optional[list]):
+            with self._lock:
+                entry = self._entries.get(hotel_id)
+                if entry is None:
+                    return
+                entry.data[kind] = items
+                entry.generation[kind] += 1
+
+        return self.backend.watch(hotel_id, kind, _on_change)
+
+    def invalidate(self, hotel_id: str) -> None:
+        """Verwirft die Listen eines Hotels (nach eigenen Schreibzugriffen)."""
+        with self._lock:
+            entry = self._entries.get(hotel_id)
+            if entry is None:
+                return
+            for kind in KINDS:
+                entry.data[kind] = None
+                entry.generation[kind] += 1
+
+    # --- Verdrängen ---------------------------------------
+    def _touch(self, hotel_id: str) -> _Entry:
+        now = time.monotonic()
+
+        entry = self._entries.get(hotel_id)
+        if entry is None:
+            entry = self._entries[hotel_id] = _Entry()
+        self._entries.move_to_end(hotel_id)
+        entry.last_used = now
+
+        # Vorne stehen die am längsten nicht gelesenen Hotels
+        while len(self._entries) > self.max_tenants:
+            self._evict(next(iter(self._entries)))
+        for other_id, other in list(self._entries.items()):
+            if now - other.last_used < self.idle_seconds:
+                break
+            self._evict(other_id)
+
+        return entry
+
+    def _evict(self, hotel_id: str) -> None:
+        entry = self._entries.pop(hotel_id)
+        self._stats["evictions"] += 1
+        for unsubscribe in entry.unsubscribe.values():
+            if unsubscribe is not None:
+                unsubscribe()
+
+    def close(self) -> None:
+        """Beendet alle Listener und leert den Cache."""
+        with self._lock:
+            for hotel_id in list(self._entries):
+                self._evict(hotel_id)
+
+    def stats(self) -> dict:
+        with self._lock:
+            result = dict(self._stats)
+            result["tenants"] = len(self._entries)
+        return result
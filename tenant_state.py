@@ -0,0 +1,97 @@
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from models import Guest, Room
+
+
+# ---------------------------------------------------------
+# Indizierter Zustand eines Mandanten
+# ---------------------------------------------------------
+class TenantState:
+    """
+    Gäste und Zimmer eines Hotels mit Indizes für O(1)-Zugriffe.
+    - nach Gast-ID, nach Zimmernummer, nach Status ("checked_in", ...)
+    - belegendes Zimmer → eingecheckter Gast
+    - höchste je gesehene Gast-ID (sinkt auch beim Löschen nicht)
+    Einmal pro Laden aufgebaut; put_*/remove_* halten alle Indizes konsistent.
+    Nach Änderungen an Status oder Zimmer eines Gastes put_guest aufrufen.
+    """
+
+    def __init__(self, guests: Iterable[Guest] = (), rooms: Iterable[Room] = ()):
+        self._guests: Dict[int, Guest] = {}
+        self._rooms: Dict[int, Room] = {}
+        self._by_status: Dict[str, Dict[int, Guest]] = {}
+        self._occupant: Dict[int, int] = {}
+        # Unter welchem Status/Zimmer ein Gast indiziert ist – Gäste werden
+        # vor put_guest direkt geändert, die alten Werte stehen nur noch hier
+        self._indexed: Dict[int, Tuple[str, Optional[int]]] = {}
+        self.max_guest_id = 0
+
+        for g in guests:
+            self.put_guest(g)
+        for r in rooms:
+            self.put_room(r)
+
+    # --- Gäste --------------------------------------------
+    def get_guest(self, guest_id: int) -> Optional[Guest]:
+        return self._guests.get(guest_id)
+
+    def guests(self, status: Optional[str] = None) -> List[Guest]:
+        """Gäste nach ID sortiert, optional nur mit diesem Status."""
+        source = self._guests if status is None else self._by_status.get(status, {})
+        return [source[gid] for gid in sorted(source)]
+
+    def count(self, status: Optional[str] = None) -> int:
+        if status is None:
+            return len(self._guests)
+        return len(self._by_status.get(status, {}))
+
+    def occupant(self, room_number: int) -> Optional[Guest]:
+        """Eingecheckter Gast in diesem Zimmer (oder None)."""
+        guest_id = self._occupant.get(room_number)
+        return self._guests.get(guest_id) if guest_id is not None else None
+
+    def put_guest(self, guest: Guest) -> None:
+        self._unindex(guest.id)
+
+        room_number = guest.room_number if guest.status == "checked_in" else None
+
+        self._guests[guest.id] = guest
+        self._by_status.setdefault(guest.status, {})[guest.id] = guest
+        if room_number is not None:
+            self._occupant[room_number] = guest.id
+        self._indexed[guest.id] = (guest.status, room_number)
+        self.note_guest_id(guest.id)
+
+    def remove_guest(self, guest_id: int) -> None:
+        self._unindex(guest_id)
+        self._guests.pop(guest_id, None)
+
+    def note_guest_id(self, guest_id: int) -> None:
+        """Vergebene ID merken, auch wenn der Gast nicht (mehr) geladen ist."""
+        if guest_id > self.max_guest_id:
+            self.max_guest_id = guest_id
+
+    def next_guest_id(self) -> int:
+        return self.max_guest_id + 1
+
+    def _unindex(self, guest_id: int) -> None:
+        indexed = self._indexed.pop(guest_id, None)
+        if indexed is None:
+            return
+        status, room_number = indexed
+        self._by_status[status].pop(guest_id, None)
+        if room_number is not None and self._occupant.get(room_number) == guest_id:
+            del self._occupant[room_number]
+
+    # --- Zimmer -------------------------------------------
+    def get_room(self, room_number: int) -> Optional[Room]:
+        return self._rooms.get(room_number)
+
+    def rooms(self) -> List[Room]:
+        return [self._rooms[n] for n in sorted(self._rooms)]
+
+    def put_room(self, room: Room) -> None:
+        self._rooms[room.number] = room
+
+    def remove_room(self, room_number: int) -> None:
+        self._rooms.pop(room_number, None)
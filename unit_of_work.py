@@ -0,0 +1,477 @@
+import random
+import threading
+import time
+from typing import Callable, Dict, Iterable, List, Optional, Set
+
+from models import Guest, Room
+from config import get_setting
+from reservations import RoomCalendar
+from tenant_state import TenantState
+from database import (
+    ChangeSet,
+    ConcurrentModificationError,
+    StorageBackend,
+    add_counts,
+    allocate_guest_id,
+    get_backend,
+    guest_aggregates,
+    invalidate_cache,
+    open_balance,
+)
+
+
+# ---------------------------------------------------------
+# Unit of Work: eine Aktion = ein Lesen, ein Schreiben
+# ---------------------------------------------------------
+class TenantSession:
+    """
+    Sammelt alle Lese- und Schreibzugriffe einer Aktion eines Mandanten.
+    - Gäste und Zimmer werden höchstens einmal geladen,
+      alle weiteren Abfragen laufen aus dem Speicher (self.state, indiziert).
+    - Änderungen werden mit save_guest/save_room/delete_guest vorgemerkt
+      und erst bei commit() geschrieben – nur die geänderten Einträge.
+    - Als Kontextmanager: commit() bei Erfolg, bei Fehler wird nichts gespeichert.
+
+        with TenantSession(hotel_id) as s:
+            guest = s.get_guest(guest_id)
+            guest.name = "Neu"
+            s.save_guest(guest)
+    """
+
+    def __init__(
+        self,
+        hotel_id: str,
+        backend: Optional[StorageBackend] = None,
+        transactional: bool = False,
+    ):
+        self.hotel_id = hotel_id
+        self.backend = backend or get_backend()
+        # Läuft innerhalb von backend.run_transaction (write_mode "transaction")
+        self.transactional = transactional
+
+        self.state = TenantState()
+        # Einzeln gelesen und nicht vorhanden → nicht erneut nachfragen
+        self._missing_guests: Set[int] = set()
+        self._missing_rooms: Set[int] = set()
+        # Per next_guest_id vergeben: beim Commit darf es sie noch nicht geben
+        self._new_guest_ids: Set[int] = set()
+        self._all_guests_loaded = False
+        self._all_rooms_loaded = False
+
+        self._dirty_guests: Set[int] = set()
+        self._dirty_rooms: Set[int] = set()
+        self._deleted_guests: Set[int] = set()
+        self._deleted_rooms: Set[int] = set()
+        self._archived_guests: Dict[int, Guest] = {}
+        self._meta: Dict[str, Optional[dict]] = {}
+        # Beitrag der Gäste im gelesenen Zustand zu den Kennzahlen:
+        # {id: (guest_aggregates, open_balance)} – für die Differenz beim Commit
+        self._originals: Dict[int, tuple] = {}
+        self._dirty_meta: Set[str] = set()
+        self._calendars: Dict[int, RoomCalendar] = {}
+        self._dirty_calendars: Set[int] = set()
+
+        # Beim Lesen vermerkte Versionen (optimistische Nebenläufigkeit)
+        self.versions: dict = {}
+
+    # --- Kontextmanager -----------------------------------
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.commit()
+        return False
+
+    # --- Laden --------------------------------------------
+    def _load_all_guests(self):
+        if self._all_guests_loaded:
+            return
+        fresh = {}
+        for g in self.backend.load_guests(self.hotel_id, versions=fresh):
+            # Bereits geladene (evtl. geänderte) Objekte behalten
+            if self.state.get_guest(g.id) is None and g.id not in self._deleted_guests:
+                self.state.put_guest(g)
+                self._remember(g)
+            # Auch hier gelöschte IDs zählen für next_guest_id
+            self.state.note_guest_id(g.id)
+        self._missing_guests.clear()
+        # Versionen bereits einzeln gelesener Einträge nicht überschreiben
+        for key, version in fresh.items():
+            self.versions.setdefault(key, version)
+        self._all_guests_loaded = True
+
+    def _load_all_rooms(self):
+        if self._all_rooms_loaded:
+            return
+        fresh = {}
+        for r in self.backend.load_rooms(self.hotel_id, versions=fresh):
+            if self.state.get_room(r.number) is None and r.number not in self._deleted_rooms:
+                self.state.put_room(r)
+        self._missing_rooms.clear()
+        for key, version in fresh.items():
+            self.versions.setdefault(key, version)
+        self._all_rooms_loaded = True
+
+    def preload(self, guests: bool = False, rooms: bool = False) -> None:
+        """Lädt ganze Listen vorab, damit folgende get_* ohne Einzelabfragen auskommen."""
+        if guests:
+            self._load_all_guests()
+        if rooms:
+            self._load_all_rooms()
+
+    @property
+    def guests(self) -> List[Guest]:
+        self._load_all_guests()
+        return self.state.guests()
+
+    @property
+    def rooms(self) -> List[Room]:
+        self._load_all_rooms()
+        return self.state.rooms()
+
+    def guests_with_status(self, status: str) -> List[Guest]:
+        self._load_all_guests()
+        return self.state.guests(status)
+
+    def next_guest_id(self) -> int:
+        """
+        Neue Gast-ID vom Zähler des Hotels (database.allocate_guest_id) –
+        ohne die Gästeliste zu laden. Jeder Aufruf liefert eine andere ID;
+        wird die Aktion wiederholt, bleibt die zuvor vergebene ungenutzt.
+        """
+        guest_id = allocate_guest_id(
+            self.hotel_id, self.backend, use_block=not self.transactional
+        )
+        self.state.note_guest_id(guest_id)
+        self._new_guest_ids.add(guest_id)
+        return guest_id
+
+    def next_guest_ids(self, count: int) -> List[int]:
+        """count neue Gast-IDs mit einem einzigen Zähler-Aufruf."""
+        if count == 1:
+            return [self.next_guest_id()]
+        first = self.backend.allocate_guest_ids(self.hotel_id, count)
+        ids = list(range(first, first + count))
+        self.state.note_guest_id(ids[-1])
+        self._new_guest_ids.update(ids)
+        return ids
+
+    def get_guest(self, guest_id: int) -> Optional[Guest]:
+        guest = self.state.get_guest(guest_id)
+        if (
+            guest is None
+            and not self._all_guests_loaded
+            and guest_id not in self._missing_guests
+            and guest_id not in self._deleted_guests
+        ):
+            if self.backend.supports_point_reads:
+                guest = self.backend.get_guest(self.hotel_id, guest_id, versions=self.versions)
+                if guest is None:
+                    self._missing_guests.add(guest_id)
+                else:
+                    self.state.put_guest(guest)
+                    self._remember(guest)
+            else:
+                self._load_all_guests()
+                guest = self.state.get_guest(guest_id)
+        return guest
+
+    def get_room(self, room_number: int) -> Optional[Room]:
+        room = self.state.get_room(room_number)
+        if (
+            room is None
+            and not self._all_rooms_loaded
+            and room_number not in self._missing_rooms
+            and room_number not in self._deleted_rooms
+        ):
+            if self.backend.supports_point_reads:
+                room = self.backend.get_room(self.hotel_id, room_number, versions=self.versions)
+                if room is None:
+                    self._missing_rooms.add(room_number)
+                else:
+                    self.state.put_room(room)
+            else:
+                self._load_all_rooms()
+                room = self.state.get_room(room_number)
+        return room
+
+    # --- Änderungen vormerken -----------------------------
+    def _remember(self, guest: Guest) -> None:
+        # Nur die Beiträge statt einer Kopie samt Nächten: summary() nutzt die
+        # gespeicherten Summen und dekodiert die Nächte nicht
+        self._originals[guest.id] = (guest_aggregates(guest), open_balance(guest))
+
+    def _load_original(self, guest_id: int) -> None:
+        # Gespeichert/gelöscht ohne vorher gelesen zu sein (z.B. logic.update_guest):
+        # gespeicherten Stand nachladen, sonst stimmt die Differenz nicht
+        if (
+            guest_id in self._originals
+            or guest_id in self._new_guest_ids
+            or guest_id in self._missing_guests
+            or self._all_guests_loaded
+        ):
+            return
+        if self.backend.supports_point_reads:
+            original = self.backend.get_guest(self.hotel_id, guest_id, versions=self.versions)
+            if original is not None:
+                self._remember(original)
+        else:
+            self._load_all_guests()
+
+    def save_guest(self, guest: Guest) -> None:
+        self._load_original(guest.id)
+        if self._all_guests_loaded or guest.id in self._new_guest_ids:
+            # Neuer Gast: ID darf beim Commit noch nicht vergeben sein
+            self.versions.setdefault(("guests", guest.id), None)
+        self.state.put_guest(guest)
+        self._missing_guests.discard(guest.id)
+        self._dirty_guests.add(guest.id)
+        self._deleted_guests.discard(guest.id)
+        self._archived_guests.pop(guest.id, None)
+
+    def delete_guest(self, guest_id: int) -> None:
+        self._load_original(guest_id)
+        self.state.remove_guest(guest_id)
+        self._dirty_guests.discard(guest_id)
+        self._deleted_guests.add(guest_id)
+        self._archived_guests.pop(guest_id, None)
+
+    def archive_guest(self, guest: Guest) -> None:
+        """Verschiebt den Gast aus der aktiven Liste in sein Monatsarchiv."""
+        self.delete_guest(guest.id)
+        self._archived_guests[guest.id] = guest
+
+    def save_room(self, room: Room) -> None:
+        if self._all_rooms_loaded:
+            self.versions.setdefault(("rooms", room.number), None)
+        self.state.put_room(room)
+        self._missing_rooms.discard(room.number)
+        self._dirty_rooms.add(room.number)
+        self._deleted_rooms.discard(room.number)
+
+    def delete_room(self, room_number: int) -> None:
+        self.state.remove_room(room_number)
+        self._dirty_rooms.discard(room_number)
+        self._deleted_rooms.add(room_number)
+
+    def get_meta(self, doc_id: str) -> Optional[dict]:
+        """Verwaltungsdokument des Hotels (siehe StorageBackend.get_meta)."""
+        if doc_id not in self._meta:
+            self._meta[doc_id] = self.backend.get_meta(
+                self.hotel_id, doc_id, versions=self.versions
+            )
+        return self._meta[doc_id]
+
+    def save_meta(self, doc_id: str, data: dict) -> None:
+        """Ersetzt das Verwaltungsdokument; gespeichert im selben Commit."""
+        self._meta[doc_id] = data
+        self._dirty_meta.add(doc_id)
+
+    def get_calendar(self, room_number: int) -> RoomCalendar:
+        """Belegungsplan eines Zimmers (höchstens einmal pro Sitzung gelesen)."""
+        if room_number not in self._calendars:
+            self._calendars[room_number] = RoomCalendar(
+                room_number,
+                self.backend.get_calendar(self.hotel_id, room_number, versions=self.versions),
+            )
+        return self._calendars[room_number]
+
+    def preload_rooms(self, room_numbers: Iterable[int]) -> None:
+        """
+        Zimmer samt Belegungsplänen mit einem Lesezugriff statt zwei pro
+        Zimmer (Check-in, Checkout, Zimmerwechsel, Gruppen). Danach lesen
+        get_room/get_calendar für diese Zimmer aus dem Speicher.
+        """
+        numbers = [n for n in dict.fromkeys(room_numbers) if n not in self._calendars]
+        if not numbers:
+            return
+        if not self.backend.supports_point_reads:
+            # Array-Layout: Zimmer kommen ohnehin als eine Liste
+            self._load_all_rooms()
+
+        unknown = [
+            n for n in numbers
+            if self.state.get_room(n) is None
+            and n not in self._missing_rooms
+            and n not in self._deleted_rooms
+        ]
+        load_rooms = bool(unknown) and not self._all_rooms_loaded
+        fresh = {}
+        rooms, calendars = self.backend.get_room_calendars(
+            self.hotel_id, numbers, versions=fresh, rooms=load_rooms
+        )
+        if load_rooms:
+            for n in unknown:
+                if n in rooms:
+                    self.state.put_room(rooms[n])
+                else:
+                    self._missing_rooms.add(n)
+        for n, reservations in calendars.items():
+            self._calendars[n] = RoomCalendar(n, reservations)
+        # Versionen bereits gelesener Einträge nicht überschreiben
+        for key, version in fresh.items():
+            self.versions.setdefault(key, version)
+
+    def save_calendar(self, calendar: RoomCalendar) -> None:
+        """Merkt den geänderten Belegungsplan für den Commit vor."""
+        self._calendars[calendar.room_number] = calendar
+        self._dirty_calendars.add(calendar.room_number)
+
+    @property
+    def has_changes(self) -> bool:
+        return bool(
+            self._dirty_guests or self._deleted_guests
+            or self._dirty_rooms or self._deleted_rooms
+            or self._dirty_meta or self._dirty_calendars
+        )
+
+    # --- Schreiben ----------------------------------------
+    def changes(self) -> ChangeSet:
+        changes = ChangeSet(
+            guests=[self.state.get_guest(gid) for gid in sorted(self._dirty_guests)],
+            deleted_guests=sorted(self._deleted_guests),
+            rooms=[self.state.get_room(n) for n in sorted(self._dirty_rooms)],
+            deleted_rooms=sorted(self._deleted_rooms),
+            archived=[self._archived_guests[gid] for gid in sorted(self._archived_guests)],
+            meta={doc_id: self._meta[doc_id] for doc_id in sorted(self._dirty_meta)},
+            calendars={
+                n: self._calendars[n].reservations() for n in sorted(self._dirty_calendars)
+            },
+        )
+        self._aggregate_changes(changes)
+
+        if not self.backend.supports_point_reads:
+            # Array-Layout: betroffene Listen komplett schreiben
+            if self._dirty_guests or self._deleted_guests:
+                changes.all_guests = self.guests
+            if self._dirty_rooms or self._deleted_rooms:
+                changes.all_rooms = self.rooms
+
+        return changes
+
+    def _aggregate_changes(self, changes: ChangeSet) -> None:
+        # Kennzahlen: Beitrag vorher abziehen, Beitrag nachher addieren
+        for gid in self._dirty_guests | self._deleted_guests:
+            aggregates_before, balance_before = self._originals.get(gid, (None, None))
+            after = self.state.get_guest(gid)
+            status = None
+            if gid in self._archived_guests:
+                after, status = self._archived_guests[gid], "archived"
+
+            if aggregates_before is not None:
+                add_counts(changes.aggregates, aggregates_before, -1)
+            if after is not None:
+                add_counts(changes.aggregates, guest_aggregates(after, status))
+
+            balance_after = open_balance(after) if after is not None and status is None else None
+            if balance_after != balance_before:
+                changes.open_balances[str(gid)] = balance_after
+
+    def commit(self) -> None:
+        """
+        Schreibt nur geänderte bzw. gelöschte Einträge –
+        Gäste, Zimmer und Belegungspläne gemeinsam in einem atomaren Roundtrip.
+        Wurde ein gelesener Eintrag inzwischen anderswo geändert, wird nichts
+        geschrieben und ConcurrentModificationError geworfen.
+        """
+        if not self.has_changes:
+            return
+
+        self.backend.commit(self.hotel_id, self.changes(), versions=self.versions)
+        invalidate_cache(self.hotel_id)
+
+        # Geschriebener Stand ist der neue Ausgangspunkt
+        for gid in self._dirty_guests:
+            self._remember(self.state.get_guest(gid))
+        for gid in self._deleted_guests:
+            self._originals.pop(gid, None)
+
+        self._dirty_guests.clear()
+        self._deleted_guests.clear()
+        self._dirty_rooms.clear()
+        self._deleted_rooms.clear()
+        self._archived_guests.clear()
+        self._dirty_meta.clear()
+        self._dirty_calendars.clear()
+
+
+# ---------------------------------------------------------
+# Kennzahlen: Konflikte & Wiederholungen
+# ---------------------------------------------------------
+_stats_lock = threading.Lock()
+_stats = {"commits": 0, "conflicts": 0, "retries": 0, "failures": 0}
+
+
+def _count(key: str) -> None:
+    with _stats_lock:
+        _stats[key] += 1
+
+
+def get_concurrency_stats() -> dict:
+    """
+    Zähler seit Prozessstart:
+    - commits:   erfolgreiche Commits
+    - conflicts: Commits, die an einer gleichzeitigen Änderung scheiterten
+    - retries:   daraufhin wiederholte Aktionen
+    - failures:  Aktionen, die auch nach allen Versuchen scheiterten
+    """
+    with _stats_lock:
+        return dict(_stats)
+
+
+def reset_concurrency_stats() -> None:
+    with _stats_lock:
+        for key in _stats:
+            _stats[key] = 0
+
+
+# ---------------------------------------------------------
+# Aktion in einer Sitzung ausführen
+# ---------------------------------------------------------
+def run_session(hotel_id: str, operation: Callable, backend: Optional[StorageBackend] = None):
+    """
+    Führt operation(session) aus und schreibt danach alle Änderungen.
+    - write_mode "batch" (Standard): ein atomarer Batch am Ende, mit
+      Versions-Vorbedingung für alle gelesenen Einträge. Hat eine andere
+      Sitzung sie inzwischen geändert, wird operation mit frisch gelesenen
+      Daten wiederholt (max_write_attempts, Standard 5).
+    - write_mode "transaction": Lesen und Schreiben in einer Transaktion;
+      Wiederholungen übernimmt das Backend.
+    operation kann mehrfach laufen und darf daher keine Seiteneffekte
+    außerhalb der Sitzung haben.
+    """
+    backend = backend or get_backend()
+
+    if get_setting("write_mode", "batch") == "transaction":
+        def _attempt(tx_backend):
+            session = TenantSession(hotel_id, backend=tx_backend, transactional=True)
+            result = operation(session)
+            session.commit()
+            return result
+
+        result = backend.run_transaction(hotel_id, _attempt)
+        # Erst nach Abschluss der Transaktion ist der neue Stand sichtbar
+        invalidate_cache(hotel_id)
+        _count("commits")
+        return result
+
+    max_attempts = int(get_setting("max_write_attempts", 5))
+
+    for attempt in range(max_attempts):
+        session = TenantSession(hotel_id, backend=backend)
+        result = operation(session)
+        try:
+            session.commit()
+        except ConcurrentModificationError:
+            _count("conflicts")
+            if attempt == max_attempts - 1:
+                _count("failures")
+                raise
+            _count("retries")
+            # Kurzer zufälliger Backoff, damit sich Sitzungen nicht erneut treffen
+            time.sleep(random.uniform(0, 0.02 * (2 ** attempt)))
+            continue
+
+        _count("commits")
+        return result
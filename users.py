@@ -1,4 +1,4 @@
-from firebase_db import db
+from firebase_db import get_db
 from auth import hash_password, verify_password
 from datetime import datetime
 
@@ -10,7 +10,7 @@ SUPERADMIN_PASSWORD = "admin123"
 # Automatische Reparatur aller User
 # ---------------------------------------------------------
 def repair_users():
-    users_ref = db.collection("users").stream()
+    users_ref = get_db().collection("users").stream()
 
     for doc in users_ref:
         data = doc.to_dict()
@@ -28,7 +28,7 @@ def repair_users():
 
         # Falls Reparaturen nötig → speichern
         if updates:
-            db.collection("users").document(doc.id).update(updates)
+            get_db().collection("users").document(doc.id).update(updates)
 
 
 # ---------------------------------------------------------
@@ -37,13 +37,13 @@ def repair_users():
 def ensure_superadmin_exists():
     repair_users()  # <<< WICHTIG: Reparatur beim Start
 
-    users_ref = db.collection("users").where("role", "==", "superadmin").stream()
+    users_ref = get_db().collection("users").where("role", "==", "superadmin").stream()
     if any(users_ref):
         return True
 
     email_clean = SUPERADMIN_EMAIL.lower()
 
-    db.collection("users").add({
+    get_db().collection("users").add({
         "email": email_clean,
         "email_lower": email_clean,
         "password": hash_password(SUPERADMIN_PASSWORD),
@@ -65,7 +65,7 @@ def create_user(email, password, role, tenant_id):
 
     email_clean = email.strip().lower()
 
-    db.collection("users").add({
+    get_db().collection("users").add({
         "email": email_clean,
         "email_lower": email_clean,
         "password": hash_password(password),
@@ -84,7 +84,7 @@ def validate_login(email, password):
 
     email_clean = email.strip().lower()
 
-    users_ref = db.collection("users").where("email_lower", "==", email_clean).stream()
+    users_ref = get_db().collection("users").where("email_lower", "==", email_clean).stream()
 
     for doc in users_ref:
         user = doc.to_dict()
@@ -106,7 +106,7 @@ def validate_login(email, password):
 # Passwort ändern (für eingeloggte Mandanten)
 # ---------------------------------------------------------
 def change_password(user_id, old_password, new_password):
-    user_ref = db.collection("users").document(user_id)
+    user_ref = get_db().collection("users").document(user_id)
     snap = user_ref.get()
     if not snap.exists:
         return False, "User existiert nicht."
@@ -19,3 +19,11 @@ def translator(texts: dict):
     Gibt eine Funktion zurück, die Texte anhand eines Keys übersetzt.
     """
     return lambda key: texts.get(key, key)
+
+@st.cache_resource
+def startup_stats() -> dict:
+    """
+    Prozessweit: Messwerte des ersten Seitenaufbaus (leer bis dahin).
+    Wird in app.py befüllt und im Superadmin-Bereich angezeigt.
+    """
+    return {}